@@ -1,54 +1,71 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context, g
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
 import json
 import os
 import traceback
 import geopandas as gpd
 import warnings
-import matplotlib.pyplot as plt
 import io
+import itertools
 import base64
-from matplotlib.colors import ListedColormap
-from sklearn.preprocessing import MinMaxScaler
+import threading
+import time
+from matplotlib.colors import to_hex
 from pymongo import MongoClient
-from bson import ObjectId
-from datetime import datetime
+from render_cache import RenderCache, PanelCache, file_fingerprint
+from geometry_store import GeometryStore, GEOMETRY_TIERS, FRAME_NAMES
+from render_pool import RenderPool, PlotSpec
+from render_jobs import RenderJobManager
+from data_store import PopulationStore, SCALED_DENSITY, cube_path_for
+from snapshot import load_snapshot, write_snapshot, source_signature
+from plot_storage import create_plot_storage
+from prerender import PrerenderManifest, RENDERER_VERSION
+from figures import new_figure, release_figure, figure_stats, get_colormap, FigureEncoder, IMAGE_MIMETYPES
+from memory_stats import RssProbe, RequestMemoryStats, current_rss, peak_rss
+from metrics import registry, record, timed
 
 warnings.filterwarnings("ignore")
 
-# MongoDB setup
-client = MongoClient('mongodb://localhost:27017/')
-db = client['world_population']
-plots_collection = db['plots']
+# MongoDB setup; WPA_MONGO_URI overrides the server address
+MONGO_URI = os.environ.get('WPA_MONGO_URI', 'mongodb://localhost:27017/')
 
-def save_plot_to_mongodb(plot_data, plot_type, metadata):
-    """Save plot to MongoDB and return its ID"""
+# Plot storage backend: 'gridfs' (MongoDB), 'file' (content-addressed files) or 'memory';
+# WPA_PLOT_STORAGE overrides it, e.g. to run without a MongoDB server
+PLOT_STORAGE = os.environ.get('WPA_PLOT_STORAGE', 'gridfs')
+PLOT_STORE_DIR = 'data/plots'
+# Plot ids never change content, so browsers may keep them for a year
+PLOT_CACHE_MAX_AGE = 365 * 24 * 3600
+# /get_plots returns images up to this size inline, larger ones as URLs
+PLOT_INLINE_MAX_BYTES = 64 * 1024
+
+def connect_plot_storage():
+    """Open this process's MongoDB client and plot storage
+
+    MongoClient is not fork safe, so forked server workers call this again
+    after fork instead of inheriting the preloading master's client. The
+    client connects lazily, on its first operation.
+    """
+    global client, db, plot_storage
+    client = MongoClient(MONGO_URI, connect=False)
+    db = client['world_population']
+    plot_storage = create_plot_storage(PLOT_STORAGE, db=db, root=PLOT_STORE_DIR)
+
+connect_plot_storage()
+
+def save_plots(items):
+    """Save (image bytes, plot type, metadata, content type) items in one bulk write and return their IDs"""
     try:
-        # Convert base64 to binary
-        image_data = base64.b64decode(plot_data)
-        
-        # Create document
-        plot_doc = {
-            'plot_type': plot_type,
-            'metadata': metadata,
-            'image_data': image_data,
-            'created_at': datetime.utcnow()
-        }
-        
-        # Insert and return ID
-        result = plots_collection.insert_one(plot_doc)
-        return str(result.inserted_id)
+        with timed('storage_save'):
+            return plot_storage.save_many(items)
     except Exception as e:
-        print(f"Error saving plot to MongoDB: {str(e)}")
-        return None
+        print(f"Error saving plots: {str(e)}")
+        return [None] * len(items)
 
 app = Flask(__name__)
 
-# Debug flag
-DEBUG = True
+# Debug flag; WPA_DEBUG=0 silences debug_print
+DEBUG = os.environ.get('WPA_DEBUG', '1') != '0'
 
 def debug_print(message):
     """Helper function for debug messages"""
@@ -58,43 +75,339 @@ def debug_print(message):
 # Define pivot year constant
 PIVOT_YEAR = 2022
 
-# Load data
-try:
-    debug_print("Loading arima_combined_df.csv...")
-    df = pd.read_csv('arima_combined_df.csv')
-    debug_print(f"Data loaded successfully. Shape: {df.shape}")
-except Exception as e:
-    debug_print(f"Error loading data: {str(e)}")
-    raise
+# Combined history and forecast dataset; WPA_DATA_PATH selects another engine's output, e.g. lstm_combined_df.csv
+DATA_PATH = os.environ.get('WPA_DATA_PATH', 'arima_combined_df.csv')
+SHAPEFILE_PATH = 'data/10m_cultural/10m_cultural/ne_10m_admin_0_countries.shp'
 
-# Load shapefile
-try:
-    debug_print("Loading shapefile...")
-    shapefile_path = 'data/10m_cultural/10m_cultural/ne_10m_admin_0_countries.shp'
-    world = gpd.read_file(shapefile_path)
-    debug_print(f"Shapefile loaded successfully. Shape: {world.shape}")
-except Exception as e:
-    debug_print(f"Error loading shapefile: {str(e)}")
-    raise
+# Binary snapshot of the prepared data; set WPA_SNAPSHOT=0 to always parse the sources
+SNAPSHOT_DIR = 'data/snapshot'
+SNAPSHOT_ENABLED = os.environ.get('WPA_SNAPSHOT', '1') != '0'
+
+# How often requests check whether DATA_PATH was replaced (e.g. by arima_forecast.py), in seconds
+DATASET_CHECK_INTERVAL = 30
+
+# Map rendering settings
+MAP_FIGSIZE = (20, 10)
+FIG_DPI = 100
+# Two-year maps are composed from one panel per year
+MAP_PANEL_FIGSIZE = (MAP_FIGSIZE[0] / 2, MAP_FIGSIZE[1])
+MAP_PANEL_DIR = 'data/panels'
+GEOMETRY_TIERS_ENABLED = True
+GEOMETRY_CACHE_DIR = 'data/geometry_tiers'
+
+# Fixed subplot margins of each kind of figure, so encoding needs no tight-bbox pass
+FIGURE_LAYOUTS = {
+    'graph': {'left': 0.08, 'right': 0.97, 'bottom': 0.1, 'top': 0.92},
+    'pie_charts': {'left': 0.03, 'right': 0.97, 'bottom': 0.03, 'top': 0.9, 'wspace': 0.3},
+    'location_map': {'left': 0.01, 'right': 0.99, 'bottom': 0.01, 'top': 0.95},
+    'map_panel': {'left': 0.02, 'right': 0.95, 'bottom': 0.02, 'top': 0.95}
+}
+
+# Image format of each kind of plot when the client's Accept header lists it; PNG otherwise
+PLOT_IMAGE_FORMATS = {
+    'graph': 'svg',
+    'pie_charts': 'png',
+    'location_map': 'webp',
+    'maps': 'webp'
+}
+# PNG zlib level (0-9: faster to larger) and WebP quality (0-100)
+PNG_COMPRESS_LEVEL = 6
+WEBP_QUALITY = 85
+
+figure_encoder = FigureEncoder(png_compress_level=PNG_COMPRESS_LEVEL, webp_quality=WEBP_QUALITY)
+
+# Number of worker processes used to render figures (None = one per CPU, 0 = a background thread);
+# WPA_RENDER_PROCESSES overrides it
+RENDER_PROCESSES = int(os.environ['WPA_RENDER_PROCESSES']) if os.environ.get('WPA_RENDER_PROCESSES') else None
+
+# Line graphs drawn in the browser from /api/series instead of rendered to PNG by /get_data
+CLIENT_SIDE_GRAPHS = True
+CLIENT_PLOT_TYPES = ['population_graph', 'density_graph', 'growth_graph']
+
+# Choropleth maps colored in the browser from /api/geometry and /api/choropleth
+CLIENT_SIDE_MAPS = True
+CLIENT_MAP_TYPES = [
+    'population_maps_continent_wise', 'population_maps_country_wise',
+    'density_maps_continent_wise', 'density_maps_country_wise',
+    'growth_maps_continent_wise', 'growth_maps_country_wise'
+]
+
+# Geometry frame each choropleth map level is drawn on
+CHOROPLETH_LEVELS = {
+    'world-country-wise': 'countries',
+    'world-continent-wise': 'continents',
+    'continent-country-wise': 'countries'
+}
+
+# Class breaks, labels and colormap of the choropleth maps; density is binned after min-max scaling
+MAP_BINS = {
+    'population': {
+        'bins': [450, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 50_000_000,
+                 100_000_000, 500_000_000, 1_000_000_000, 2_000_000_000,
+                 4_000_000_000, 8_000_000_000],
+        'labels': [
+            '<1K', '1K–10K', '10K–100K', '100K–1M', '1M–10M', '10M–50M',
+            '50M–100M', '100M–500M', '500M–1B', '1B–2B', '2B–4B', '4B–8B'
+        ],
+        'cmap': 'YlOrRd',
+        'title': 'Population'
+    },
+    'density': {
+        'bins': [0, 0.000025, 0.00005, 0.000075, 0.0001, 0.0005, 0.001, 0.005,
+                 0.01, 0.05, 0.1, 0.2, 0.5, 0.75, 1],
+        'labels': [
+            '<2.5e-5', '2.5e-5–5e-5', '5e-5–7.5e-5', '7.5e-5–1e-4', '1e-4–5e-4', '5e-4–1e-3',
+            '1e-3–5e-3', '5e-3–1e-2', '1e-2–0.05', '0.05–0.1', '0.1–0.2', '0.2–0.5', '0.5–0.75', '0.75–1'
+        ],
+        'cmap': 'viridis',
+        'title': 'Density'
+    },
+    'growth': {
+        'bins': [-0.1, -0.05, -0.01, 0, 0.01, 0.02, 0.05, 0.1, 0.2, 1],
+        'labels': [
+            '<-5%', '-5% to -1%', '-1% to 0%', '0% to 1%', '1% to 2%',
+            '2% to 5%', '5% to 10%', '10% to 20%', '>20%'
+        ],
+        'cmap': 'RdYlGn',
+        'title': 'Growth'
+    }
+}
+
+# Style of shapes without a value on the server-drawn maps: unmatched shapes and missing data alike
+MAP_MISSING_STYLE = {'color': 'lightgrey', 'label': 'No data'}
+
+# Metrics served by /api/series, keyed by their API name
+SERIES_METRICS = {
+    'population': 'Population',
+    'density': 'Density',
+    'growth': 'Growth'
+}
+
+# Plots of the same cost are stored together in batches of at most this size
+RENDER_BATCH_SIZE = 8
+
+# Manifest of plots stored ahead of time by prerender.py
+PRERENDER_MANIFEST_PATH = 'data/prerender/manifest.json'
+
+# Render cache settings
+RENDER_CACHE_MAX_ENTRIES = 2048
+RENDER_CACHE_TTL = 24 * 3600
+
+# Plot types generated for each section, in display order
+SECTION_PLOT_TYPES = {
+    'world': [
+        'population_graph', 'population_maps', 'density_graph', 'density_maps',
+        'growth_graph', 'growth_maps',
+        'population_maps_continent_wise', 'population_maps_country_wise',
+        'density_maps_continent_wise', 'density_maps_country_wise',
+        'growth_maps_continent_wise', 'growth_maps_country_wise'
+    ],
+    'continent': [
+        'location_map', 'population_graph', 'population_maps', 'density_graph',
+        'density_maps', 'growth_graph', 'growth_maps', 'population_pie_charts',
+        'population_maps_country_wise', 'density_maps_country_wise', 'growth_maps_country_wise'
+    ],
+    'country': [
+        'location_map', 'population_graph', 'population_maps', 'density_graph',
+        'density_maps', 'growth_graph', 'growth_maps', 'population_pie_charts'
+    ]
+}
+
+def client_side_plot_types():
+    """Plot types the browser draws itself instead of fetching rendered images"""
+    return (CLIENT_PLOT_TYPES if CLIENT_SIDE_GRAPHS else []) + (CLIENT_MAP_TYPES if CLIENT_SIDE_MAPS else [])
+
+def server_plot_types(section):
+    """Plot types of a section that /get_data renders on the server"""
+    client_plot_types = client_side_plot_types()
+    return [plot_type for plot_type in SECTION_PLOT_TYPES[section] if plot_type not in client_plot_types]
+
+def plot_kind(plot_type):
+    """Kind of figure a plot type is drawn as: 'graph', 'pie_charts', 'location_map' or 'maps'"""
+    if plot_type.endswith('_graph'):
+        return 'graph'
+    if plot_type.endswith('_pie_charts'):
+        return 'pie_charts'
+    if plot_type == 'location_map':
+        return 'location_map'
+    return 'maps'
+
+def preferred_image_format(plot_type):
+    """Image format a plot type is encoded in for clients that accept it"""
+    return PLOT_IMAGE_FORMATS.get(plot_kind(plot_type), 'png')
+
+def negotiate_image_format(plot_type):
+    """Format of a plot type for this request: its preferred format if Accept lists it, else PNG"""
+    image_format = preferred_image_format(plot_type)
+    mimetype = IMAGE_MIMETYPES[image_format]
+    # Wildcards do not count: older clients send */* but may only handle PNG
+    if any(value == mimetype and quality > 0 for value, quality in request.accept_mimetypes):
+        return image_format
+    return 'png'
+
+def plot_cost_rank(plot_type):
+    """Rough render cost of a plot type, used to send the cheap plots first"""
+    if plot_type.endswith('_graph'):
+        return 0
+    if plot_type.endswith('_pie_charts'):
+        return 1
+    if plot_type == 'location_map':
+        return 2
+    return 3
+
+# Load data and shapes, from the binary snapshot when it matches the sources
+snapshot = load_snapshot(SNAPSHOT_DIR, DATA_PATH, SHAPEFILE_PATH) if SNAPSHOT_ENABLED else None
+if snapshot:
+    debug_print(f"Loaded snapshot from {SNAPSHOT_DIR}")
+    df = snapshot['df']
+    world = snapshot['world']
+    DATASET_VERSION = snapshot['dataset_version']
+    SHAPEFILE_VERSION = snapshot['shapefile_version']
+    store = PopulationStore(df, cube_path=cube_path_for(DATA_PATH, DATASET_VERSION),
+                            index=snapshot['store_index'], arrays=snapshot['store_arrays'])
+else:
+    # Load data
+    try:
+        debug_print(f"Loading {DATA_PATH}...")
+        df = pd.read_csv(DATA_PATH)
+        DATASET_VERSION = file_fingerprint(DATA_PATH)
+        debug_print(f"Data loaded successfully. Shape: {df.shape}, version: {DATASET_VERSION}")
+        store = PopulationStore(df, cube_path=cube_path_for(DATA_PATH, DATASET_VERSION))
+        debug_print(f"Indexed {len(store.countries)} countries over {len(store.years)} years")
+    except Exception as e:
+        debug_print(f"Error loading data: {str(e)}")
+        raise
+    
+    # Load shapefile
+    try:
+        debug_print("Loading shapefile...")
+        world = gpd.read_file(SHAPEFILE_PATH)
+        SHAPEFILE_VERSION = file_fingerprint(SHAPEFILE_PATH)
+        debug_print(f"Shapefile loaded successfully. Shape: {world.shape}")
+    except Exception as e:
+        debug_print(f"Error loading shapefile: {str(e)}")
+        raise
+    
+    if SNAPSHOT_ENABLED:
+        debug_print(f"Writing snapshot to {SNAPSHOT_DIR}...")
+        write_snapshot(SNAPSHOT_DIR, DATA_PATH, SHAPEFILE_PATH, df, world,
+                       DATASET_VERSION, SHAPEFILE_VERSION, store)
+
+debug_print("Preparing dissolved and simplified geometry tiers...")
+geometries = GeometryStore(
+    world,
+    tiers=GEOMETRY_TIERS if GEOMETRY_TIERS_ENABLED else None,
+    cache_dir=GEOMETRY_CACHE_DIR,
+    source_version=SHAPEFILE_VERSION
+).preload()
 
 # Get unique values for dropdowns
 try:
     debug_print("Getting unique values for dropdowns...")
-    continents = sorted(df['Continent'].unique().tolist())
-    countries = sorted(df['Country/Territory'].unique().tolist())
+    continents = store.continents
+    countries = store.countries
     debug_print(f"Found {len(continents)} continents and {len(countries)} countries")
 except Exception as e:
     debug_print(f"Error getting unique values: {str(e)}")
     raise
 
+dataset_signature = source_signature(DATA_PATH)
+dataset_checked_at = time.monotonic()
+dataset_reload_lock = threading.Lock()
+
+render_cache = RenderCache(max_entries=RENDER_CACHE_MAX_ENTRIES, ttl_seconds=RENDER_CACHE_TTL)
+prerendered = PrerenderManifest(PRERENDER_MANIFEST_PATH)
+panel_cache = PanelCache(MAP_PANEL_DIR)
+render_pool = RenderPool(__name__, processes=RENDER_PROCESSES)
+render_jobs = RenderJobManager(render_pool)
+request_memory = RequestMemoryStats()
+
+# Prometheus metrics served by /metrics; stage timings are recorded with metrics.timed()
+REQUEST_SECONDS = registry.histogram('wpa_request_seconds', 'Time to build each response', ['endpoint', 'status'])
+PANEL_LOOKUPS = registry.counter('wpa_map_panel_lookups_total', 'Map panel cache lookups', ['result'])
+PRERENDER_LOOKUPS = registry.counter('wpa_prerender_lookups_total', 'Pre-render manifest lookups', ['result'])
+registry.gauge('wpa_render_cache_hits_total', 'Render cache hits',
+               lambda: render_cache.stats()['hits'], kind='counter')
+registry.gauge('wpa_render_cache_misses_total', 'Render cache misses',
+               lambda: render_cache.stats()['misses'], kind='counter')
+registry.gauge('wpa_render_cache_evictions_total', 'Render cache evictions',
+               lambda: render_cache.stats()['evictions'], kind='counter')
+registry.gauge('wpa_render_cache_hit_ratio', 'Render cache hits over lookups',
+               lambda: render_cache.stats()['hit_rate'])
+registry.gauge('wpa_render_cache_entries', 'Plots in the render cache',
+               lambda: render_cache.stats()['entries'])
+registry.gauge('wpa_render_queue_pending_plots', 'Plots queued or rendering', render_jobs.pending_count)
+registry.gauge('wpa_render_jobs_active', 'Render jobs with plots still rendering', render_jobs.active_count)
+registry.gauge('wpa_process_resident_memory_bytes', 'Resident memory of this process', current_rss)
+registry.gauge('wpa_open_figures', 'Figures created but not yet released in this process',
+               lambda: figure_stats()['open'])
+
+def refresh_dataset(force=False):
+    """Reload the dataset if DATA_PATH changed since it was read; return whether it was reloaded
+
+    Cached and pre-rendered plots are keyed by DATASET_VERSION, so plots of
+    the old version simply stop matching. The render workers hold the old
+    data and are replaced by fresh ones forked from the reloaded process.
+    """
+    global dataset_signature, dataset_checked_at, df, store, DATASET_VERSION, continents, countries
+    now = time.monotonic()
+    if not force and now - dataset_checked_at < DATASET_CHECK_INTERVAL:
+        return False
+    dataset_checked_at = now
+    # One request reloads; the others keep serving the current version meanwhile
+    if not dataset_reload_lock.acquire(blocking=False):
+        return False
+    try:
+        signature = source_signature(DATA_PATH)
+        if signature == dataset_signature:
+            return False
+        version = file_fingerprint(DATA_PATH)
+        reloaded = version != DATASET_VERSION
+        if reloaded:
+            debug_print(f"{DATA_PATH} changed, reloading dataset version {version}...")
+            new_df = pd.read_csv(DATA_PATH)
+            new_store = PopulationStore(new_df, cube_path=cube_path_for(DATA_PATH, version))
+            df, store, DATASET_VERSION = new_df, new_store, version
+            continents, countries = new_store.continents, new_store.countries
+            render_pool.restart()
+            debug_print(f"Reloaded {len(countries)} countries over {len(new_store.years)} years")
+        dataset_signature = signature
+        return reloaded
+    except Exception as e:
+        debug_print(f"Error reloading dataset: {str(e)}")
+        return False
+    finally:
+        dataset_reload_lock.release()
+
+@app.before_request
+def check_dataset():
+    """Pick up a replaced dataset without restarting the server"""
+    refresh_dataset()
+
+@app.before_request
+def start_request_probes():
+    """Note the time and process RSS as a request starts"""
+    g.request_started = time.perf_counter()
+    g.rss_probe = RssProbe()
+
+@app.after_request
+def record_request_stats(response):
+    """Record the request's duration and attribute its peak RSS to its endpoint"""
+    endpoint = request.endpoint or 'unknown'
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, status=response.status_code)
+    probe = g.pop('rss_probe', None)
+    if probe is not None:
+        request_memory.record(endpoint, probe.stop())
+    return response
+
 @app.route('/')
 def index():
     """Main route for the application"""
     debug_print("Rendering index page...")
     
     # Pass pivot year to template
-    continents = df['Continent'].unique()
-    countries = df['Country/Territory'].unique()
     return render_template("index.html", 
                           continents=continents, 
                           countries=countries,
@@ -121,115 +434,87 @@ def get_data():
         debug_print(f"Selected values - Continent: {continent}, Country: {country}")
         debug_print(f"Years - Start: {start_year}, End: {end_year}")
         
-        # Filter data based on selections
-        filtered_data = {}
-        
-        for selection_type in selection_types:
-            if selection_type == 'world':
-                filtered_data['world'] = df.copy()
-            elif selection_type == 'continent' and continent:
-                filtered_data['continent'] = df[df['Continent'] == continent]
-            elif selection_type == 'country' and country:
-                filtered_data['country'] = df[df['Country/Territory'] == country]
-        
-        # Filter by years for each selection
-        for key in filtered_data:
-            filtered_data[key] = filtered_data[key][
-                (filtered_data[key]['Year'] >= start_year) & 
-                (filtered_data[key]['Year'] <= end_year)
-            ]
-            debug_print(f"Filtered {key} data shape: {filtered_data[key].shape}")
-        
-        # Generate plots and store in MongoDB
+        names = {'world': None, 'continent': continent, 'country': country}
+        sections = [
+            section for section in ['world', 'continent', 'country']
+            if section in selection_types and (section == 'world' or names[section])
+        ]
+        if 'continent' in sections and continent not in store.continents:
+            return jsonify({'status': 'error', 'message': f'Unknown continent: {continent}'}), 404
+        if 'country' in sections and country not in store.country_index:
+            return jsonify({'status': 'error', 'message': f'Unknown country: {country}'}), 404
+
+        # Look up every plot in the render cache and collect the misses
         plot_ids = {}
+        plot_slots = {}
+        cache_keys = {}
         
-        # For world level
-        if 'world' in selection_types:
-            plot_ids['world'] = {}
-            world_plots = {
-                'population_graph': fig_to_base64(create_population_graph(filtered_data['world'], 'World Population', 'world')),
-                'population_maps': fig_to_base64(create_population_maps(filtered_data['world'], start_year, end_year, 'world')),
-                'density_graph': fig_to_base64(create_density_graph(filtered_data['world'], 'World Population Density', 'world')),
-                'density_maps': fig_to_base64(create_density_maps(filtered_data['world'], start_year, end_year, 'world')),
-                'growth_graph': fig_to_base64(create_growth_graph(filtered_data['world'], 'World Population Growth', 'world')),
-                'growth_maps': fig_to_base64(create_growth_maps(filtered_data['world'], start_year, end_year, 'world')),
-                'population_maps_continent_wise': fig_to_base64(create_population_maps(filtered_data['world'], start_year, end_year, 'world-continent-wise')),
-                'population_maps_country_wise': fig_to_base64(create_population_maps(filtered_data['world'], start_year, end_year, 'world-country-wise')),
-                'density_maps_continent_wise': fig_to_base64(create_density_maps(filtered_data['world'], start_year, end_year, 'world-continent-wise')),
-                'density_maps_country_wise': fig_to_base64(create_density_maps(filtered_data['world'], start_year, end_year, 'world-country-wise')),
-                'growth_maps_continent_wise': fig_to_base64(create_growth_maps(filtered_data['world'], start_year, end_year, 'world-continent-wise')),
-                'growth_maps_country_wise': fig_to_base64(create_growth_maps(filtered_data['world'], start_year, end_year, 'world-country-wise'))
-            }
-            
-            for plot_type, plot_data in world_plots.items():
-                if plot_data:
-                    metadata = {
-                        'section': 'world',
-                        'plot_type': plot_type,
-                        'selection': data
-                    }
-                    plot_id = save_plot_to_mongodb(plot_data, plot_type, metadata)
-                    if plot_id:
-                        plot_ids['world'][plot_type] = plot_id
+        client_plot_types = client_side_plot_types()
+        prerendered.refresh()
+        # Plots still rendering when the dataset reloads keep the version they were drawn from
+        dataset_version = DATASET_VERSION
         
-        # For continent level
-        if 'continent' in selection_types and continent:
-            plot_ids['continent'] = {}
-            continent_plots = {
-                'location_map': fig_to_base64(create_continent_location_map(continent)),
-                'population_graph': fig_to_base64(create_population_graph(filtered_data['continent'], f'{continent} Population', 'continent')),
-                'population_maps': fig_to_base64(create_population_maps(filtered_data['continent'], start_year, end_year, 'continent')),
-                'density_graph': fig_to_base64(create_density_graph(filtered_data['continent'], f'{continent} Population Density', 'continent')),
-                'density_maps': fig_to_base64(create_density_maps(filtered_data['continent'], start_year, end_year, 'continent')),
-                'growth_graph': fig_to_base64(create_growth_graph(filtered_data['continent'], f'{continent} Population Growth', 'continent')),
-                'growth_maps': fig_to_base64(create_growth_maps(filtered_data['continent'], start_year, end_year, 'continent')),
-                'population_pie_charts': fig_to_base64(create_population_pie_charts(filtered_data['continent'], start_year, end_year, 'continent', continent)),
-                'population_maps_country_wise': fig_to_base64(create_population_maps(filtered_data['continent'], start_year, end_year, 'continent-country-wise')),
-                'density_maps_country_wise': fig_to_base64(create_density_maps(filtered_data['continent'], start_year, end_year, 'continent-country-wise')),
-                'growth_maps_country_wise': fig_to_base64(create_growth_maps(filtered_data['continent'], start_year, end_year, 'continent-country-wise'))
-            }
-            
-            for plot_type, plot_data in continent_plots.items():
-                if plot_data:
-                    metadata = {
-                        'section': 'continent',
-                        'plot_type': plot_type,
-                        'selection': data
-                    }
-                    plot_id = save_plot_to_mongodb(plot_data, plot_type, metadata)
+        for section in sections:
+            plot_ids[section] = {}
+            plot_slots[section] = server_plot_types(section)
+            for plot_type in plot_slots[section]:
+                image_format = negotiate_image_format(plot_type)
+                selection = {
+                    'section': section,
+                    'name': names[section],
+                    'start_year': start_year,
+                    'end_year': end_year,
+                    'image_format': image_format
+                }
+                cache_key = render_cache.make_key(plot_type, selection, dataset_version)
+                plot_id = render_cache.get(cache_key)
+                spec = PlotSpec(section, plot_type, names[section], start_year, end_year,
+                                image_format=image_format)
+                if not plot_id:
+                    # Fall back to plots stored ahead of time by prerender.py
+                    plot_id = prerendered.lookup(spec, dataset_version)
+                    record(PRERENDER_LOOKUPS.name, 1, result='hit' if plot_id else 'miss')
                     if plot_id:
-                        plot_ids['continent'][plot_type] = plot_id
+                        render_cache.put(cache_key, plot_id)
+                if plot_id:
+                    plot_ids[section][plot_type] = plot_id
+                else:
+                    cache_keys[spec] = cache_key
         
-        # For country level
-        if 'country' in selection_types and country:
-            plot_ids['country'] = {}
-            country_plots = {
-                'location_map': fig_to_base64(create_country_location_map(country)),
-                'population_graph': fig_to_base64(create_population_graph(filtered_data['country'], f'{country} Population', 'country')),
-                'population_maps': fig_to_base64(create_population_maps(filtered_data['country'], start_year, end_year, 'country')),
-                'density_graph': fig_to_base64(create_density_graph(filtered_data['country'], f'{country} Population Density', 'country')),
-                'density_maps': fig_to_base64(create_density_maps(filtered_data['country'], start_year, end_year, 'country')),
-                'growth_graph': fig_to_base64(create_growth_graph(filtered_data['country'], f'{country} Population Growth', 'country')),
-                'growth_maps': fig_to_base64(create_growth_maps(filtered_data['country'], start_year, end_year, 'country')),
-                'population_pie_charts': fig_to_base64(create_population_pie_charts(filtered_data['country'], start_year, end_year, 'country', country))
-            }
-            
-            for plot_type, plot_data in country_plots.items():
-                if plot_data:
-                    metadata = {
-                        'section': 'country',
-                        'plot_type': plot_type,
-                        'selection': data
-                    }
-                    plot_id = save_plot_to_mongodb(plot_data, plot_type, metadata)
-                    if plot_id:
-                        plot_ids['country'][plot_type] = plot_id
+        def store_plots(results):
+            """Save a batch of rendered plots and remember them in the render cache"""
+            items = []
+            for spec, image_data in results:
+                metadata = {
+                    'section': spec.section,
+                    'plot_type': spec.plot_type,
+                    'selection': data,
+                    'dataset_version': dataset_version
+                }
+                items.append((image_data, spec.plot_type, metadata, IMAGE_MIMETYPES[spec.image_format]))
+            stored_ids = save_plots(items)
+            for (spec, _), plot_id in zip(results, stored_ids):
+                if plot_id:
+                    render_cache.put(cache_keys[spec], plot_id)
+            return stored_ids
+        
+        # Render the misses in the background, cheapest plots first, stored batch by batch
+        specs = sorted(cache_keys, key=lambda spec: plot_cost_rank(spec.plot_type))
+        batches = []
+        for _, group in itertools.groupby(specs, key=lambda spec: plot_cost_rank(spec.plot_type)):
+            group = list(group)
+            batches.extend(group[i:i + RENDER_BATCH_SIZE] for i in range(0, len(group), RENDER_BATCH_SIZE))
+        job = render_jobs.submit(plot_slots, batches, store_plots, plot_ids)
         
-        debug_print("app.py: Finished generating plots, returning to visualization.js")
+        debug_print(f"app.py: Queued render job {job.id} with {len(specs)} plots, returning to visualization.js")
         return jsonify({
             'status': 'success',
             'data': data,
-            'plot_ids': plot_ids
+            'job_id': job.id,
+            'plot_slots': plot_slots,
+            'plot_ids': plot_ids,
+            'client_plot_types': client_plot_types,
+            'pending': len(specs)
         })
         
     except Exception as e:
@@ -240,13 +525,286 @@ def get_data():
             'message': str(e)
         }), 500
 
+@app.route('/render_jobs/<job_id>')
+def render_job_status(job_id):
+    """Report which plots of a render job have finished so far"""
+    job = render_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Render job not found'}), 404
+    return jsonify({'status': 'success', **job.status()})
+
+@app.route('/render_jobs/<job_id>/events')
+def render_job_events(job_id):
+    """Stream each finished plot of a render job as a server-sent event"""
+    job = render_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Render job not found'}), 404
+    
+    # Resume after the last event the browser saw if it reconnects
+    try:
+        seen = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        seen = 0
+    
+    def generate():
+        position = seen
+        while True:
+            events = job.wait_for_events(position)
+            for event in events:
+                position += 1
+                yield f"id: {position}\ndata: {json.dumps(event)}\n\n"
+            if job.done and position >= len(job.events):
+                yield f"event: done\ndata: {json.dumps({'total': job.total})}\n\n"
+                return
+            if not events:
+                # Keep the connection alive while slow plots render
+                yield ": keep-alive\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/series')
+def api_series():
+    """Return yearly metric series of a country, continent or the world as compact columnar JSON"""
+    try:
+        level = request.args.get('level', 'world')
+        name = request.args.get('name')
+        metrics = request.args.get('metrics', ','.join(SERIES_METRICS)).split(',')
+        if level not in ('world', 'continent', 'country'):
+            return jsonify({'status': 'error', 'message': f'Unknown level: {level}'}), 400
+        if level == 'continent' and name not in store.continents:
+            return jsonify({'status': 'error', 'message': f'Unknown continent: {name}'}), 404
+        if level == 'country' and name not in store.country_index:
+            return jsonify({'status': 'error', 'message': f'Unknown country: {name}'}), 404
+        unknown = [metric for metric in metrics if metric not in SERIES_METRICS]
+        if unknown:
+            return jsonify({'status': 'error', 'message': f"Unknown metrics: {', '.join(unknown)}"}), 400
+        
+        series = {}
+        for metric in metrics:
+            years, values = store.series(level, name, SERIES_METRICS[metric])
+            # NaN is not valid JSON
+            series[metric] = [None if np.isnan(value) else float(value) for value in values]
+        
+        response = jsonify({
+            'status': 'success',
+            'level': level,
+            'name': name,
+            'pivot_year': PIVOT_YEAR,
+            'years': [int(year) for year in store.years],
+            # Entries before this index are historical, the rest are forecast
+            'forecast_start': int(np.searchsorted(store.years, PIVOT_YEAR, side='right')),
+            'series': series,
+            'dataset_version': DATASET_VERSION
+        })
+        response.cache_control.public = True
+        response.cache_control.max_age = 3600
+        return response
+    except Exception as e:
+        debug_print(f"Error in api_series: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/geometry/<frame_name>')
+def api_geometry(frame_name):
+    """Serve simplified country, continent or world shapes as pre-encoded GeoJSON"""
+    if frame_name not in FRAME_NAMES:
+        return jsonify({'status': 'error', 'message': f'Unknown geometry: {frame_name}'}), 404
+    tier = request.args.get('tier', next(reversed(geometries.tiers)))
+    if tier not in geometries.tiers:
+        return jsonify({'status': 'error', 'message': f'Unknown geometry tier: {tier}'}), 400
+    try:
+        compressed = 'gzip' in request.headers.get('Accept-Encoding', '')
+        response = Response(geometries.geojson(frame_name, tier, compressed=compressed),
+                            mimetype='application/geo+json')
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        response.set_etag(f"{frame_name}-{tier}-{SHAPEFILE_VERSION}")
+        # URLs pinned to the shapefile version never change content
+        response.cache_control.public = True
+        if request.args.get('v') == SHAPEFILE_VERSION:
+            response.cache_control.max_age = PLOT_CACHE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = 3600
+        return response.make_conditional(request)
+    except Exception as e:
+        debug_print(f"Error in api_geometry: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def choropleth_frame(level, year, name=None):
+    """Return one row per entity of a choropleth panel, keyed by the entity name in 'key'"""
+    if level == 'world-continent-wise':
+        return store.continent_year_frame(year).rename(columns={'Continent': 'key'})
+    frame = store.country_year_frame(year, name if level == 'continent-country-wise' else None)
+    return frame.rename(columns={'Country/Territory': 'key'})
+
+def choropleth_bins(metric, frame):
+    """Assign a panel's entities to their MAP_BINS classes; None where a value has no class"""
+    if metric == 'density':
+        # Density is classed on its precomputed min-max scale over the whole dataset
+        values = frame[SCALED_DENSITY]
+    elif metric == 'growth':
+        values = frame['Growth']
+    else:
+        values = frame['Population']
+    codes = pd.cut(values.to_numpy(dtype=float), bins=MAP_BINS[metric]['bins'], labels=False, include_lowest=True)
+    return [None if np.isnan(code) else int(code) for code in codes]
+
+@app.route('/api/choropleth')
+def api_choropleth():
+    """Return the per-entity values and bins of one map panel, for coloring shapes in the browser"""
+    try:
+        level = request.args.get('level', 'world-country-wise')
+        metric = request.args.get('metric', 'population')
+        name = request.args.get('name')
+        if level not in CHOROPLETH_LEVELS:
+            return jsonify({'status': 'error', 'message': f'Unknown level: {level}'}), 400
+        if metric not in MAP_BINS:
+            return jsonify({'status': 'error', 'message': f'Unknown metric: {metric}'}), 400
+        if level == 'continent-country-wise' and name not in store.continents:
+            return jsonify({'status': 'error', 'message': f'Unknown continent: {name}'}), 404
+        try:
+            year = int(request.args.get('year', PIVOT_YEAR))
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'year must be an integer'}), 400
+        if year not in store.year_index:
+            return jsonify({'status': 'error', 'message': f'No data for year: {year}'}), 404
+        
+        frame = choropleth_frame(level, year, name)
+        values = frame[SERIES_METRICS[metric]].to_numpy(dtype=float)
+        bins = MAP_BINS[metric]
+        cmap = get_colormap(bins['cmap'])
+        class_count = len(bins['labels'])
+        tier = map_tier('continent', name) if level == 'continent-country-wise' else map_tier('world')
+        
+        response = jsonify({
+            'status': 'success',
+            'level': level,
+            'name': name,
+            'metric': metric,
+            'year': year,
+            'title': map_title(metric, level, name, year),
+            'key_property': 'CONTINENT' if level == 'world-continent-wise' else 'NAME',
+            'keys': frame['key'].tolist(),
+            'values': [None if np.isnan(value) else float(value) for value in values],
+            'bins': choropleth_bins(metric, frame),
+            'bin_labels': bins['labels'],
+            # Same class colors as the rendered maps
+            'bin_colors': [to_hex(cmap(i / max(class_count - 1, 1))) for i in range(class_count)],
+            'geometry_url': f"/api/geometry/{CHOROPLETH_LEVELS[level]}?tier={tier}&v={SHAPEFILE_VERSION}",
+            'dataset_version': DATASET_VERSION
+        })
+        response.cache_control.public = True
+        response.cache_control.max_age = 3600
+        return response
+    except Exception as e:
+        debug_print(f"Error in api_choropleth: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/memory_stats')
+def memory_stats():
+    """Report RSS and live figures of this process and of the render workers"""
+    return jsonify({
+        'pid': os.getpid(),
+        'rss': current_rss(),
+        'peak_rss': peak_rss(),
+        'figures': figure_stats(),
+        'requests': request_memory.stats(),
+        'render_workers': render_pool.worker_stats()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose request, stage, cache and queue metrics in the Prometheus text format"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Report render cache hit and miss counters"""
+    return jsonify(render_cache.stats())
+
+# Line graph titles for /get_data and for the full-range /get_visualizations view
+GRAPH_TITLES = {
+    'population_graph': 'Population',
+    'density_graph': 'Population Density',
+    'growth_graph': 'Population Growth'
+}
+FORECAST_GRAPH_TITLES = {
+    'population_graph': 'Population Forecast',
+    'density_graph': 'Density Forecast',
+    'growth_graph': 'Growth Rate Forecast'
+}
+
+def build_section_figure(section, plot_type, name, start_year, end_year, full_range=False):
+    """Build the figure for one plot type of a world, continent or country section"""
+    if plot_type == 'location_map':
+        if section == 'country':
+            return create_country_location_map(name)
+        return create_continent_location_map(name)
+    if plot_type in GRAPH_TITLES:
+        if full_range and section == 'world':
+            title = f"World {FORECAST_GRAPH_TITLES[plot_type]}"
+        elif full_range:
+            title = f"{FORECAST_GRAPH_TITLES[plot_type]} for {name}"
+        else:
+            title = f"{'World' if section == 'world' else name} {GRAPH_TITLES[plot_type]}"
+        graph_builders = {
+            'population_graph': create_population_graph,
+            'density_graph': create_density_graph,
+            'growth_graph': create_growth_graph
+        }
+        if full_range:
+            return graph_builders[plot_type](name, title, section)
+        return graph_builders[plot_type](name, title, section, start_year, end_year)
+    if plot_type == 'population_pie_charts':
+        return create_population_pie_charts(start_year, end_year, section, name)
+    raise ValueError(f"Unknown plot type: {plot_type}")
+
+def render_plot_spec(spec):
+    """Render a PlotSpec to image bytes in its format; runs inside the render pool workers"""
+    if '_maps' in spec.plot_type:
+        return render_map_pair(spec.plot_type, spec.section, spec.name, spec.start_year, spec.end_year,
+                               spec.image_format)
+    with timed('create', spec.plot_type, spec.section):
+        fig = build_section_figure(spec.section, spec.plot_type, spec.name,
+                                   spec.start_year, spec.end_year, spec.full_range)
+    try:
+        with timed('encode', spec.plot_type, spec.section):
+            return fig_to_image(fig, spec.image_format, trim=spec.plot_type == 'location_map')
+    finally:
+        release_figure(fig)
+
 # Visualization Functions
+def map_tier(level, name=None, width_px=None):
+    """Pick the geometry tier for a map panel at the given zoom level"""
+    if width_px is None:
+        width_px = MAP_PANEL_FIGSIZE[0] * FIG_DPI
+    return geometries.tier_for(level, name, width_px)
+
+def warm_up():
+    """Build lazily derived data up front: every tier's encoded GeoJSON and every map's zoom extent
+
+    The production server runs this in the master before forking, so the
+    workers share the results instead of each building their own.
+    """
+    for tier in geometries.tiers:
+        for frame_name in FRAME_NAMES:
+            geometries.geojson(frame_name, tier)
+            geometries.geojson(frame_name, tier, compressed=True)
+    map_tier('world')
+    for continent in continents:
+        map_tier('continent', continent)
+    for country in countries:
+        map_tier('country', country)
+
 def create_country_location_map(country_name):
     """Create a map showing the selected country's location"""
-    country_shape = world[world['NAME'] == country_name]
-    other_countries = world[world['NAME'] != country_name]
+    tier = map_tier('world', width_px=15 * FIG_DPI)
+    country_shape = geometries.country(country_name, tier=tier)
+    other_countries = geometries.countries_outside(name=country_name, tier=tier)
     
-    fig, ax = plt.subplots(figsize=(15, 10))
+    fig, ax = new_figure(figsize=(15, 10), dpi=FIG_DPI, layout=FIGURE_LAYOUTS['location_map'])
     
     # Plot other countries in blue
     other_countries.plot(
@@ -273,39 +831,29 @@ def create_country_location_map(country_name):
 
 def create_continent_location_map(continent_name):
     """Create a map showing the selected continent's location"""
-    continent_shape = world[world['CONTINENT'] == continent_name]
-    other_continents = world[world['CONTINENT'] != continent_name]
+    tier = map_tier('world', width_px=15 * FIG_DPI)
+    continent_shape = geometries.countries_in(continent_name, tier=tier)
+    other_continents = geometries.countries_outside(continent_name=continent_name, tier=tier)
 
-    fig, ax = plt.subplots(figsize=(15, 10))
+    fig, ax = new_figure(figsize=(15, 10), dpi=FIG_DPI, layout=FIGURE_LAYOUTS['location_map'])
     other_continents.plot(ax=ax, color='lightgrey', edgecolor='black', linewidth=0.5)
     continent_shape.plot(ax=ax, color='orange', edgecolor='black', linewidth=0.5)
     ax.set_title(f"Location of {continent_name}")
     ax.axis('off')
     return fig
 
-def create_population_graph(data, title, level='country'):
+def plot_forecast_series(ax, years, values):
+    """Plot a series as a historical line up to PIVOT_YEAR and a dashed forecast after it"""
+    historical = years <= PIVOT_YEAR
+    ax.plot(years[historical], values[historical], label='Historical')
+    ax.plot(years[~historical], values[~historical], '--', label='Forecast')
+
+def create_population_graph(name, title, level='country', start_year=None, end_year=None):
     """Create population line graph for country, continent, or world"""
-    fig, ax = plt.subplots(figsize=(12, 6))
-    if level == 'country':
-        # Country: plot directly
-        hist_data = data[data['Year'] <= PIVOT_YEAR]
-        ax.plot(hist_data['Year'], hist_data['Population'], label='Historical')
-        forecast_data = data[data['Year'] > PIVOT_YEAR]
-        ax.plot(forecast_data['Year'], forecast_data['Population'], '--', label='Forecast')
-    elif level == 'continent':
-        # Continent: sum population for all countries in the continent
-        grouped = data.groupby('Year', as_index=False)['Population'].sum().sort_values('Year')
-        hist_data = grouped[grouped['Year'] <= PIVOT_YEAR]
-        ax.plot(hist_data['Year'], hist_data['Population'], label='Historical')
-        forecast_data = grouped[grouped['Year'] > PIVOT_YEAR]
-        ax.plot(forecast_data['Year'], forecast_data['Population'], '--', label='Forecast')
-    elif level == 'world':
-        # World: sum population for all countries
-        grouped = data.groupby('Year', as_index=False)['Population'].sum().sort_values('Year')
-        hist_data = grouped[grouped['Year'] <= PIVOT_YEAR]
-        ax.plot(hist_data['Year'], hist_data['Population'], label='Historical')
-        forecast_data = grouped[grouped['Year'] > PIVOT_YEAR]
-        ax.plot(forecast_data['Year'], forecast_data['Population'], '--', label='Forecast')
+    fig, ax = new_figure(figsize=(12, 6), dpi=FIG_DPI, layout=FIGURE_LAYOUTS['graph'])
+    with timed('filter', 'population_graph', level):
+        years, values = store.series(level, name, 'Population', start_year, end_year)
+    plot_forecast_series(ax, years, values)
     ax.set_title(title)
     ax.set_xlabel("Year")
     ax.set_ylabel("Population")
@@ -313,131 +861,112 @@ def create_population_graph(data, title, level='country'):
     ax.grid(True)
     return fig
 
-def create_population_maps(data, start_year, end_year, level='country'):
-    start_data = data[data['Year'] == start_year]
-    end_data = data[data['Year'] == end_year]
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 10))
-    pop_bins = [450, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 50_000_000,
-                100_000_000, 500_000_000, 1_000_000_000, 2_000_000_000,
-                4_000_000_000, 8_000_000_000]
-    pop_labels = [
-        '<1K', '1K–10K', '10K–100K', '100K–1M', '1M–10M', '10M–50M',
-        '50M–100M', '100M–500M', '500M–1B', '1B–2B', '2B–4B', '4B–8B'
-    ]
+def map_title(metric, level, name, year):
+    """Title of one year's map panel"""
+    title = MAP_BINS[metric]['title']
     if level == 'continent-country-wise':
-        continent_name = start_data['Continent'].iloc[0]
-        for ax, year_data, year in zip([ax1, ax2], [start_data, end_data], [start_year, end_year]):
-            countries = world[world['CONTINENT'] == continent_name]
-            merged = countries.merge(year_data[['Country/Territory', 'Population']],
-                                    left_on='NAME', right_on='Country/Territory', how='left')
-            merged['PopBin'] = pd.cut(merged['Population'], bins=pop_bins, labels=pop_labels, include_lowest=True)
-            merged.plot(column='PopBin', ax=ax, cmap='YlOrRd', legend=True)
-            ax.set_title(f"{continent_name} Country-wise Population in {year}")
-            ax.axis('off')
-    elif level == 'world-continent-wise':
-        for ax, year_data, year in zip([ax1, ax2], [start_data, end_data], [start_year, end_year]):
-            cont_pop = year_data.groupby('Continent')['Population'].sum().reset_index()
-            continents = world.dissolve(by='CONTINENT', as_index=False)
-            merged = continents.merge(cont_pop, left_on='CONTINENT', right_on='Continent', how='left')
-            merged['PopBin'] = pd.cut(merged['Population'], bins=pop_bins, labels=pop_labels, include_lowest=True)
-            merged.plot(column='PopBin', ax=ax, cmap='YlOrRd', legend=True)
-            ax.set_title(f"World Continent-wise Population in {year}")
-            ax.axis('off')
-    elif level == 'world-country-wise':
-        for ax, year_data, year in zip([ax1, ax2], [start_data, end_data], [start_year, end_year]):
-            merged = world.merge(year_data[['Country/Territory', 'Population']],
-                                left_on='NAME', right_on='Country/Territory', how='left')
-            merged['PopBin'] = pd.cut(merged['Population'], bins=pop_bins, labels=pop_labels, include_lowest=True)
-            merged.plot(column='PopBin', ax=ax, cmap='YlOrRd', legend=True)
-            ax.set_title(f"World Country-wise Population in {year}")
-            ax.axis('off')
-    elif level == 'country':
-        # Country: plot directly
-        country_name = start_data['Country/Territory'].iloc[0]
-        country_shape = world[world['NAME'] == country_name]
-        
-        # Calculate shared color scale
-        vmin = min(start_data['Population'].iloc[0], end_data['Population'].iloc[0])
-        vmax = max(start_data['Population'].iloc[0], end_data['Population'].iloc[0])
-        
-        # Plot start year
-        pop = start_data['Population'].iloc[0]
-        country_shape['Population'] = pop
-        country_shape.plot(column='Population', ax=ax1, cmap='YlOrRd', 
-                          legend=True, vmin=vmin, vmax=vmax)
-        ax1.set_title(f"{country_name} Population in {start_year}")
-        ax1.axis('off')
-        
-        # Plot end year
-        pop = end_data['Population'].iloc[0]
-        country_shape['Population'] = pop
-        country_shape.plot(column='Population', ax=ax2, cmap='YlOrRd', 
-                          legend=True, vmin=vmin, vmax=vmax)
-        ax2.set_title(f"{country_name} Population in {end_year}")
-        ax2.axis('off')
-    elif level == 'continent':
-        # Population maps
-        continent_name = start_data['Continent'].iloc[0]
-        continent_shape = world[world['CONTINENT'] == continent_name].dissolve(by='CONTINENT', as_index=False)
-        # Calculate total population for start and end years
-        pop_start = start_data['Population'].sum()
-        pop_end = end_data['Population'].sum()
-        vmin = min(pop_start, pop_end)
-        vmax = max(pop_start, pop_end)
-        # Plot start year
-        continent_shape['Population'] = pop_start
-        continent_shape.plot(column='Population', ax=ax1, cmap='YlOrRd', legend=True, vmin=vmin, vmax=vmax)
-        ax1.set_title(f"{continent_name} Population in {start_year}")
-        ax1.axis('off')
-        # Plot end year
-        continent_shape['Population'] = pop_end
-        continent_shape.plot(column='Population', ax=ax2, cmap='YlOrRd', legend=True, vmin=vmin, vmax=vmax)
-        ax2.set_title(f"{continent_name} Population in {end_year}")
-        ax2.axis('off')
-    elif level == 'world':
-        # Population maps
-        world_shape = world.dissolve().reset_index(drop=True)
-        pop_start = start_data['Population'].sum()
-        pop_end = end_data['Population'].sum()
-        vmin = min(pop_start, pop_end)
-        vmax = max(pop_start, pop_end)
-        # Plot start year
-        world_shape['Population'] = pop_start
-        world_shape.plot(column='Population', ax=ax1, cmap='YlOrRd', legend=True, vmin=vmin, vmax=vmax)
-        ax1.set_title(f"World Population in {start_year}")
-        ax1.axis('off')
-        # Plot end year
-        world_shape['Population'] = pop_end
-        world_shape.plot(column='Population', ax=ax2, cmap='YlOrRd', legend=True, vmin=vmin, vmax=vmax)
-        ax2.set_title(f"World Population in {end_year}")
-        ax2.axis('off')
-    
-    plt.tight_layout()
+        return f"{name} Country-wise {title} in {year}"
+    if level == 'world-continent-wise':
+        return f"World Continent-wise {title} in {year}"
+    if level == 'world-country-wise':
+        return f"World Country-wise {title} in {year}"
+    return f"{'World' if level == 'world' else name} {title} in {year}"
+
+def create_map_panel(metric, year, level='country', name=None):
+    """Create one year's map of a metric for a country, continent or the world
+
+    Binned maps use the fixed MAP_BINS classes and single-shape maps scale
+    colors over the entity's whole series, so a panel looks the same
+    whichever other year it is shown next to.
+    """
+    bins = MAP_BINS[metric]
+    column = SERIES_METRICS[metric]
+    fig, ax = new_figure(figsize=MAP_PANEL_FIGSIZE, dpi=FIG_DPI, layout=FIGURE_LAYOUTS['map_panel'])
+    if level in CHOROPLETH_LEVELS:
+        if level == 'continent-country-wise':
+            shapes = geometries.countries_in(name, tier=map_tier('continent', name))
+        elif level == 'world-continent-wise':
+            shapes = geometries.continents(tier=map_tier('world'))
+        else:
+            shapes = geometries.countries(tier=map_tier('world'))
+        key = 'CONTINENT' if level == 'world-continent-wise' else 'NAME'
+        with timed('filter', f"{metric}_map_panel", level):
+            frame = choropleth_frame(level, year, name)
+            codes = [-1 if code is None else code for code in choropleth_bins(metric, frame)]
+        classes = pd.DataFrame({
+            key: frame['key'],
+            'Class': pd.Categorical.from_codes(codes, categories=bins['labels'])
+        })
+        merged = shapes[[key, 'geometry']].merge(classes, on=key, how='left')
+        merged.plot(column='Class', ax=ax, cmap=bins['cmap'], legend=True, missing_kwds=MAP_MISSING_STYLE)
+    else:
+        if level == 'country':
+            shape = geometries.country(name, tier=map_tier('country', name))
+        elif level == 'continent':
+            shape = geometries.continent(name, tier=map_tier('continent', name))
+        else:
+            shape = geometries.world_outline(tier=map_tier('world'))
+        # Shared color scale: the entity's range over every year
+        with timed('filter', f"{metric}_map_panel", level):
+            _, series = store.series(level, name, column)
+            value = store.value(level, name, column, year)
+        finite = series[np.isfinite(series)]
+        vmin, vmax = (finite.min(), finite.max()) if finite.size else (0, 1)
+        shape = shape.assign(**{column: value})
+        shape.plot(column=column, ax=ax, cmap=bins['cmap'], legend=True, vmin=vmin, vmax=vmax,
+                   missing_kwds=MAP_MISSING_STYLE)
+    ax.set_title(map_title(metric, level, name, year))
+    ax.axis('off')
     return fig
 
-def create_density_graph(data, title, level='country'):
+def render_map_panel(metric, year, level, name=None):
+    """Render one map panel to PNG bytes, reusing it from the panel cache when possible"""
+    key = (metric, level, name, int(year), DATASET_VERSION, SHAPEFILE_VERSION, RENDERER_VERSION)
+    image_data = panel_cache.get(key)
+    record(PANEL_LOOKUPS.name, 1, result='hit' if image_data is not None else 'miss')
+    if image_data is None:
+        plot_type = f"{metric}_map_panel"
+        with timed('create', plot_type, level):
+            fig = create_map_panel(metric, year, level, name)
+        try:
+            with timed('encode', plot_type, level):
+                image_data = fig_to_image(fig, 'png', trim=True)
+        finally:
+            release_figure(fig)
+        panel_cache.put(key, image_data)
+    return image_data
+
+def compose_panels(images, image_format='png'):
+    """Place PNG panels side by side on a white background and return them encoded as image_format"""
+    from PIL import Image
+    panels = [np.asarray(Image.open(io.BytesIO(image_data)).convert('RGB')) for image_data in images]
+    height = max(panel.shape[0] for panel in panels)
+    pixels = np.full((height, sum(panel.shape[1] for panel in panels), 3), 255, dtype=np.uint8)
+    left = 0
+    for panel in panels:
+        pixels[:panel.shape[0], left:left + panel.shape[1]] = panel
+        left += panel.shape[1]
+    return figure_encoder.encode_pixels(pixels, image_format)
+
+def render_map_pair(plot_type, section, name, start_year, end_year, image_format='png'):
+    """Render a two-year map as its start and end year panels, side by side"""
+    metric, _, suffix = plot_type.partition('_maps')
+    if metric not in MAP_BINS:
+        raise ValueError(f"Unknown plot type: {plot_type}")
+    # '<metric>_maps' or '<metric>_maps_<continent|country>_wise'
+    level = section
+    if suffix:
+        level = f"{section}-{suffix.strip('_').replace('_', '-')}"
+    panels = [render_map_panel(metric, year, level, name) for year in (start_year, end_year)]
+    with timed('compose', plot_type, level):
+        return compose_panels(panels, image_format)
+
+def create_density_graph(name, title, level='country', start_year=None, end_year=None):
     """Create density line graph for country, continent, or world"""
-    fig, ax = plt.subplots(figsize=(12, 6))
-    if level == 'country':
-        hist_data = data[data['Year'] <= PIVOT_YEAR]
-        ax.plot(hist_data['Year'], hist_data['Density'], label='Historical')
-        forecast_data = data[data['Year'] > PIVOT_YEAR]
-        ax.plot(forecast_data['Year'], forecast_data['Density'], '--', label='Forecast')
-    elif level == 'continent':
-        # For each year, sum population and area, then compute density
-        grouped = data.groupby('Year').agg({'Population': 'sum', 'Area (km²)': 'sum'}).reset_index()
-        grouped['Density'] = grouped['Population'] / grouped['Area (km²)']
-        hist_data = grouped[grouped['Year'] <= PIVOT_YEAR]
-        ax.plot(hist_data['Year'], hist_data['Density'], label='Historical')
-        forecast_data = grouped[grouped['Year'] > PIVOT_YEAR]
-        ax.plot(forecast_data['Year'], forecast_data['Density'], '--', label='Forecast')
-    elif level == 'world':
-        grouped = data.groupby('Year').agg({'Population': 'sum', 'Area (km²)': 'sum'}).reset_index()
-        grouped['Density'] = grouped['Population'] / grouped['Area (km²)']
-        hist_data = grouped[grouped['Year'] <= PIVOT_YEAR]
-        ax.plot(hist_data['Year'], hist_data['Density'], label='Historical')
-        forecast_data = grouped[grouped['Year'] > PIVOT_YEAR]
-        ax.plot(forecast_data['Year'], forecast_data['Density'], '--', label='Forecast')
+    fig, ax = new_figure(figsize=(12, 6), dpi=FIG_DPI, layout=FIGURE_LAYOUTS['graph'])
+    with timed('filter', 'density_graph', level):
+        years, values = store.series(level, name, 'Density', start_year, end_year)
+    plot_forecast_series(ax, years, values)
     ax.set_title(title)
     ax.set_xlabel("Year")
     ax.set_ylabel("Density")
@@ -445,162 +974,12 @@ def create_density_graph(data, title, level='country'):
     ax.grid(True)
     return fig
 
-def create_density_maps(data, start_year, end_year, level='country'):
-    # Recalculate density to ensure consistency
-    data['Density'] = data['Population'] / data['Area (km²)']  
-    # Global MinMax scaling for all years combined
-    global_scaler = MinMaxScaler()
-    data['Density_scaled'] = global_scaler.fit_transform(data[['Density']].fillna(0))    
-    start_data = data[data['Year'] == start_year]
-    end_data = data[data['Year'] == end_year]
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 10))
-    density_bins = [0, 0.000025, 0.00005, 0.000075, 0.0001, 0.0005, 0.001, 0.005,
-                    0.01, 0.05, 0.1, 0.2, 0.5, 0.75, 1]
-    density_labels = [
-        '<2.5e-5', '2.5e-5–5e-5', '5e-5–7.5e-5', '7.5e-5–1e-4', '1e-4–5e-4', '5e-4–1e-3',
-        '1e-3–5e-3', '5e-3–1e-2', '1e-2–0.05', '0.05–0.1', '0.1–0.2', '0.2–0.5', '0.5–0.75', '0.75–1'
-    ]
-
-    if level == 'continent-country-wise':
-        continent_name = start_data['Continent'].iloc[0]
-        for ax, year_data, year in zip([ax1, ax2], [start_data, end_data], [start_year, end_year]):
-            countries = world[world['CONTINENT'] == continent_name]
-            merged = countries.merge(
-                year_data[['Country/Territory', 'Density_scaled']],
-                left_on='NAME', right_on='Country/Territory', how='left'
-            )
-            merged['DensityBin'] = pd.cut(
-                merged['Density_scaled'].fillna(0),
-                bins=density_bins, labels=density_labels, include_lowest=True
-            )
-            merged.plot(column='DensityBin', ax=ax, cmap='viridis', legend=True)
-            ax.set_title(f"{continent_name} Country-wise Density in {year}")
-            ax.axis('off')
-
-    elif level == 'world-continent-wise':
-        for ax, year_data, year in zip([ax1, ax2], [start_data, end_data], [start_year, end_year]):
-            cont_density = year_data.groupby('Continent').agg({'Population': 'sum', 'Area (km²)': 'sum'}).reset_index()
-            cont_density['Density'] = cont_density['Population'] / cont_density['Area (km²)']
-            cont_density['Density_scaled'] = global_scaler.transform(cont_density[['Density']].fillna(0))
-            continents = world.dissolve(by='CONTINENT', as_index=False)
-            merged = continents.merge(
-                cont_density[['Continent', 'Density_scaled']],
-                left_on='CONTINENT', right_on='Continent', how='left'
-            )
-            merged['DensityBin'] = pd.cut(
-                merged['Density_scaled'].fillna(0),
-                bins=density_bins, labels=density_labels, include_lowest=True
-            )
-            merged.plot(column='DensityBin', ax=ax, cmap='viridis', legend=True)
-            ax.set_title(f"World Continent-wise Density in {year}")
-            ax.axis('off')
-
-    elif level == 'world-country-wise':
-        for ax, year_data, year in zip([ax1, ax2], [start_data, end_data], [start_year, end_year]):
-            merged = world.merge(
-                year_data[['Country/Territory', 'Density_scaled']],
-                left_on='NAME', right_on='Country/Territory', how='left'
-            )
-            merged['DensityBin'] = pd.cut(
-                merged['Density_scaled'].fillna(0),
-                bins=density_bins, labels=density_labels, include_lowest=True
-            )
-            merged.plot(column='DensityBin', ax=ax, cmap='viridis', legend=True)
-            ax.set_title(f"World Country-wise Density in {year}")
-            ax.axis('off')
-    elif level == 'country':
-        country_name = start_data['Country/Territory'].iloc[0]
-        country_shape = world[world['NAME'] == country_name]
-        
-        # Calculate shared color scale
-        vmin = min(start_data['Density'].iloc[0], end_data['Density'].iloc[0])
-        vmax = max(start_data['Density'].iloc[0], end_data['Density'].iloc[0])
-        
-        # Plot start year
-        dens = start_data['Density'].iloc[0]
-        country_shape['Density'] = dens
-        country_shape.plot(column='Density', ax=ax1, cmap='viridis', 
-                          legend=True, vmin=vmin, vmax=vmax)
-        ax1.set_title(f"{country_name} Density in {start_year}")
-        ax1.axis('off')
-        
-        # Plot end year
-        dens = end_data['Density'].iloc[0]
-        country_shape['Density'] = dens
-        country_shape.plot(column='Density', ax=ax2, cmap='viridis', 
-                          legend=True, vmin=vmin, vmax=vmax)
-        ax2.set_title(f"{country_name} Density in {end_year}")
-        ax2.axis('off')
-    elif level == 'continent':
-        # Density maps
-        continent_name = start_data['Continent'].iloc[0]
-        continent_shape = world[world['CONTINENT'] == continent_name].dissolve(by='CONTINENT', as_index=False)
-        # Calculate total population and area for start and end years
-        pop_start = start_data['Population'].sum()
-        area_start = start_data['Area (km²)'].sum()
-        dens_start = pop_start / area_start if area_start > 0 else 0
-        pop_end = end_data['Population'].sum()
-        area_end = end_data['Area (km²)'].sum()
-        dens_end = pop_end / area_end if area_end > 0 else 0
-        vmin = min(dens_start, dens_end)
-        vmax = max(dens_start, dens_end)
-        # Plot start year
-        continent_shape['Density'] = dens_start
-        continent_shape.plot(column='Density', ax=ax1, cmap='viridis', legend=True, vmin=vmin, vmax=vmax)
-        ax1.set_title(f"{continent_name} Density in {start_year}")
-        ax1.axis('off')
-        # Plot end year
-        continent_shape['Density'] = dens_end
-        continent_shape.plot(column='Density', ax=ax2, cmap='viridis', legend=True, vmin=vmin, vmax=vmax)
-        ax2.set_title(f"{continent_name} Density in {end_year}")
-        ax2.axis('off')
-    elif level == 'world':
-        # Density maps
-        world_shape = world.dissolve().reset_index(drop=True)
-        pop_start = start_data['Population'].sum()
-        area_start = start_data['Area (km²)'].sum()
-        dens_start = pop_start / area_start if area_start > 0 else 0
-        pop_end = end_data['Population'].sum()
-        area_end = end_data['Area (km²)'].sum()
-        dens_end = pop_end / area_end if area_end > 0 else 0
-        vmin = min(dens_start, dens_end)
-        vmax = max(dens_start, dens_end)
-        # Plot start year
-        world_shape['Density'] = dens_start
-        world_shape.plot(column='Density', ax=ax1, cmap='viridis', legend=True, vmin=vmin, vmax=vmax)
-        ax1.set_title(f"World Density in {start_year}")
-        ax1.axis('off')
-        # Plot end year
-        world_shape['Density'] = dens_end
-        world_shape.plot(column='Density', ax=ax2, cmap='viridis', legend=True, vmin=vmin, vmax=vmax)
-        ax2.set_title(f"World Density in {end_year}")
-        ax2.axis('off')
-    
-    plt.tight_layout()
-    return fig
-
-def create_growth_graph(data, title, level='country'):
+def create_growth_graph(name, title, level='country', start_year=None, end_year=None):
     """Create growth line graph for country, continent, or world"""
-    fig, ax = plt.subplots(figsize=(12, 6))
-    if level == 'country':
-        hist_data = data[data['Year'] <= PIVOT_YEAR]
-        ax.plot(hist_data['Year'], hist_data['Growth'], label='Historical')
-        forecast_data = data[data['Year'] > PIVOT_YEAR]
-        ax.plot(forecast_data['Year'], forecast_data['Growth'], '--', label='Forecast')
-    elif level == 'continent':
-        grouped = data.groupby('Year', as_index=False)['Population'].sum().sort_values('Year')
-        grouped['Growth'] = grouped['Population'].pct_change().bfill()
-        hist_data = grouped[grouped['Year'] <= PIVOT_YEAR]
-        ax.plot(hist_data['Year'], hist_data['Growth'], label='Historical')
-        forecast_data = grouped[grouped['Year'] > PIVOT_YEAR]
-        ax.plot(forecast_data['Year'], forecast_data['Growth'], '--', label='Forecast')
-    elif level == 'world':
-        grouped = data.groupby('Year', as_index=False)['Population'].sum().sort_values('Year')
-        grouped['Growth'] = grouped['Population'].pct_change().bfill()
-        hist_data = grouped[grouped['Year'] <= PIVOT_YEAR]
-        ax.plot(hist_data['Year'], hist_data['Growth'], label='Historical')
-        forecast_data = grouped[grouped['Year'] > PIVOT_YEAR]
-        ax.plot(forecast_data['Year'], forecast_data['Growth'], '--', label='Forecast')
+    fig, ax = new_figure(figsize=(12, 6), dpi=FIG_DPI, layout=FIGURE_LAYOUTS['graph'])
+    with timed('filter', 'growth_graph', level):
+        years, values = store.series(level, name, 'Growth', start_year, end_year)
+    plot_forecast_series(ax, years, values)
     ax.set_title(title)
     ax.set_xlabel("Year")
     ax.set_ylabel("Growth Rate")
@@ -608,155 +987,19 @@ def create_growth_graph(data, title, level='country'):
     ax.grid(True)
     return fig
 
-
-def create_growth_maps(data, start_year, end_year, level='country'):
-    start_data = data[data['Year'] == start_year]
-    end_data = data[data['Year'] == end_year]
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 10))
-    
-    growth_bins = [-0.1, -0.05, -0.01, 0, 0.01, 0.02, 0.05, 0.1, 0.2, 1]
-    growth_labels = [
-        '<-5%', '-5% to -1%', '-1% to 0%', '0% to 1%', '1% to 2%',
-        '2% to 5%', '5% to 10%', '10% to 20%', '>20%'
-    ]
-    
-    if level == 'continent-country-wise':
-        continent_name = start_data['Continent'].iloc[0]
-        for ax, year_data, year in zip([ax1, ax2], [start_data, end_data], [start_year, end_year]):
-            countries = world[world['CONTINENT'] == continent_name]
-            merged = countries.merge(
-                year_data[['Country/Territory', 'Growth']],
-                left_on='NAME', right_on='Country/Territory', how='left'
-            )
-            merged['GrowthBin'] = pd.cut(
-                merged['Growth'].fillna(0),
-                bins=growth_bins, labels=growth_labels, include_lowest=True
-            )
-            merged.plot(column='GrowthBin', ax=ax, cmap='RdYlGn', legend=True)
-            ax.set_title(f"{continent_name} Country-wise Growth in {year}")
-            ax.axis('off')
-
-    elif level == 'world-continent-wise':
-        growths = []
-        for continent in data['Continent'].unique():
-            cont_data = data[data['Continent'] == continent].groupby('Year', as_index=False)['Population'].sum().sort_values('Year')
-            cont_data['Growth'] = cont_data['Population'].pct_change().bfill()
-            for year in [start_year, end_year]:
-                row = cont_data[cont_data['Year'] == year]
-                if not row.empty:
-                    growths.append({'Continent': continent, 'Year': year, 'Growth': row['Growth'].values[0]})
-        growths_df = pd.DataFrame(growths)
-        continents = world.dissolve(by='CONTINENT', as_index=False)
-        for ax, year, label in zip([ax1, ax2], [start_year, end_year], [f"World Continent-wise Growth in {start_year}", f"World Continent-wise Growth in {end_year}"]):
-            year_growth = growths_df[growths_df['Year'] == year][['Continent', 'Growth']]
-            merged = continents.merge(
-                year_growth, left_on='CONTINENT', right_on='Continent', how='left'
-            )
-            merged['GrowthBin'] = pd.cut(
-                merged['Growth'].fillna(0),
-                bins=growth_bins, labels=growth_labels, include_lowest=True
-            )
-            merged.plot(column='GrowthBin', ax=ax, cmap='RdYlGn', legend=True)
-            ax.set_title(label)
-            ax.axis('off')
-
-    elif level == 'world-country-wise':
-        for ax, year_data, year in zip([ax1, ax2], [start_data, end_data], [start_year, end_year]):
-            merged = world.merge(
-                year_data[['Country/Territory', 'Growth']],
-                left_on='NAME', right_on='Country/Territory', how='left'
-            )
-            merged['GrowthBin'] = pd.cut(
-                merged['Growth'].fillna(0),
-                bins=growth_bins, labels=growth_labels, include_lowest=True
-            )
-            merged.plot(column='GrowthBin', ax=ax, cmap='RdYlGn', legend=True)
-            ax.set_title(f"World Country-wise Growth in {year}")
-            ax.axis('off')
-
-    elif level == 'country':
-        country_name = start_data['Country/Territory'].iloc[0]
-        country_shape = world[world['NAME'] == country_name]
-        
-        # Calculate shared color scale
-        vmin = min(start_data['Growth'].iloc[0], end_data['Growth'].iloc[0])
-        vmax = max(start_data['Growth'].iloc[0], end_data['Growth'].iloc[0])
-        
-        # Plot start year
-        growth = start_data['Growth'].iloc[0]
-        country_shape['Growth'] = growth
-        country_shape.plot(column='Growth', ax=ax1, cmap='RdYlGn', 
-                          legend=True, vmin=vmin, vmax=vmax)
-        ax1.set_title(f"{country_name} Growth in {start_year}")
-        ax1.axis('off')
-        
-        # Plot end year
-        growth = end_data['Growth'].iloc[0]
-        country_shape['Growth'] = growth
-        country_shape.plot(column='Growth', ax=ax2, cmap='RdYlGn', 
-                          legend=True, vmin=vmin, vmax=vmax)
-        ax2.set_title(f"{country_name} Growth in {end_year}")
-        ax2.axis('off')
-    elif level == 'continent':
-        continent_name = start_data['Continent'].iloc[0]
-        # Calculate growth as in the graph: sum population by year, then pct_change().bfill()
-        grouped = data.groupby('Year', as_index=False)['Population'].sum().sort_values('Year')
-        grouped['Growth'] = grouped['Population'].pct_change().bfill()
-        growth_start = grouped[grouped['Year'] == start_year]['Growth'].values[0]
-        growth_end = grouped[grouped['Year'] == end_year]['Growth'].values[0]
-        vmin = min(growth_start, growth_end)
-        vmax = max(growth_start, growth_end)
-        continent_shape = world[world['CONTINENT'] == continent_name].dissolve(by='CONTINENT', as_index=False)
-        # Plot start year
-        continent_shape['Growth'] = growth_start
-        continent_shape.plot(column='Growth', ax=ax1, cmap='RdYlGn', legend=True, vmin=vmin, vmax=vmax)
-        ax1.set_title(f"{continent_name} Growth in {start_year}")
-        ax1.axis('off')
-        # Plot end year
-        continent_shape['Growth'] = growth_end
-        continent_shape.plot(column='Growth', ax=ax2, cmap='RdYlGn', legend=True, vmin=vmin, vmax=vmax)
-        ax2.set_title(f"{continent_name} Growth in {end_year}")
-        ax2.axis('off')
-    elif level == 'world':
-        # Calculate growth as in the graph: sum population by year, then pct_change().bfill()
-        grouped = data.groupby('Year', as_index=False)['Population'].sum().sort_values('Year')
-        grouped['Growth'] = grouped['Population'].pct_change().bfill()
-        growth_start = grouped[grouped['Year'] == start_year]['Growth'].values[0]
-        growth_end = grouped[grouped['Year'] == end_year]['Growth'].values[0]
-        vmin = min(growth_start, growth_end)
-        vmax = max(growth_start, growth_end)
-        world_shape = world.dissolve().reset_index(drop=True)
-        # Plot start year
-        world_shape['Growth'] = growth_start
-        world_shape.plot(column='Growth', ax=ax1, cmap='RdYlGn', legend=True, vmin=vmin, vmax=vmax)
-        ax1.set_title(f"World Growth in {start_year}")
-        ax1.axis('off')
-        # Plot end year
-        world_shape['Growth'] = growth_end
-        world_shape.plot(column='Growth', ax=ax2, cmap='RdYlGn', legend=True, vmin=vmin, vmax=vmax)
-        ax2.set_title(f"World Growth in {end_year}")
-        ax2.axis('off')
-    
-    plt.tight_layout()
-    return fig
-
-def create_population_pie_charts(data, start_year, end_year, level='country', name=None):
+def create_population_pie_charts(start_year, end_year, level='country', name=None):
     """Create population pie charts for start and end years"""
-    # Get data for both years
-    start_data = data[data['Year'] == start_year]
-    end_data = data[data['Year'] == end_year]
-    
     # Create figure with two subplots
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 7))
+    fig, (ax1, ax2) = new_figure(figsize=(15, 7), ncols=2, dpi=FIG_DPI, layout=FIGURE_LAYOUTS['pie_charts'])
     
     if level == 'country':
-        # Calculate total world population
-        world_pop_start = df[df['Year'] == start_year]['Population'].sum()
-        world_pop_end = df[df['Year'] == end_year]['Population'].sum()
+        # Total world population
+        world_pop_start = store.value('world', None, 'Population', start_year)
+        world_pop_end = store.value('world', None, 'Population', end_year)
         
         # Get country population
-        country_pop_start = start_data['Population'].sum()
-        country_pop_end = end_data['Population'].sum()
+        country_pop_start = store.value('country', name, 'Population', start_year)
+        country_pop_end = store.value('country', name, 'Population', end_year)
         
         # Create pie charts
         ax1.pie([country_pop_start, world_pop_start - country_pop_start],
@@ -772,13 +1015,13 @@ def create_population_pie_charts(data, start_year, end_year, level='country', na
         ax2.set_title(f"Population Share in {end_year}")
     
     elif level == 'continent':
-        # Calculate total world population
-        world_pop_start = df[df['Year'] == start_year]['Population'].sum()
-        world_pop_end = df[df['Year'] == end_year]['Population'].sum()
+        # Total world population
+        world_pop_start = store.value('world', None, 'Population', start_year)
+        world_pop_end = store.value('world', None, 'Population', end_year)
         
         # Get continent population
-        continent_pop_start = start_data['Population'].sum()
-        continent_pop_end = end_data['Population'].sum()
+        continent_pop_start = store.value('continent', name, 'Population', start_year)
+        continent_pop_end = store.value('continent', name, 'Population', end_year)
         
         # Create pie charts
         ax1.pie([continent_pop_start, world_pop_start - continent_pop_start],
@@ -810,110 +1053,22 @@ def get_visualizations():
         end_year = int(data.get('end_year', 2032))
         
         visualizations = {}
+        names = {'world': None, 'continent': continent, 'country': country}
         
+        # Render every requested section in one batch across the process pool
+        specs = []
         for selection_type in selection_types:
-            if selection_type == 'country' and country:
-                # Country level visualizations
-                country_data = df[df['Country/Territory'] == country]
-                
-                # Create figures
-                location_map = create_country_location_map(country)
-                population_graph = create_population_graph(country_data, f"Population Forecast for {country}", 'country')
-                population_maps = create_population_maps(country_data, start_year, end_year, 'country')
-                density_graph = create_density_graph(country_data, f"Density Forecast for {country}", 'country')
-                density_maps = create_density_maps(country_data, start_year, end_year, 'country')
-                growth_graph = create_growth_graph(country_data, f"Growth Rate Forecast for {country}", 'country')
-                growth_maps = create_growth_maps(country_data, start_year, end_year, 'country')
-                population_pie_charts = create_population_pie_charts(country_data, start_year, end_year, 'country', country)
-                
-                # Convert figures to base64 strings
-                visualizations['country'] = {
-                    'location_map': fig_to_base64(location_map),
-                    'population_graph': fig_to_base64(population_graph),
-                    'population_maps': fig_to_base64(population_maps),
-                    'density_graph': fig_to_base64(density_graph),
-                    'density_maps': fig_to_base64(density_maps),
-                    'growth_graph': fig_to_base64(growth_graph),
-                    'growth_maps': fig_to_base64(growth_maps),
-                    'population_pie_charts': fig_to_base64(population_pie_charts)
-                }
-                
-                # Close figures to free memory
-                plt.close('all')
-            
-            elif selection_type == 'continent' and continent:
-                # Continent level visualizations
-                continent_data = df[df['Continent'] == continent]
-                
-                # Create figures
-                location_map = create_continent_location_map(continent)
-                population_graph = create_population_graph(continent_data, f"Population Forecast for {continent}", 'continent')
-                population_maps = create_population_maps(continent_data, start_year, end_year, 'continent')
-                density_graph = create_density_graph(continent_data, f"Density Forecast for {continent}", 'continent')
-                density_maps = create_density_maps(continent_data, start_year, end_year, 'continent')
-                growth_graph = create_growth_graph(continent_data, f"Growth Rate Forecast for {continent}", 'continent')
-                growth_maps = create_growth_maps(continent_data, start_year, end_year, 'continent')
-                population_pie_charts = create_population_pie_charts(continent_data, start_year, end_year, 'continent', continent)
-                # New: Country-wise maps for continent
-                population_maps_country_wise = create_population_maps(continent_data, start_year, end_year, 'continent-country-wise')
-                density_maps_country_wise = create_density_maps(continent_data, start_year, end_year, 'continent-country-wise')
-                growth_maps_country_wise = create_growth_maps(continent_data, start_year, end_year, 'continent-country-wise')
-                
-                # Convert figures to base64 strings
-                visualizations['continent'] = {
-                    'location_map': fig_to_base64(location_map),
-                    'population_graph': fig_to_base64(population_graph),
-                    'population_maps': fig_to_base64(population_maps),
-                    'density_graph': fig_to_base64(density_graph),
-                    'density_maps': fig_to_base64(density_maps),
-                    'growth_graph': fig_to_base64(growth_graph),
-                    'growth_maps': fig_to_base64(growth_maps),
-                    'population_pie_charts': fig_to_base64(population_pie_charts),
-                    'population_maps_country_wise': fig_to_base64(population_maps_country_wise),
-                    'density_maps_country_wise': fig_to_base64(density_maps_country_wise),
-                    'growth_maps_country_wise': fig_to_base64(growth_maps_country_wise)
-                }
-                
-                # Close figures to free memory
-                plt.close('all')
-            
-            elif selection_type == 'world':
-                # World level visualizations
-                world_data = df.copy()
-                
-                # Create figures
-                population_graph = create_population_graph(world_data, "World Population Forecast", 'world')
-                population_maps = create_population_maps(world_data, start_year, end_year, 'world')
-                density_graph = create_density_graph(world_data, "World Density Forecast", 'world')
-                density_maps = create_density_maps(world_data, start_year, end_year, 'world')
-                growth_graph = create_growth_graph(world_data, "World Growth Rate Forecast", 'world')
-                growth_maps = create_growth_maps(world_data, start_year, end_year, 'world')
-                # New: Continent-wise and country-wise maps for world
-                population_maps_continent_wise = create_population_maps(world_data, start_year, end_year, 'world-continent-wise')
-                population_maps_country_wise = create_population_maps(world_data, start_year, end_year, 'world-country-wise')
-                density_maps_continent_wise = create_density_maps(world_data, start_year, end_year, 'world-continent-wise')
-                density_maps_country_wise = create_density_maps(world_data, start_year, end_year, 'world-country-wise')
-                growth_maps_continent_wise = create_growth_maps(world_data, start_year, end_year, 'world-continent-wise')
-                growth_maps_country_wise = create_growth_maps(world_data, start_year, end_year, 'world-country-wise')
-                
-                # Convert figures to base64 strings
-                visualizations['world'] = {
-                    'population_graph': fig_to_base64(population_graph),
-                    'population_maps': fig_to_base64(population_maps),
-                    'density_graph': fig_to_base64(density_graph),
-                    'density_maps': fig_to_base64(density_maps),
-                    'growth_graph': fig_to_base64(growth_graph),
-                    'growth_maps': fig_to_base64(growth_maps),
-                    'population_maps_continent_wise': fig_to_base64(population_maps_continent_wise),
-                    'population_maps_country_wise': fig_to_base64(population_maps_country_wise),
-                    'density_maps_continent_wise': fig_to_base64(density_maps_continent_wise),
-                    'density_maps_country_wise': fig_to_base64(density_maps_country_wise),
-                    'growth_maps_continent_wise': fig_to_base64(growth_maps_continent_wise),
-                    'growth_maps_country_wise': fig_to_base64(growth_maps_country_wise)
-                }
-                
-                # Close figures to free memory
-                plt.close('all')
+            if selection_type not in SECTION_PLOT_TYPES:
+                continue
+            if selection_type != 'world' and not names[selection_type]:
+                continue
+            for plot_type in SECTION_PLOT_TYPES[selection_type]:
+                specs.append(PlotSpec(selection_type, plot_type, names[selection_type],
+                                      start_year, end_year, full_range=True))
+        
+        for spec, image_data in zip(specs, render_pool.render(specs)):
+            visualizations.setdefault(spec.section, {})[spec.plot_type] = \
+                base64.b64encode(image_data).decode('utf-8')
         
         return jsonify({
             'status': 'success',
@@ -928,14 +1083,9 @@ def get_visualizations():
             'message': str(e)
         }), 500
 
-def fig_to_base64(fig):
-    """Convert matplotlib figure to base64 string"""
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-    buf.seek(0)
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-    buf.close()
-    return img_str
+def fig_to_image(fig, image_format='png', trim=False):
+    """Convert matplotlib figure to PNG, WebP or SVG bytes"""
+    return figure_encoder.encode(fig, image_format, trim)
 
 @app.route('/visualization')
 def visualization():
@@ -944,17 +1094,47 @@ def visualization():
 
 @app.route('/get_plot/<plot_id>')
 def get_plot(plot_id):
-    """Fetch a specific plot from MongoDB"""
+    """Stream a stored plot with validators so browsers can cache it"""
+    try:
+        with timed('storage_get'):
+            plot = plot_storage.get(plot_id)
+        if plot is None:
+            return jsonify({'status': 'error', 'message': 'Plot not found'}), 404
+        response = send_file(
+            plot.stream,
+            mimetype=plot.content_type,
+            etag=plot.etag,
+            last_modified=plot.last_modified,
+            max_age=PLOT_CACHE_MAX_AGE,
+            conditional=True
+        )
+        response.cache_control.immutable = True
+        return response
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/get_plots')
+def get_plots():
+    """Fetch several plots at once: small images inline as data URLs, large ones as /get_plot URLs"""
     try:
-        plot = plots_collection.find_one({'_id': ObjectId(plot_id)})
-        if plot:
-            return send_file(
-                io.BytesIO(plot['image_data']),
-                mimetype='image/png'
-            )
-        return jsonify({'status': 'error', 'message': 'Plot not found'})
+        plot_ids = [plot_id for plot_id in request.args.get('ids', '').split(',') if plot_id]
+        with timed('storage_get_many'):
+            stored = plot_storage.get_many(plot_ids, PLOT_INLINE_MAX_BYTES)
+        plots = {}
+        for plot_id in plot_ids:
+            plot = stored.get(plot_id)
+            if plot is None:
+                plots[plot_id] = None
+                continue
+            entry = {'url': f"/get_plot/{plot_id}", 'etag': plot.etag}
+            if plot.stream is not None:
+                with plot.stream as stream:
+                    encoded = base64.b64encode(stream.read()).decode('utf-8')
+                entry['data'] = f"data:{plot.content_type};base64,{encoded}"
+            plots[plot_id] = entry
+        return jsonify({'status': 'success', 'plots': plots})
     except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)})
+        return jsonify({'status': 'error', 'message': str(e)}), 500
 
 if __name__ == '__main__':
     app.run(debug=True, use_reloader=False) 
\ No newline at end of file
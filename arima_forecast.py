@@ -0,0 +1,320 @@
+"""Fit per-country ARIMA growth models and write arima_combined_df.csv
+
+Scriptable version of feature_model_final.ipynb. The census columns of
+world_population.csv are interpolated to one row per country and year from
+1970 to 2022 (see data_prep.py), each country's yearly growth is fitted with auto_arima (d
+chosen by an ADF test) and forecast FORECAST_STEPS years ahead, and the
+history and forecasts are written as the dataset the app serves. Run from
+the repository root:
+
+    python arima_forecast.py --processes 8
+
+Countries are fitted in a pool of worker processes, a bounded number at a
+time. Every fitted model is saved to saved_models/arima next to a small
+JSON state file holding its forecast and a fingerprint of its inputs: the
+country's growth series, the auto_arima settings and MODEL_VERSION. A run
+only fits the countries whose fingerprint changed (so an interrupted run
+resumes with the countries still missing), re-predicts from the saved model
+when only the horizon changed, and patches the rows of the countries whose
+output changed into the existing CSV, which is replaced atomically. The app
+notices the new file and reloads it without a restart.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from data_prep import SOURCE_PATH, PANEL_COLUMNS, load_census, population_density, prepare_panel, recycling_pool
+
+OUTPUT_PATH = 'arima_combined_df.csv'
+MODEL_DIR = 'saved_models/arima'
+
+# Years forecast past the last census year
+FORECAST_STEPS = 10
+
+# auto_arima settings; part of every country's fingerprint
+ARIMA_PARAMS = {'seasonal': False, 'm': 1}
+
+# Bump when the fitting procedure changes so every country is fitted again
+MODEL_VERSION = 1
+
+
+def fit_arima(series, seasonal=False, m=1):
+    """Fit auto_arima to a series, differencing once if the ADF test finds it non-stationary"""
+    from pmdarima import auto_arima
+    from statsmodels.tsa.stattools import adfuller
+
+    series = series.dropna()
+    adf_pval = adfuller(series)[1]
+    d = 0 if adf_pval < 0.05 else 1
+    return auto_arima(series, seasonal=seasonal, m=m, d=d, trace=False, suppress_warnings=True)
+
+
+def forecast_arima(series, steps=FORECAST_STEPS, seasonal=False, m=1):
+    """Fit a series with fit_arima and forecast it steps ahead"""
+    model = fit_arima(series, seasonal, m)
+    forecast = np.asarray(model.predict(n_periods=steps), dtype=float)
+    return forecast, model
+
+
+def safe_name(country):
+    return country.replace('/', '_')
+
+
+def model_path(model_dir, country):
+    """Where a country's fitted model is saved; the notebook's file names"""
+    return os.path.join(model_dir, f"arima_model_{safe_name(country)}.pkl")
+
+
+def state_path(model_dir, country):
+    """Where a country's forecast and input fingerprint are kept, next to its model"""
+    return os.path.join(model_dir, f"arima_model_{safe_name(country)}.json")
+
+
+def write_json_atomic(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def load_state(path):
+    """Return a country's saved state, or None if it is missing or unreadable"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def fit_fingerprint(history, params=ARIMA_PARAMS):
+    """Digest of everything a country's fitted model depends on"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([MODEL_VERSION, params], sort_keys=True).encode('utf-8'))
+    digest.update(np.ascontiguousarray(history['Year'].to_numpy(dtype=np.int64)).tobytes())
+    digest.update(np.ascontiguousarray(history['Growth'].to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()[:24]
+
+
+def rows_fingerprint(history, growth_forecast):
+    """Digest of a country's rows in the combined dataset: its history and its forecast"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([history['Continent'].iloc[0], list(growth_forecast)]).encode('utf-8'))
+    for column in ('Year', 'Area (km²)', 'Population', 'Growth'):
+        digest.update(np.ascontiguousarray(history[column].to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()[:24]
+
+
+def fit_country(country, growth, steps, params, fingerprint, model_file, state_file):
+    """Fit one country's growth model, save it and its state; runs in the pool"""
+    import joblib
+    warnings.filterwarnings("ignore")
+    forecast, model = forecast_arima(pd.Series(growth, dtype=float), steps, **params)
+    tmp_path = f"{model_file}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, model_file)
+    state = {
+        'country': country,
+        'fingerprint': fingerprint,
+        'growth_forecast': forecast.tolist(),
+        'order': [int(value) for value in model.order],
+        'written': {}
+    }
+    write_json_atomic(state_file, state)
+    return state
+
+
+def repredict(state, steps, model_file, state_file):
+    """Forecast a different horizon from a saved model instead of fitting it again"""
+    import joblib
+    model = joblib.load(model_file)
+    state = dict(state, growth_forecast=np.asarray(model.predict(n_periods=steps), dtype=float).tolist())
+    write_json_atomic(state_file, state)
+    return state
+
+
+def forecast_rows(history, growth_forecast):
+    """Project a country's last observed row forward by compounding the forecast growth"""
+    last = history.iloc[-1]
+    years = int(last['Year']) + np.arange(1, len(growth_forecast) + 1)
+    growth = np.asarray(growth_forecast, dtype=float)
+    population = last['Population'] * np.cumprod(1 + growth)
+    return pd.DataFrame({
+        'Year': years,
+        'Country/Territory': last['Country/Territory'],
+        'Area (km²)': last['Area (km²)'],
+        'Continent': last['Continent'],
+        'Population': population,
+        'Density': population_density(population, last['Area (km²)']),
+        'Growth': growth
+    })
+
+
+def country_rows(history, growth_forecast):
+    """A country's rows of the combined dataset: its history followed by its forecast"""
+    rows = pd.concat([history, forecast_rows(history, growth_forecast)], ignore_index=True)[PANEL_COLUMNS]
+    rows['Growth'] = rows['Growth'].bfill()
+    return rows
+
+
+def write_csv_atomic(frame, path):
+    """Write a CSV next to its destination and move it into place"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    frame.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def patch_combined(path, histories, forecasts, changed):
+    """Rewrite the rows of the changed countries in the combined CSV; return how many were patched or dropped
+
+    Rows of the other countries are carried over from the existing file
+    as they are; countries no longer in the source are dropped. Without an
+    existing file every country is written.
+    """
+    existing = pd.read_csv(path) if os.path.exists(path) else None
+    dropped = 0
+    if existing is not None:
+        present = set(existing['Country/Territory'].unique())
+        changed = set(changed) | (set(histories) - present)
+        dropped = len(present - set(histories))
+        kept = existing[existing['Country/Territory'].isin(set(histories) - changed)]
+    else:
+        changed = set(histories)
+        kept = None
+    if not changed and not dropped:
+        return 0
+    frames = [kept] if kept is not None else []
+    frames.extend(country_rows(histories[country], forecasts[country]) for country in sorted(changed))
+    combined = pd.concat(frames, ignore_index=True)[PANEL_COLUMNS]
+    # Countries in name order, each in year order, like a full write
+    combined = combined.sort_values(['Country/Territory', 'Year'], kind='mergesort', ignore_index=True)
+    write_csv_atomic(combined, path)
+    return len(changed) + dropped
+
+
+def fit_all(histories, steps, model_dir, processes, params=ARIMA_PARAMS, max_in_flight=None):
+    """Return {country: growth forecast}, fitting only the countries whose inputs changed
+
+    Countries whose state fingerprint matches reuse their saved forecast,
+    or their saved model when only the horizon changed. At most
+    max_in_flight countries are queued at a time, so memory stays bounded
+    by the pool size rather than the number of countries. Worker processes
+    are started fresh (spawn) and, where supported, replaced after a number
+    of fits, so memory leaked by a fit does not accumulate.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    forecasts = {}
+    pending = []
+    reused = repredicted = 0
+    for country, history in histories.items():
+        fingerprint = fit_fingerprint(history, params)
+        state_file = state_path(model_dir, country)
+        state = load_state(state_file)
+        if state and state.get('fingerprint') == fingerprint:
+            if len(state['growth_forecast']) == steps:
+                forecasts[country] = state['growth_forecast']
+                reused += 1
+                continue
+            if os.path.exists(model_path(model_dir, country)):
+                try:
+                    state = repredict(state, steps, model_path(model_dir, country), state_file)
+                    forecasts[country] = state['growth_forecast']
+                    repredicted += 1
+                    continue
+                except Exception as e:
+                    print(f"Error reusing the model of {country}: {str(e)}")
+        pending.append((country, fingerprint))
+    print(f"{reused} countries unchanged, {repredicted} re-predicted from saved models, {len(pending)} to fit")
+
+    def task(country, fingerprint):
+        return (country, histories[country]['Growth'].to_numpy(dtype=float), steps, params, fingerprint,
+                model_path(model_dir, country), state_path(model_dir, country))
+
+    started = time.perf_counter()
+    failed = []
+
+    def report(done):
+        if done % 10 == 0 or done == len(pending):
+            print(f"{done}/{len(pending)} fitted ({len(failed)} failed) in {time.perf_counter() - started:.1f}s")
+
+    if processes == 0:
+        for done, (country, fingerprint) in enumerate(pending, 1):
+            try:
+                forecasts[country] = fit_country(*task(country, fingerprint))['growth_forecast']
+            except Exception as e:
+                print(f"Error fitting {country}: {str(e)}")
+                failed.append(country)
+            report(done)
+        return forecasts, failed
+
+    processes = processes or os.cpu_count()
+    max_in_flight = max_in_flight or processes * 2
+    with recycling_pool(processes, tasks_per_child=50) as executor:
+        queue = iter(pending)
+        in_flight = {}
+        done = 0
+        while True:
+            while len(in_flight) < max_in_flight:
+                item = next(queue, None)
+                if item is None:
+                    break
+                in_flight[executor.submit(fit_country, *task(*item))] = item[0]
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                country = in_flight.pop(future)
+                try:
+                    forecasts[country] = future.result()['growth_forecast']
+                except Exception as e:
+                    print(f"Error fitting {country}: {str(e)}")
+                    failed.append(country)
+                done += 1
+                report(done)
+    return forecasts, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=SOURCE_PATH, help='census table to forecast from')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='combined history and forecast CSV to write')
+    parser.add_argument('--steps', type=int, default=FORECAST_STEPS, help='years to forecast')
+    parser.add_argument('--processes', type=int, help='worker processes (default: one per CPU, 0 = inline)')
+    parser.add_argument('--model-dir', default=MODEL_DIR, help='where fitted models and their state are saved')
+    parser.add_argument('--full', action='store_true', help='rewrite every country of the output')
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    panel = prepare_panel(load_census(args.source))
+    histories = {country: history for country, history in panel.groupby('Country/Territory', sort=True)}
+    forecasts, failed = fit_all(histories, args.steps, args.model_dir, args.processes)
+    if failed:
+        raise SystemExit(f"{len(failed)} countries failed; rerun to retry them: {', '.join(failed)}")
+
+    # A country's rows change when its history or its forecast does
+    output_key = os.path.abspath(args.output)
+    digests = {country: rows_fingerprint(history, forecasts[country]) for country, history in histories.items()}
+    states = {country: load_state(state_path(args.model_dir, country)) or {} for country in histories}
+    changed = set(histories) if args.full else {
+        country for country in histories
+        if states[country].get('written', {}).get(output_key) != digests[country]
+    }
+    patched = patch_combined(args.output, histories, forecasts, changed)
+    for country in changed:
+        state = states[country]
+        state.setdefault('written', {})[output_key] = digests[country]
+        write_json_atomic(state_path(args.model_dir, country), state)
+    if patched:
+        print(f"Patched {patched} countries in {args.output}")
+    else:
+        print(f"{args.output} is up to date")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+"""Benchmark the render and data paths on synthetic datasets of growing size
+
+For every scale a temporary workspace gets a synthetic arima_combined_df.csv
+and a generated shapefile of realistically detailed outlines (see
+synthetic.py), so no MongoDB server or Natural Earth download is needed:
+plots are kept in the in-memory plot storage and rendered on the app's
+background render thread. Each scale is measured in fresh interpreters:
+
+  - startup: importing app from the sources and from the binary snapshot
+  - functions: every create_* builder at every level, fig_to_image in each
+    image format, map panel composition
+  - routes: /get_data (rendering and from the render cache), /get_plot,
+    /get_plots, /api/series and /api/choropleth through the Flask test client
+
+Run from the repository root:
+
+    python benchmarks/render_benchmark.py --scales 1 10 100 --output bench.json
+    python benchmarks/render_benchmark.py --scales 1 10 --compare bench.json
+
+--compare prints each timing's ratio against an earlier --output file.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from startup_benchmark import REPO_ROOT, summarize, time_startup
+from synthetic import BASE_VERTICES, write_workspace
+
+# Accept header the visualization page sends with /get_data
+BROWSER_ACCEPT = 'application/json, image/svg+xml, image/webp, image/png'
+
+# Timings above this ratio against the baseline are flagged by --compare
+REGRESSION_RATIO = 1.2
+
+
+def worker_env(snapshot_enabled=True):
+    """Environment of a benchmark interpreter: repo on the path, memory storage, in-process rendering"""
+    pythonpath = os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')]))
+    return dict(os.environ, PYTHONPATH=pythonpath, WPA_PLOT_STORAGE='memory',
+                WPA_RENDER_PROCESSES='0', WPA_SNAPSHOT='1' if snapshot_enabled else '0',
+                MPLBACKEND='Agg')
+
+
+def measure(results, name, repeat, run):
+    """Call run() repeat times and store the timing summary under name"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    results[name] = summarize(samples)
+
+
+def benchmark_functions(app, repeat):
+    """Time every figure builder at every level, and encoding, in this process"""
+    continent = app.store.continents[0]
+    country = app.store.countries[int(app.store.continent_members[continent][0])]
+    start_year, end_year = 1970, 2032
+    names = {'world': None, 'continent': continent, 'country': country}
+    results = {}
+
+    def figure_case(label, build, image_formats=('png', 'webp')):
+        measure(results, f"{label}/create", repeat, lambda: app.release_figure(build()))
+        fig = build()
+        try:
+            for image_format in image_formats:
+                measure(results, f"{label}/fig_to_image[{image_format}]", repeat,
+                        lambda image_format=image_format: app.fig_to_image(fig, image_format))
+                results[f"{label}/bytes[{image_format}]"] = len(app.fig_to_image(fig, image_format))
+        finally:
+            app.release_figure(fig)
+
+    graph_builders = {
+        'create_population_graph': app.create_population_graph,
+        'create_density_graph': app.create_density_graph,
+        'create_growth_graph': app.create_growth_graph
+    }
+    for function_name, builder in graph_builders.items():
+        for level, name in names.items():
+            figure_case(f"{function_name}[{level}]",
+                        lambda builder=builder, level=level, name=name:
+                        builder(name, 'Benchmark', level, start_year, end_year),
+                        image_formats=('png', 'webp', 'svg'))
+
+    for level in ('continent', 'country'):
+        figure_case(f"create_population_pie_charts[{level}]",
+                    lambda level=level: app.create_population_pie_charts(start_year, end_year, level, names[level]))
+
+    figure_case('create_country_location_map[country]', lambda: app.create_country_location_map(country))
+    figure_case('create_continent_location_map[continent]', lambda: app.create_continent_location_map(continent))
+
+    map_levels = {
+        'world': None,
+        'continent': continent,
+        'country': country,
+        'world-country-wise': None,
+        'world-continent-wise': None,
+        'continent-country-wise': continent
+    }
+    for metric in app.MAP_BINS:
+        for level, name in map_levels.items():
+            figure_case(f"create_map_panel[{metric},{level}]",
+                        lambda metric=metric, level=level, name=name:
+                        app.create_map_panel(metric, end_year, level, name))
+
+    fig = app.create_map_panel('population', end_year, 'world-country-wise')
+    try:
+        panel = app.fig_to_image(fig, 'png', trim=True)
+    finally:
+        app.release_figure(fig)
+    for image_format in ('png', 'webp'):
+        measure(results, f"compose_panels[{image_format}]", repeat,
+                lambda image_format=image_format: app.compose_panels([panel, panel], image_format))
+    return results
+
+
+def benchmark_routes(app, repeat):
+    """Time the plot and data routes through the Flask test client"""
+    from render_cache import PanelCache, RenderCache
+
+    client = app.app.test_client()
+    continent = app.store.continents[0]
+    country = app.store.countries[int(app.store.continent_members[continent][0])]
+    selection = {
+        'selection_types': ['world', 'continent', 'country'],
+        'continent': continent,
+        'country': country,
+        'start_year': 1970,
+        'end_year': 2032
+    }
+    results = {}
+    plot_ids = []
+
+    def get_data():
+        response = client.post('/get_data', json=selection, headers={'Accept': BROWSER_ACCEPT})
+        payload = response.get_json()
+        job = app.render_jobs.get(payload['job_id'])
+        seen = 0
+        while not job.done:
+            seen += len(job.wait_for_events(seen))
+        plot_ids[:] = [plot_id for section in job.plot_ids.values() for plot_id in section.values()]
+
+    def get_data_rendering():
+        # Start from empty caches so every plot and map panel is drawn again
+        app.render_cache = RenderCache(max_entries=app.RENDER_CACHE_MAX_ENTRIES, ttl_seconds=app.RENDER_CACHE_TTL)
+        app.panel_cache = PanelCache()
+        get_data()
+
+    measure(results, '/get_data[render]', repeat, get_data_rendering)
+    measure(results, '/get_data[render_cache]', repeat, get_data)
+
+    def get_plots_each():
+        for plot_id in plot_ids:
+            client.get(f"/get_plot/{plot_id}").get_data()
+
+    measure(results, '/get_plot[each]', repeat, get_plots_each)
+    measure(results, '/get_plots[batch]', repeat,
+            lambda: client.get(f"/get_plots?ids={','.join(plot_ids)}").get_data())
+    for level, name in (('world', None), ('continent', continent), ('country', country)):
+        query = f"level={level}" + (f"&name={name}" if name else '')
+        measure(results, f"/api/series[{level}]", repeat,
+                lambda query=query: client.get(f"/api/series?{query}").get_data())
+    for level in app.CHOROPLETH_LEVELS:
+        query = f"level={level}&metric=population&year=2032"
+        if level == 'continent-country-wise':
+            query += f"&name={continent}"
+        measure(results, f"/api/choropleth[{level}]", repeat,
+                lambda query=query: client.get(f"/api/choropleth?{query}").get_data())
+    results['plots_per_get_data'] = len(plot_ids)
+    return results
+
+
+def run_worker(repeat):
+    """Benchmark mode of the interpreter started inside a workspace; prints JSON"""
+    import app
+    app.DEBUG = False
+    print(json.dumps({
+        'functions': benchmark_functions(app, repeat),
+        'routes': benchmark_routes(app, repeat)
+    }))
+
+
+def benchmark_scale(scale, year_scale, runs, repeat, seed, vertices=BASE_VERTICES):
+    """Generate a workspace of this scale and measure startup, functions and routes in it"""
+    with tempfile.TemporaryDirectory(prefix=f"wpa-bench-{scale}x-") as workspace:
+        started = time.perf_counter()
+        dataset = write_workspace(workspace, scale, year_scale, seed, vertices)
+        dataset['generate_s'] = time.perf_counter() - started
+
+        # One warm-up start writes the snapshot and the geometry/cube caches
+        time_startup(True, workspace, worker_env())
+        startup = {
+            mode: summarize([time_startup(enabled, workspace, worker_env())[0] for _ in range(runs)])
+            for mode, enabled in (('source', False), ('snapshot', True))
+        }
+
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', '--repeat', str(repeat)],
+            cwd=workspace, env=worker_env(), capture_output=True, text=True, check=True
+        )
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return {'dataset': dataset, 'startup': startup, **timings}
+
+
+def flatten(results):
+    """Yield (path, median seconds) of every timing in a results file"""
+    for scale, scale_results in results.get('scales', {}).items():
+        for group in ('startup', 'functions', 'routes'):
+            for name, timing in scale_results.get(group, {}).items():
+                if isinstance(timing, dict) and 'median_s' in timing:
+                    yield f"{scale}x {group} {name}", timing['median_s']
+
+
+def compare(results, baseline_path):
+    """Print each timing's ratio against the same timing in a baseline results file"""
+    with open(baseline_path) as f:
+        baseline = dict(flatten(json.load(f)))
+    regressions = 0
+    for path, median in flatten(results):
+        if path not in baseline:
+            continue
+        ratio = median / baseline[path] if baseline[path] else float('inf')
+        flag = ' REGRESSION' if ratio > REGRESSION_RATIO else ''
+        regressions += bool(flag)
+        print(f"{ratio:6.2f}x  {path}{flag}")
+    print(f"{regressions} timings slower than {REGRESSION_RATIO}x the baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 10],
+                        help='entity multipliers over the real dataset size')
+    parser.add_argument('--year-scale', type=int, default=1, help='year span multiplier')
+    parser.add_argument('--vertices', type=int, default=BASE_VERTICES, help='outline vertices per synthetic country')
+    parser.add_argument('--runs', type=int, default=3, help='cold starts per startup mode')
+    parser.add_argument('--repeat', type=int, default=3, help='calls per function and route timing')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare against an earlier --output file')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.repeat)
+        return
+
+    results = {'python': sys.version.split()[0], 'repeat': args.repeat, 'scales': {}}
+    for scale in args.scales:
+        scale_results = benchmark_scale(scale, args.year_scale, args.runs, args.repeat, args.seed, args.vertices)
+        results['scales'][str(scale)] = scale_results
+        dataset = scale_results['dataset']
+        print(f"{scale}x: {dataset['countries']} countries x {dataset['years']} years, "
+              f"startup {scale_results['startup']['source']['median_s']:.2f}s source / "
+              f"{scale_results['startup']['snapshot']['median_s']:.2f}s snapshot, "
+              f"/get_data {scale_results['routes']['/get_data[render]']['median_s']:.2f}s rendering / "
+              f"{scale_results['routes']['/get_data[render_cache]']['median_s'] * 1000:.1f}ms cached")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
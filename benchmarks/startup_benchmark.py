@@ -0,0 +1,76 @@
+"""Measure app cold-start time with and without the binary snapshot
+
+Each run starts a fresh interpreter, imports app (which loads the dataset,
+shapes and geometry tiers) and reports how long the import took. Run from
+the repository root:
+
+    python benchmarks/startup_benchmark.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def summarize(samples):
+    return {
+        'runs': len(samples),
+        'median_s': statistics.median(samples),
+        'min_s': min(samples),
+        'max_s': max(samples)
+    }
+
+
+def time_startup(snapshot_enabled, cwd=REPO_ROOT, env=None):
+    """Start one interpreter in cwd, import app, and return (import seconds, process seconds)"""
+    env = dict(env or os.environ, WPA_SNAPSHOT='1' if snapshot_enabled else '0')
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', IMPORT_SNIPPET],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+    import_seconds = float(result.stdout.strip().splitlines()[-1])
+    return import_seconds, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per mode')
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    args = parser.parse_args()
+
+    # One warm-up start writes the snapshot and the geometry/cube caches
+    time_startup(snapshot_enabled=True)
+
+    results = {}
+    for mode, enabled in (('source', False), ('snapshot', True)):
+        samples = [time_startup(enabled) for _ in range(args.runs)]
+        results[mode] = {
+            'import': summarize([sample[0] for sample in samples]),
+            'process': summarize([sample[1] for sample in samples])
+        }
+        print(f"{mode:>8}: import {results[mode]['import']['median_s']:.3f}s median, "
+              f"process {results[mode]['process']['median_s']:.3f}s median over {args.runs} runs")
+
+    speedup = results['source']['import']['median_s'] / results['snapshot']['import']['median_s']
+    results['speedup'] = speedup
+    print(f" speedup: {speedup:.2f}x")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
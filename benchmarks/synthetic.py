@@ -0,0 +1,128 @@
+"""Generate synthetic datasets and shapefiles for the benchmarks
+
+A workspace holds an arima_combined_df.csv in the app's long format and a
+shapefile at the app's SHAPEFILE_PATH whose countries are jagged polygons,
+laid out on a grid, with about as many vertices as the Natural Earth 10m
+shapes. The app can be imported from it without the real forecasts or the
+Natural Earth download, and reading, simplifying and encoding the geometry
+costs what it does with the real shapefile. Scale 1 matches the real
+dataset's size: 234 countries on six continents over 1970-2032.
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+BASE_COUNTRIES = 234
+BASE_YEARS = 63
+LAST_YEAR = 2032
+
+# Outline vertices per country, about the average of the 10m admin-0 shapefile
+BASE_VERTICES = 2000
+
+CONTINENTS = ['Africa', 'Asia', 'Europe', 'North America', 'Oceania', 'South America']
+
+# Continents are laid out as a 3 x 2 grid of cells over this extent
+WORLD_BOUNDS = (-180.0, -60.0, 180.0, 84.0)
+
+DATA_FILE = 'arima_combined_df.csv'
+SHAPEFILE_FILE = os.path.join('data', '10m_cultural', '10m_cultural', 'ne_10m_admin_0_countries.shp')
+
+
+def country_names(count):
+    width = len(str(count))
+    return [f"Country {i:0{width}d}" for i in range(count)]
+
+
+def synthetic_frame(country_count, year_count, seed=0):
+    """Return a long (country, year) frame with the columns of arima_combined_df.csv"""
+    rng = np.random.default_rng(seed)
+    names = country_names(country_count)
+    continents = np.array(CONTINENTS)[np.arange(country_count) % len(CONTINENTS)]
+    years = np.arange(LAST_YEAR - year_count + 1, LAST_YEAR + 1)
+
+    base = rng.lognormal(mean=15, sigma=2, size=country_count).clip(500, 1.2e9)
+    rates = rng.normal(0.015, 0.01, size=(country_count, year_count)).clip(-0.09, 0.19)
+    rates[:, 0] = 0
+    population = base[:, None] * np.cumprod(1 + rates, axis=1)
+    area = rng.lognormal(mean=11, sigma=2, size=country_count).clip(1, 1.7e7)
+    growth = np.empty_like(population)
+    growth[:, 1:] = population[:, 1:] / population[:, :-1] - 1
+    growth[:, 0] = growth[:, 1] if year_count > 1 else 0
+
+    return pd.DataFrame({
+        'Country/Territory': np.repeat(names, year_count),
+        'Continent': np.repeat(continents, year_count),
+        'Year': np.tile(years, country_count),
+        'Population': population.ravel().round(),
+        'Area (km²)': np.repeat(area.round(), year_count),
+        'Density': (population / area[:, None]).ravel(),
+        'Growth': growth.ravel()
+    })
+
+
+def jagged_box(x0, y0, x1, y1, vertices, rng):
+    """A polygon of vertices points around a box, each pulled a random bit towards its center"""
+    from shapely.geometry import Polygon
+
+    t = np.linspace(0, 4, max(vertices, 4), endpoint=False)
+    side = t.astype(int)
+    f = t - side
+    xs = np.choose(side, [x0 + f * (x1 - x0), np.full_like(f, x1), x1 - f * (x1 - x0), np.full_like(f, x0)])
+    ys = np.choose(side, [np.full_like(f, y0), y0 + f * (y1 - y0), np.full_like(f, y1), y1 - f * (y1 - y0)])
+    # Moving along the ray to the center keeps the outline star-shaped, so it never self-intersects
+    pull = rng.uniform(0, 0.15, len(t))
+    xs = xs + ((x0 + x1) / 2 - xs) * pull
+    ys = ys + ((y0 + y1) / 2 - ys) * pull
+    return Polygon(np.column_stack([xs, ys]))
+
+
+def synthetic_shapes(country_count, vertices=BASE_VERTICES, seed=0):
+    """Return a GeoDataFrame of one jagged box per country, grouped into continent cells"""
+    import geopandas as gpd
+
+    rng = np.random.default_rng(seed)
+
+    min_x, min_y, max_x, max_y = WORLD_BOUNDS
+    cell_w = (max_x - min_x) / 3
+    cell_h = (max_y - min_y) / 2
+    names = country_names(country_count)
+    rows = []
+    for c, continent in enumerate(CONTINENTS):
+        members = names[c::len(CONTINENTS)]
+        if not members:
+            continue
+        cell_x = min_x + (c % 3) * cell_w
+        cell_y = min_y + (c // 3) * cell_h
+        columns = math.ceil(math.sqrt(len(members)))
+        grid_rows = math.ceil(len(members) / columns)
+        w = cell_w / columns
+        h = cell_h / grid_rows
+        for i, name in enumerate(members):
+            x = cell_x + (i % columns) * w
+            y = cell_y + (i // columns) * h
+            # A small gap keeps neighbouring shapes from sharing edges
+            rows.append({'NAME': name, 'CONTINENT': continent,
+                         'geometry': jagged_box(x, y, x + w * 0.95, y + h * 0.95, vertices, rng)})
+    return gpd.GeoDataFrame(rows, crs='EPSG:4326')
+
+
+def write_workspace(path, scale=1, year_scale=1, seed=0, vertices=BASE_VERTICES):
+    """Write a scaled dataset and shapefile under path and describe their size"""
+    country_count = BASE_COUNTRIES * scale
+    year_count = BASE_YEARS * year_scale
+    frame = synthetic_frame(country_count, year_count, seed)
+    frame.to_csv(os.path.join(path, DATA_FILE), index=False)
+    shapefile_path = os.path.join(path, SHAPEFILE_FILE)
+    os.makedirs(os.path.dirname(shapefile_path), exist_ok=True)
+    synthetic_shapes(country_count, vertices, seed).to_file(shapefile_path)
+    return {
+        'scale': scale,
+        'year_scale': year_scale,
+        'countries': country_count,
+        'continents': len(CONTINENTS),
+        'years': year_count,
+        'vertices': vertices,
+        'rows': len(frame)
+    }
@@ -0,0 +1,192 @@
+"""Census table to an annual (country x year) panel in a few array operations
+
+world_population.csv has one row per country with population columns for a
+handful of census years. The forecasting pipelines work on one value per
+country and year, interpolated linearly between census years, with density
+and year-over-year growth derived from it. Every step here works on whole
+(country x year) arrays instead of looping over countries, and the same
+density and growth definitions are used by the app's aggregate cube.
+"""
+import multiprocessing
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Census table read by the forecasting scripts
+SOURCE_PATH = 'world_population.csv'
+
+FIRST_YEAR = 1970
+LAST_OBSERVED_YEAR = 2022
+
+# Columns of the long panel and of arima_combined_df.csv, in the order the notebooks wrote them
+PANEL_COLUMNS = ['Year', 'Country/Territory', 'Area (km²)', 'Continent', 'Population', 'Density', 'Growth']
+
+# world_population.csv names that differ from the shapefile's NAME column
+COUNTRY_RENAMES = {
+    "Antigua and Barbuda": "Antigua and Barb.",
+    "Bosnia and Herzegovina": "Bosnia and Herz.",
+    "British Virgin Islands": "British Virgin Is.",
+    "Cape Verde": "Cabo Verde",
+    "Cayman Islands": "Cayman Is.",
+    "Central African Republic": "Central African Rep.",
+    "Cook Islands": "Cook Is.",
+    "Curacao": "Curaçao",
+    "Czech Republic": "Czechia",
+    "Ivory Coast": "Côte d'Ivoire",
+    "Macau": "Macao",
+    "Marshall Islands": "Marshall Is.",
+    "Northern Mariana Islands": "N. Mariana Is.",
+    "Republic of the Congo": "Congo",
+    "Falkland Islands": "Falkland Is.",
+    "Faeroe Islands": "Faeroe Is.",
+    "French Guiana": "Fr. Guiana",
+    "French Polynesia": "Fr. Polynesia",
+    "Saint Barthelemy": "St-Barthélemy",
+    "Saint Kitts and Nevis": "St. Kitts and Nevis",
+    "Saint Martin": "St-Martin",
+    "Saint Pierre and Miquelon": "St. Pierre and Miquelon",
+    "Saint Vincent and the Grenadines": "St. Vin. and Gren.",
+    "Sao Tome and Principe": "São Tomé and Principe",
+    "Solomon Islands": "Solomon Is.",
+    "South Sudan": "S. Sudan",
+    "Turks and Caicos Islands": "Turks and Caicos Is.",
+    "United States": "United States of America",
+    "United States Virgin Islands": "U.S. Virgin Is.",
+    "Vatican City": "Vatican",
+    "Wallis and Futuna": "Wallis and Futuna Is.",
+    "Western Sahara": "W. Sahara",
+    "eSwatini": "Eswatini",
+    "DR Congo": "Dem. Rep. Congo",
+    "Dominican Republic": "Dominican Rep.",
+    "Equatorial Guinea": "Eq. Guinea"
+}
+
+# Annual panel: country labels and (country x year) arrays; area is one value per country
+Panel = namedtuple('Panel', ['countries', 'continents', 'years', 'population', 'area'])
+
+
+def load_census(path, renames=COUNTRY_RENAMES):
+    """Read the census table with country names matching the shapefile"""
+    df = pd.read_csv(path)
+    df['Country/Territory'] = df['Country/Territory'].replace(renames)
+    return df
+
+
+def census_columns(df):
+    """Return the census population columns and their years, in year order"""
+    columns = {}
+    for column in df.columns:
+        match = re.search(r'(\d{4})', column)
+        if 'Population' in column and 'World' not in column and match:
+            columns[int(match.group(1))] = column
+    years = sorted(columns)
+    return [columns[year] for year in years], np.array(years)
+
+
+def interpolate_years(values, known_years, years):
+    """Linearly interpolate every row of values, known at known_years, to years
+
+    Years outside the known range take the nearest known value. Rows with
+    missing values are interpolated between the values they do have.
+    """
+    known_years = np.asarray(known_years, dtype=float)
+    years = np.asarray(years, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if len(known_years) == 1:
+        result = np.repeat(values, len(years), axis=1)
+    else:
+        right = np.clip(np.searchsorted(known_years, years, side='right'), 1, len(known_years) - 1)
+        left = right - 1
+        weight = np.clip((years - known_years[left]) / (known_years[right] - known_years[left]), 0, 1)
+        result = values[:, left] * (1 - weight) + values[:, right] * weight
+    for row in np.flatnonzero(np.isnan(values).any(axis=1)):
+        known = ~np.isnan(values[row])
+        result[row] = np.interp(years, known_years[known], values[row, known]) if known.any() else np.nan
+    return result
+
+
+def population_density(population, area):
+    """Population per km² along the last axis; NaN where the area is unknown or zero"""
+    area = np.asarray(area, dtype=float)
+    if area.ndim < np.ndim(population):
+        area = area[..., None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(area > 0, population / area, np.nan)
+
+
+def growth_rates(population):
+    """Year-over-year change along the last axis, with the first year back-filled from the second"""
+    population = np.asarray(population, dtype=float)
+    growth = np.full(population.shape, np.nan)
+    if population.shape[-1] > 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth[..., 1:] = population[..., 1:] / population[..., :-1] - 1
+        growth[..., 0] = growth[..., 1]
+    return growth
+
+
+def census_panel(df, first_year=FIRST_YEAR, last_year=LAST_OBSERVED_YEAR):
+    """Interpolate the census table to every year from first_year to last_year, countries in name order"""
+    columns, known_years = census_columns(df)
+    df = df.sort_values('Country/Territory', kind='mergesort')
+    years = np.arange(first_year, last_year + 1)
+    return Panel(
+        countries=df['Country/Territory'].to_numpy(dtype=object),
+        continents=df['Continent'].to_numpy(dtype=object),
+        years=years,
+        population=interpolate_years(df[columns].to_numpy(dtype=float), known_years, years),
+        area=df['Area (km²)'].to_numpy(dtype=float)
+    )
+
+
+def extend_panel(panel, growth_forecast):
+    """Append forecast years to a Panel by compounding a (country x step) growth forecast from the last year"""
+    growth_forecast = np.asarray(growth_forecast, dtype=float)
+    future = panel.population[:, -1:] * np.cumprod(1 + growth_forecast, axis=1)
+    steps = growth_forecast.shape[1]
+    return panel._replace(
+        years=np.concatenate([panel.years, panel.years[-1] + np.arange(1, steps + 1)]),
+        population=np.concatenate([panel.population, future], axis=1)
+    )
+
+
+def select_countries(panel, rows):
+    """Return the Panel restricted to some countries, given as a boolean mask or indices"""
+    return panel._replace(countries=panel.countries[rows], continents=panel.continents[rows],
+                          population=panel.population[rows], area=panel.area[rows])
+
+
+def panel_frame(panel):
+    """Flatten a Panel into the long (country, year) frame with density and growth"""
+    country_count, year_count = panel.population.shape
+    return pd.DataFrame({
+        'Year': np.tile(panel.years, country_count),
+        'Country/Territory': np.repeat(panel.countries, year_count),
+        'Area (km²)': np.repeat(panel.area, year_count),
+        'Continent': np.repeat(panel.continents, year_count),
+        'Population': panel.population.ravel(),
+        'Density': population_density(panel.population, panel.area).ravel(),
+        'Growth': growth_rates(panel.population).ravel()
+    })[PANEL_COLUMNS]
+
+
+def prepare_panel(df, first_year=FIRST_YEAR, last_year=LAST_OBSERVED_YEAR):
+    """Melt, interpolate and derive density and growth for every country in one pass"""
+    return panel_frame(census_panel(df, first_year, last_year))
+
+
+def recycling_pool(processes=None, tasks_per_child=50):
+    """Process pool of the forecasting scripts: fresh (spawned) workers, replaced after tasks_per_child tasks
+
+    Memory leaked by a fit then does not accumulate. Replacing workers
+    needs Python 3.11; older versions keep them for the pool's lifetime.
+    """
+    options = {'max_workers': processes or os.cpu_count(), 'mp_context': multiprocessing.get_context('spawn')}
+    try:
+        return ProcessPoolExecutor(max_tasks_per_child=tasks_per_child, **options)
+    except TypeError:
+        return ProcessPoolExecutor(**options)
@@ -0,0 +1,263 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_prep import growth_rates, population_density
+
+METRICS = ('Population', 'Area (km²)', 'Density', 'Growth')
+
+# Column of the year frames holding density min-max scaled over the full dataset
+SCALED_DENSITY = 'Density (scaled)'
+
+# File-safe names for the per-metric arrays written to snapshots
+ARRAY_NAMES = {
+    'Population': 'population',
+    'Area (km²)': 'area',
+    'Density': 'density',
+    'Growth': 'growth'
+}
+
+
+def cube_path_for(data_path, dataset_version):
+    """Return where the aggregate cube of a dataset version is persisted, next to the CSV"""
+    base, _ = os.path.splitext(data_path)
+    return f"{base}.{dataset_version}.cube.parquet"
+
+
+def aggregate_metrics(population, area):
+    """Derive density and growth from summed population and area series
+
+    Growth follows the line graphs: year-over-year percentage change with the
+    first year back-filled from the second, as in data_prep's annual panel.
+    """
+    return {
+        'Population': population,
+        'Area (km²)': area,
+        'Density': population_density(population, area),
+        'Growth': growth_rates(population)
+    }
+
+
+class PopulationStore:
+    """Dense (country x year) arrays over the forecast dataset
+
+    Every metric is held as a NumPy array indexed by country and year, with
+    continent and world aggregates materialized once into a cube, so request
+    handlers look values up by index or slice instead of scanning `df`. When
+    cube_path is given the cube is read from there if present and written
+    there otherwise; the path embeds the dataset version, so a changed CSV
+    gets a fresh cube. index and arrays restore the axes and arrays saved
+    from index_state() and array_state() instead of rebuilding them from df.
+    """
+
+    def __init__(self, df, cube_path=None, index=None, arrays=None):
+        self.df = df
+        if index is not None and arrays is not None:
+            self._restore(index, arrays)
+        else:
+            self._build(df)
+        self.year_index = {int(year): i for i, year in enumerate(self.years)}
+        self.country_index = {name: i for i, name in enumerate(self.countries)}
+        self.continent_members = {
+            continent: np.flatnonzero(self.country_continents == continent)
+            for continent in self.continents
+        }
+
+        # Aggregate cube: (level, entity) -> metric -> values over self.years
+        self.cube = self._load_cube(cube_path) if cube_path else None
+        if self.cube is None:
+            self.cube = self._build_cube()
+            if cube_path:
+                self._save_cube(cube_path)
+
+        # Density min-max scaled per level over every entity and year, for the density map classes
+        continent_density = np.array([self.cube[('continent', c)]['Density'] for c in self.continents])
+        self.density_ranges = {
+            'country': self._value_range(self.country_values['Density']),
+            'continent': self._value_range(continent_density)
+        }
+        self.scaled_density = {
+            'country': self._min_max_scale(self.country_values['Density'], self.density_ranges['country']),
+            'continent': self._min_max_scale(continent_density, self.density_ranges['continent'])
+        }
+
+    @staticmethod
+    def _value_range(values):
+        finite = values[np.isfinite(values)]
+        if finite.size == 0:
+            return 0.0, 0.0
+        return float(finite.min()), float(finite.max())
+
+    @staticmethod
+    def _min_max_scale(values, value_range):
+        low, high = value_range
+        if high <= low:
+            return np.where(np.isnan(values), np.nan, 0.0)
+        return (values - low) / (high - low)
+
+    def _build(self, df):
+        self.years = np.sort(df['Year'].unique()).astype(int)
+        self.countries = sorted(df['Country/Territory'].unique().tolist())
+        self.continents = sorted(df['Continent'].unique().tolist())
+        first_rows = df.drop_duplicates('Country/Territory').set_index('Country/Territory')
+        self.country_continents = np.array([first_rows.at[name, 'Continent'] for name in self.countries])
+
+        shape = (len(self.countries), len(self.years))
+        country_index = {name: i for i, name in enumerate(self.countries)}
+        year_index = {int(year): i for i, year in enumerate(self.years)}
+        rows = df['Country/Territory'].map(country_index).to_numpy()
+        cols = df['Year'].astype(int).map(year_index).to_numpy()
+
+        # Position of each (country, year) in df, -1 where the dataset has no row
+        self.row_index = np.full(shape, -1, dtype=np.int64)
+        self.row_index[rows, cols] = np.arange(len(df))
+
+        self.country_values = {}
+        for metric in ('Population', 'Area (km²)', 'Growth'):
+            values = np.full(shape, np.nan)
+            values[rows, cols] = pd.to_numeric(df[metric], errors='coerce').to_numpy(dtype=float)
+            self.country_values[metric] = values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            area = self.country_values['Area (km²)']
+            self.country_values['Density'] = np.where(area > 0, self.country_values['Population'] / area, np.nan)
+
+    def _restore(self, index, arrays):
+        self.years = np.asarray(index['years'], dtype=int)
+        self.countries = list(index['countries'])
+        self.continents = list(index['continents'])
+        self.country_continents = np.array(index['country_continents'])
+        self.row_index = arrays['row_index']
+        self.country_values = {metric: arrays[ARRAY_NAMES[metric]] for metric in METRICS}
+
+    def index_state(self):
+        """Return the JSON-serializable labels of the country and year axes"""
+        return {
+            'years': [int(year) for year in self.years],
+            'countries': self.countries,
+            'continents': self.continents,
+            'country_continents': self.country_continents.tolist()
+        }
+
+    def array_state(self):
+        """Return the (country x year) arrays, keyed by file-safe names"""
+        arrays = {'row_index': self.row_index}
+        for metric in METRICS:
+            arrays[ARRAY_NAMES[metric]] = self.country_values[metric]
+        return arrays
+
+    def _build_cube(self):
+        cube = {}
+        for continent, members in self.continent_members.items():
+            cube[('continent', continent)] = aggregate_metrics(
+                np.nansum(self.country_values['Population'][members], axis=0),
+                np.nansum(self.country_values['Area (km²)'][members], axis=0)
+            )
+        cube[('world', None)] = aggregate_metrics(
+            np.nansum(self.country_values['Population'], axis=0),
+            np.nansum(self.country_values['Area (km²)'], axis=0)
+        )
+        return cube
+
+    def cube_frame(self):
+        """Return the aggregate cube as a long (level, entity, Year) frame"""
+        frames = []
+        for (level, entity), values in self.cube.items():
+            frame = pd.DataFrame({'level': level, 'entity': entity or 'World', 'Year': self.years})
+            for metric in METRICS:
+                frame[metric] = values[metric]
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def _save_cube(self, path):
+        """Write the cube next to the dataset and drop cubes of older dataset versions"""
+        try:
+            tmp_path = f"{path}.tmp"
+            self.cube_frame().to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            prefix = path.rsplit('.', 3)[0]
+            for stale in glob.glob(f"{glob.escape(prefix)}.*.cube.parquet"):
+                if stale != path:
+                    os.remove(stale)
+        except Exception as e:
+            print(f"Error saving aggregate cube: {str(e)}")
+
+    def _load_cube(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            frame = pd.read_parquet(path)
+            cube = {}
+            for (level, entity), group in frame.groupby(['level', 'entity'], sort=False):
+                group = group.set_index('Year').reindex(self.years)
+                key = ('world', None) if level == 'world' else (level, entity)
+                cube[key] = {metric: group[metric].to_numpy(dtype=float) for metric in METRICS}
+            if set(cube) != {('continent', c) for c in self.continents} | {('world', None)}:
+                return None
+            return cube
+        except Exception as e:
+            print(f"Error loading aggregate cube: {str(e)}")
+            return None
+
+    def year_slice(self, start_year=None, end_year=None):
+        """Return the slice of the year axis covering [start_year, end_year]"""
+        start = 0 if start_year is None else int(np.searchsorted(self.years, start_year, side='left'))
+        end = len(self.years) if end_year is None else int(np.searchsorted(self.years, end_year, side='right'))
+        return slice(start, end)
+
+    def _values(self, level, name, metric):
+        if level == 'country':
+            return self.country_values[metric][self.country_index[name]]
+        if level == 'continent':
+            return self.cube[('continent', name)][metric]
+        return self.cube[('world', None)][metric]
+
+    def series(self, level, name, metric, start_year=None, end_year=None):
+        """Return (years, values) of one metric for a country, continent or the world"""
+        years = self.year_slice(start_year, end_year)
+        return self.years[years], self._values(level, name, metric)[years]
+
+    def value(self, level, name, metric, year):
+        """Return a single metric value, or NaN if the year is not in the dataset"""
+        index = self.year_index.get(int(year))
+        if index is None:
+            return np.nan
+        return self._values(level, name, metric)[index]
+
+    def rows(self, level='world', name=None, start_year=None, end_year=None):
+        """Return the df rows of a country, continent or the world within a year range"""
+        years = self.year_slice(start_year, end_year)
+        if level == 'country':
+            index = self.row_index[self.country_index[name], years]
+        elif level == 'continent':
+            index = self.row_index[self.continent_members[name], years]
+        else:
+            index = self.row_index[:, years]
+        index = np.sort(index[index >= 0], axis=None)
+        return self.df.take(index)
+
+    def country_year_frame(self, year, continent=None):
+        """Return one row per country with every metric for a single year"""
+        members = np.arange(len(self.countries)) if continent is None else self.continent_members[continent]
+        index = self.year_index.get(int(year))
+        frame = pd.DataFrame({
+            'Country/Territory': np.array(self.countries, dtype=object)[members],
+            'Continent': self.country_continents[members]
+        })
+        for metric in METRICS:
+            frame[metric] = np.nan if index is None else self.country_values[metric][members, index]
+        frame[SCALED_DENSITY] = np.nan if index is None else self.scaled_density['country'][members, index]
+        return frame
+
+    def continent_year_frame(self, year):
+        """Return one row per continent with every aggregated metric for a single year"""
+        index = self.year_index.get(int(year))
+        frame = pd.DataFrame({'Continent': self.continents})
+        for metric in METRICS:
+            frame[metric] = [
+                np.nan if index is None else self.cube[('continent', continent)][metric][index]
+                for continent in self.continents
+            ]
+        frame[SCALED_DENSITY] = np.nan if index is None else self.scaled_density['continent'][:, index]
+        return frame
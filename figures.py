@@ -0,0 +1,171 @@
+import io
+import sys
+import threading
+import weakref
+
+import numpy as np
+from matplotlib import rc_context
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Mimetype of each image format figures can be encoded as
+IMAGE_MIMETYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'svg': 'image/svg+xml'
+}
+
+
+class FigureTracker:
+    """Creates figures with the object-oriented API and keeps count of them
+
+    Figures are attached to their own Agg canvas instead of pyplot's figure
+    manager, so nothing global keeps them alive. release() clears a figure
+    as soon as it has been encoded, so its artists are freed right away
+    rather than at the next garbage collection. `open` counts figures that
+    have not been released yet, `allocated` those not yet collected.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.released = 0
+        self.allocated = 0
+        self.peak_open = 0
+
+    def _collected(self):
+        with self._lock:
+            self.allocated -= 1
+
+    def new_figure(self, figsize, nrows=1, ncols=1, dpi=None, layout=None):
+        """Return a new (figure, axes) pair drawn on an Agg canvas
+
+        layout holds fixed subplots_adjust() margins, so the figure needs no
+        tight-bbox pass when it is encoded.
+        """
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(nrows, ncols)
+        if layout:
+            fig.subplots_adjust(**layout)
+        with self._lock:
+            self.created += 1
+            self.allocated += 1
+            self.peak_open = max(self.peak_open, self.created - self.released)
+        weakref.finalize(fig, self._collected)
+        return fig, axes
+
+    def release(self, fig):
+        """Free a figure's artists once it has been encoded"""
+        fig.clear()
+        with self._lock:
+            self.released += 1
+
+    def stats(self):
+        """Return figure counters, including figures pyplot still holds if it is loaded"""
+        with self._lock:
+            stats = {
+                'created': self.created,
+                'released': self.released,
+                'open': self.created - self.released,
+                'peak_open': self.peak_open,
+                'allocated': self.allocated
+            }
+        pyplot = sys.modules.get('matplotlib.pyplot')
+        stats['pyplot_open'] = len(pyplot.get_fignums()) if pyplot else 0
+        return stats
+
+
+class FigureEncoder:
+    """Encodes figures as PNG, WebP or SVG without savefig()'s extra passes
+
+    Raster formats draw the figure once on its Agg canvas and hand the RGBA
+    buffer straight to Pillow; nothing is re-laid out for a tight bounding
+    box. trim crops uniform background margins from the pixels instead, for
+    maps whose fixed aspect leaves blank bands. Each thread writes into one
+    reused output buffer.
+    """
+
+    def __init__(self, png_compress_level=6, webp_quality=85, trim_padding=8):
+        self.png_compress_level = png_compress_level
+        self.webp_quality = webp_quality
+        self.trim_padding = trim_padding
+        self._local = threading.local()
+
+    def _buffer(self):
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None:
+            buf = self._local.buffer = io.BytesIO()
+        buf.seek(0)
+        buf.truncate()
+        return buf
+
+    def _trim(self, pixels):
+        """Crop rows and columns matching the corner pixel, keeping trim_padding pixels"""
+        content = np.any(pixels != pixels[0, 0], axis=2)
+        rows = np.flatnonzero(content.any(axis=1))
+        columns = np.flatnonzero(content.any(axis=0))
+        if rows.size == 0:
+            return pixels
+        pad = self.trim_padding
+        return pixels[max(rows[0] - pad, 0):rows[-1] + pad + 1,
+                      max(columns[0] - pad, 0):columns[-1] + pad + 1]
+
+    def encode_pixels(self, pixels, image_format='png'):
+        """Encode an (height, width, 3 or 4) uint8 array as PNG or WebP bytes"""
+        from PIL import Image
+        image = Image.fromarray(np.ascontiguousarray(pixels))
+        if image.mode == 'RGBA':
+            # Figures are opaque; dropping alpha saves a quarter of the pixel data
+            image = image.convert('RGB')
+        buf = self._buffer()
+        if image_format == 'webp':
+            image.save(buf, format='WEBP', quality=self.webp_quality)
+        elif image_format == 'png':
+            image.save(buf, format='PNG', compress_level=self.png_compress_level)
+        else:
+            raise ValueError(f"Cannot encode pixels as {image_format}")
+        return buf.getvalue()
+
+    def encode(self, fig, image_format='png', trim=False):
+        """Return the figure encoded as image_format bytes"""
+        if image_format == 'svg':
+            buf = self._buffer()
+            # Keep text as <text> elements instead of one path per glyph
+            with rc_context({'svg.fonttype': 'none'}):
+                fig.savefig(buf, format='svg')
+            return buf.getvalue()
+        canvas = fig.canvas
+        canvas.draw()
+        pixels = np.asarray(canvas.buffer_rgba())
+        if trim:
+            pixels = self._trim(pixels)
+        return self.encode_pixels(pixels, image_format)
+
+
+_tracker = FigureTracker()
+
+
+def new_figure(figsize, nrows=1, ncols=1, dpi=None, layout=None):
+    """Create a tracked figure and its axes"""
+    return _tracker.new_figure(figsize, nrows, ncols, dpi, layout)
+
+
+def release_figure(fig):
+    """Release a figure created by new_figure()"""
+    _tracker.release(fig)
+
+
+def figure_stats():
+    """Return the figure counters of this process"""
+    return _tracker.stats()
+
+
+def get_colormap(name):
+    """Look up a registered colormap by name"""
+    try:
+        from matplotlib import colormaps
+    except ImportError:
+        from matplotlib import cm
+        return cm.get_cmap(name)
+    return colormaps[name]
@@ -0,0 +1,6 @@
+"""Forecast engines behind one interface, with a rolling-origin backtest
+
+    python -m forecasting.backtest --engines loglinear holt arima lstm
+    python -m forecasting.forecast --selection engine_selection.json
+"""
+from forecasting.engines import ENGINES, ForecastEngine, SeriesEngine, create_engine, register_engine
@@ -0,0 +1,200 @@
+"""Rolling-origin backtest of the forecast engines
+
+Each fold cuts the annual panel at an origin year, fits an engine on the
+years up to it and forecasts the next --horizon years. Errors are measured
+against the interpolated history: the MAPE of the compounded population and
+the MAE of the yearly growth. Folds step back --stride years from the
+latest origin that leaves a full horizon. Per-country engines are split
+into chunks of countries and batched engines (LSTM, log-linear, Holt) run
+one task per fold, all in a pool of worker processes. Run from the
+repository root:
+
+    python -m forecasting.backtest --engines loglinear holt arima lstm --processes 8
+
+Writes the per engine and country averages of error, fit time and predict
+time to --output, and to --selection the engine picked for each country:
+the fastest one whose MAPE is within --tolerance of that country's best.
+Feed the selection to python -m forecasting.forecast.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+from data_prep import SOURCE_PATH, census_panel, growth_rates, load_census, recycling_pool
+from forecasting.engines import ENGINES, create_engine
+
+REPORT_PATH = 'backtest_report.csv'
+SELECTION_PATH = 'engine_selection.json'
+
+# Years forecast per fold, number of folds and years between their origins
+HORIZON = 5
+FOLDS = 4
+STRIDE = 3
+
+# Folds whose training history would be shorter than this are skipped
+MIN_TRAIN_YEARS = 15
+
+# Countries per task of the per-country engines
+COUNTRY_CHUNK = 16
+
+# An engine within this relative MAPE of a country's best engine competes on time
+TOLERANCE = 0.1
+
+
+def rolling_origins(year_count, horizon=HORIZON, folds=FOLDS, stride=STRIDE, min_train=MIN_TRAIN_YEARS):
+    """Column indices of the last training year of each fold, oldest first"""
+    latest = year_count - 1 - horizon
+    return sorted(origin for origin in (latest - stride * k for k in range(folds)) if origin + 1 >= min_train)
+
+
+def run_fold(engine_name, countries, population, origin, horizon):
+    """Fit an engine on the years up to origin and score the next horizon years; runs in the pool
+
+    Returns the errors and timings of every country, and the error message
+    of every country the engine failed on, by name.
+    """
+    engine = create_engine(engine_name)
+    engine.fit(population[:, :origin + 1])
+    growth = engine.predict(horizon)
+    predicted = population[:, origin:origin + 1] * np.cumprod(1 + growth, axis=1)
+    actual = population[:, origin + 1:origin + 1 + horizon]
+    actual_growth = growth_rates(population)[:, origin + 1:origin + 1 + horizon]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mape = np.mean(np.abs(predicted - actual) / actual, axis=1) * 100
+    return {
+        'mape': mape,
+        'growth_mae': np.mean(np.abs(growth - actual_growth), axis=1),
+        'fit_s': engine.fit_seconds,
+        'predict_s': engine.predict_seconds,
+        'failures': {countries[row]: message for row, message in engine.errors.items()}
+    }
+
+
+def fold_tasks(engine_names, country_count, origins):
+    """(engine, origin, country rows) of every task; batched engines first, as they are the longest"""
+    tasks = []
+    for engine_name in sorted(engine_names, key=lambda name: not ENGINES[name].batched):
+        if ENGINES[engine_name].batched:
+            chunks = [np.arange(country_count)]
+        else:
+            chunks = np.array_split(np.arange(country_count), max(1, -(-country_count // COUNTRY_CHUNK)))
+        tasks.extend((engine_name, origin, rows) for origin in origins for rows in chunks)
+    return tasks
+
+
+def run_backtest(panel, engine_names, horizon=HORIZON, folds=FOLDS, stride=STRIDE, processes=None):
+    """Return one row per engine, fold and country with its errors and timings"""
+    origins = rolling_origins(len(panel.years), horizon, folds, stride)
+    if not origins:
+        raise ValueError(f"{len(panel.years)} years are too few for a {horizon}-year horizon")
+    tasks = fold_tasks(engine_names, len(panel.countries), origins)
+    records = []
+    started = time.perf_counter()
+
+    def collect(task, result):
+        engine_name, origin, rows = task
+        failures = result.pop('failures')
+        if failures:
+            listed = '; '.join(f"{country}: {message}" for country, message in sorted(failures.items())[:5])
+            more = f" and {len(failures) - 5} more" if len(failures) > 5 else ''
+            print(f"Error: {engine_name} failed on {len(failures)} countries at origin "
+                  f"{int(panel.years[origin])}: {listed}{more}")
+        records.append(pd.DataFrame({
+            'engine': engine_name,
+            'country': panel.countries[rows],
+            'origin_year': int(panel.years[origin]),
+            **result
+        }))
+        if len(records) % 10 == 0 or len(records) == len(tasks):
+            print(f"{len(records)}/{len(tasks)} folds scored in {time.perf_counter() - started:.1f}s")
+
+    if processes == 0:
+        for task in tasks:
+            engine_name, origin, rows = task
+            collect(task, run_fold(engine_name, panel.countries[rows], panel.population[rows], origin, horizon))
+    else:
+        with recycling_pool(processes, tasks_per_child=20) as executor:
+            futures = {
+                executor.submit(run_fold, task[0], panel.countries[task[2]], panel.population[task[2]],
+                                task[1], horizon): task
+                for task in tasks
+            }
+            for future in as_completed(futures):
+                collect(futures[future], future.result())
+    return pd.concat(records, ignore_index=True)
+
+
+def summarize(results):
+    """Average each engine's errors and timings over the folds of every country"""
+    return results.groupby(['engine', 'country'], sort=True).agg(
+        mape=('mape', 'mean'),
+        growth_mae=('growth_mae', 'mean'),
+        fit_s=('fit_s', 'mean'),
+        predict_s=('predict_s', 'mean'),
+        folds=('mape', 'count')
+    ).reset_index()
+
+
+def select_engines(report, tolerance=TOLERANCE):
+    """Pick each country's fastest engine among those within tolerance of its lowest MAPE"""
+    scored = report.dropna(subset=['mape']).copy()
+    scored['cost_s'] = scored['fit_s'] + scored['predict_s']
+    best = scored.groupby('country')['mape'].transform('min')
+    candidates = scored[scored['mape'] <= best * (1 + tolerance)]
+    chosen = candidates.sort_values(['country', 'cost_s', 'mape']).drop_duplicates('country')
+    return dict(zip(chosen['country'], chosen['engine']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=SOURCE_PATH, help='census table to backtest on')
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES),
+                        help='engines to compare')
+    parser.add_argument('--horizon', type=int, default=HORIZON, help='years forecast in each fold')
+    parser.add_argument('--folds', type=int, default=FOLDS, help='forecast origins per country')
+    parser.add_argument('--stride', type=int, default=STRIDE, help='years between fold origins')
+    parser.add_argument('--processes', type=int, help='worker processes (default: one per CPU, 0 = inline)')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='relative MAPE above the best engine still eligible for selection')
+    parser.add_argument('--output', default=REPORT_PATH, help='per engine and country report CSV')
+    parser.add_argument('--selection', default=SELECTION_PATH, help='per country engine selection JSON')
+    args = parser.parse_args()
+
+    # Build each engine once up front, so a missing dependency stops the run before any work
+    for engine_name in args.engines:
+        create_engine(engine_name)
+
+    panel = census_panel(load_census(args.source))
+    results = run_backtest(panel, args.engines, args.horizon, args.folds, args.stride, args.processes)
+    report = summarize(results)
+    report.to_csv(args.output, index=False)
+
+    overview = report.groupby('engine').agg(
+        median_mape=('mape', 'median'),
+        mean_growth_mae=('growth_mae', 'mean'),
+        total_fit_s=('fit_s', 'sum'),
+        total_predict_s=('predict_s', 'sum'),
+        countries=('mape', 'count')
+    ).sort_values('median_mape')
+    print(overview.to_string(float_format=lambda value: f"{value:.4g}"))
+
+    unscored = [engine_name for engine_name in args.engines
+                if not report.loc[report['engine'] == engine_name, 'mape'].notna().any()]
+    if unscored:
+        raise SystemExit(f"ERROR: no country could be scored with {', '.join(unscored)}; "
+                         f"see the errors above. {args.output} was written, {args.selection} was not.")
+
+    selection = select_engines(report, args.tolerance)
+    with open(args.selection, 'w') as f:
+        json.dump(selection, f, indent=2, ensure_ascii=False)
+    counts = pd.Series(selection, dtype=object).value_counts()
+    print("Selected engines: " + ', '.join(f"{engine} {count}" for engine, count in counts.items()))
+    print(f"Wrote {args.output} and {args.selection}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import time
+import warnings
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+from data_prep import growth_rates
+
+# Engine classes by name; register_engine adds to it, create_engine builds from it
+ENGINES = {}
+
+
+def register_engine(cls):
+    """Class decorator making an engine available to create_engine under its name"""
+    ENGINES[cls.name] = cls
+    return cls
+
+
+def create_engine(name, **params):
+    """Build the forecast engine registered under name"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown forecast engine: {name} (available: {', '.join(sorted(ENGINES))})")
+    return ENGINES[name](**params)
+
+
+class ForecastEngine(ABC):
+    """Base class of the forecast engines
+
+    An engine is fitted on a (country x year) population history and
+    forecasts each country's yearly growth, which the combined dataset
+    compounds from the last observed population (see data_prep.extend_panel).
+    Batched engines implement fit() and predict() to handle every country
+    at once and spread the elapsed time evenly over the countries;
+    per-country engines derive from SeriesEngine instead. After predict(),
+    fit_seconds and predict_seconds hold one timing per country and errors
+    maps the row of every country that failed to its error message.
+    Engines import their dependencies when they are created, so a missing
+    package fails right away instead of once per country.
+    """
+
+    name = None
+    batched = False
+
+    def __init__(self):
+        self.models = None
+        self.fit_seconds = None
+        self.predict_seconds = None
+        self.errors = {}
+
+    @abstractmethod
+    def fit(self, population):
+        """Fit every row of the (country x year) population array and return the engine"""
+
+    @abstractmethod
+    def predict(self, steps):
+        """Return the (country x step) growth forecast; NaN for countries without a forecast"""
+
+    @staticmethod
+    def spread(seconds, count):
+        """One batch's elapsed time, split evenly over its countries"""
+        return np.full(count, seconds / max(count, 1))
+
+
+class SeriesEngine(ForecastEngine):
+    """Base class of the engines fitting one model per country
+
+    fit() and predict() loop over the countries and time each one around
+    fit_series() and predict_series().
+    """
+
+    @abstractmethod
+    def fit_series(self, population, growth):
+        """Fit one country's population and growth series and return its model"""
+
+    @abstractmethod
+    def predict_series(self, model, steps):
+        """Return the growth forecast of a model returned by fit_series()"""
+
+    def fit(self, population):
+        """Fit every row of the (country x year) population array; rows with gaps get no model"""
+        growth = growth_rates(population)
+        self.models = []
+        self.errors = {}
+        self.fit_seconds = np.zeros(len(population))
+        for i in range(len(population)):
+            model = None
+            started = time.perf_counter()
+            if not np.isnan(population[i]).any():
+                try:
+                    model = self.fit_series(population[i], growth[i])
+                except Exception as e:
+                    self.errors[i] = f"fit: {str(e)}"
+            self.fit_seconds[i] = time.perf_counter() - started
+            self.models.append(model)
+        return self
+
+    def predict(self, steps):
+        """Return the (country x step) growth forecast; NaN for countries without a model"""
+        forecast = np.full((len(self.models), steps), np.nan)
+        self.predict_seconds = np.zeros(len(self.models))
+        for i, model in enumerate(self.models):
+            if model is None:
+                continue
+            started = time.perf_counter()
+            try:
+                forecast[i] = self.predict_series(model, steps)
+            except Exception as e:
+                self.errors[i] = f"predict: {str(e)}"
+            self.predict_seconds[i] = time.perf_counter() - started
+        return forecast
+
+
+@register_engine
+class ArimaEngine(SeriesEngine):
+    """auto_arima on each country's growth, as in arima_forecast.py"""
+
+    name = 'arima'
+
+    def __init__(self, seasonal=False, m=1):
+        super().__init__()
+        # Imported here so a missing package fails now rather than once per country
+        import pmdarima
+        import statsmodels
+        from arima_forecast import fit_arima
+        self.fit_arima = fit_arima
+        self.seasonal = seasonal
+        self.m = m
+
+    def fit_series(self, population, growth):
+        warnings.filterwarnings("ignore")
+        return self.fit_arima(pd.Series(growth, dtype=float), self.seasonal, self.m)
+
+    def predict_series(self, model, steps):
+        return np.asarray(model.predict(n_periods=steps), dtype=float)
+
+
+@register_engine
+class LstmEngine(ForecastEngine):
+    """One LSTM trained on every country's growth windows, as in lstm_forecast.py"""
+
+    name = 'lstm'
+    batched = True
+
+    def __init__(self, seq_len=None, embedding_dim=None, epochs=None, batch_size=None, seed=0):
+        super().__init__()
+        # Imported here so a missing TensorFlow fails before any fold is scheduled
+        import tensorflow
+        import lstm_forecast
+        self.seq_len = seq_len or lstm_forecast.SEQ_LEN
+        self.embedding_dim = lstm_forecast.EMBEDDING_DIM if embedding_dim is None else embedding_dim
+        self.epochs = epochs or lstm_forecast.EPOCHS
+        self.batch_size = batch_size or lstm_forecast.BATCH_SIZE
+        self.seed = seed
+        self.growth = None
+
+    def fit(self, population):
+        from lstm_forecast import GlobalLSTM
+
+        started = time.perf_counter()
+        self.growth = growth_rates(population)
+        self.models = GlobalLSTM(self.seq_len, self.embedding_dim)
+        self.models.fit(np.arange(len(population)), self.growth, self.epochs, self.batch_size, self.seed)
+        self.fit_seconds = self.spread(time.perf_counter() - started, len(population))
+        return self
+
+    def predict(self, steps):
+        started = time.perf_counter()
+        forecast = self.models.forecast(self.growth, steps)
+        self.predict_seconds = self.spread(time.perf_counter() - started, len(forecast))
+        return forecast
+
+
+@register_engine
+class LogLinearEngine(ForecastEngine):
+    """Constant growth from a least-squares line through the last years of log population"""
+
+    name = 'loglinear'
+    batched = True
+
+    def __init__(self, window=10):
+        super().__init__()
+        self.window = window
+        self.slope = None
+
+    def fit(self, population):
+        started = time.perf_counter()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_population = np.log(np.where(population > 0, population, np.nan))[:, -self.window:]
+        t = np.arange(log_population.shape[1]) - (log_population.shape[1] - 1) / 2
+        centered = log_population - log_population.mean(axis=1, keepdims=True)
+        self.slope = (centered * t).sum(axis=1) / max((t * t).sum(), 1e-12)
+        self.fit_seconds = self.spread(time.perf_counter() - started, len(population))
+        return self
+
+    def predict(self, steps):
+        started = time.perf_counter()
+        forecast = np.repeat(np.expm1(self.slope)[:, None], steps, axis=1)
+        self.predict_seconds = self.spread(time.perf_counter() - started, len(forecast))
+        return forecast
+
+
+@register_engine
+class HoltEngine(ForecastEngine):
+    """Holt's linear exponential smoothing of log population, every country at once
+
+    The smoothed trend is the log growth rate; damping below 1 makes it
+    fade over the horizon.
+    """
+
+    name = 'holt'
+    batched = True
+
+    def __init__(self, alpha=0.8, beta=0.2, damping=1.0):
+        super().__init__()
+        self.alpha = alpha
+        self.beta = beta
+        self.damping = damping
+        self.trend = None
+
+    def fit(self, population):
+        started = time.perf_counter()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_population = np.log(np.where(population > 0, population, np.nan))
+        level = log_population[:, 0]
+        trend = log_population[:, 1] - log_population[:, 0]
+        for t in range(1, log_population.shape[1]):
+            previous = level
+            level = self.alpha * log_population[:, t] + (1 - self.alpha) * (level + self.damping * trend)
+            trend = self.beta * (level - previous) + (1 - self.beta) * self.damping * trend
+        self.trend = trend
+        self.fit_seconds = self.spread(time.perf_counter() - started, len(population))
+        return self
+
+    def predict(self, steps):
+        started = time.perf_counter()
+        damping = self.damping ** np.arange(1, steps + 1)
+        forecast = np.expm1(self.trend[:, None] * damping[None, :])
+        self.predict_seconds = self.spread(time.perf_counter() - started, len(forecast))
+        return forecast
@@ -0,0 +1,72 @@
+"""Forecast every country with the registered engines and write a combined dataset
+
+Either one engine forecasts every country, or --selection (written by
+forecasting.backtest) names an engine per country; countries it does not
+list use --engine. Each engine is fitted once on the full history of its
+countries. The output has the columns of arima_combined_df.csv; serve it
+with WPA_DATA_PATH. Run from the repository root:
+
+    python -m forecasting.forecast --engine holt --output holt_combined_df.csv
+    python -m forecasting.forecast --selection engine_selection.json --engine holt
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from arima_forecast import FORECAST_STEPS, write_csv_atomic
+from data_prep import SOURCE_PATH, census_panel, extend_panel, load_census, panel_frame, select_countries
+from forecasting.engines import ENGINES, create_engine
+
+OUTPUT_PATH = 'selected_combined_df.csv'
+DEFAULT_ENGINE = 'holt'
+
+
+def forecast_growth(panel, engine_by_country, steps=FORECAST_STEPS):
+    """Return the (country x step) growth forecast, fitting each engine on the countries assigned to it"""
+    assigned = np.array([engine_by_country[country] for country in panel.countries], dtype=object)
+    growth = np.full((len(panel.countries), steps), np.nan)
+    for engine_name in sorted(set(assigned)):
+        rows = np.flatnonzero(assigned == engine_name)
+        started = time.perf_counter()
+        engine = create_engine(engine_name).fit(panel.population[rows])
+        growth[rows] = engine.predict(steps)
+        for row, message in sorted(engine.errors.items()):
+            print(f"Error forecasting {panel.countries[rows[row]]} with {engine_name}: {message}")
+        print(f"{engine_name}: {len(rows)} countries in {time.perf_counter() - started:.1f}s")
+    return growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=SOURCE_PATH, help='census table to forecast from')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='combined history and forecast CSV to write')
+    parser.add_argument('--steps', type=int, default=FORECAST_STEPS, help='years to forecast')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+                        help='engine of the countries without a selection')
+    parser.add_argument('--selection', help='per country engine selection JSON from forecasting.backtest')
+    args = parser.parse_args()
+
+    panel = census_panel(load_census(args.source))
+    selection = {}
+    if args.selection:
+        with open(args.selection) as f:
+            selection = json.load(f)
+        unknown = set(selection.values()) - set(ENGINES)
+        if unknown:
+            raise SystemExit(f"Unknown engines in {args.selection}: {', '.join(sorted(unknown))}")
+    engine_by_country = {country: selection.get(country, args.engine) for country in panel.countries}
+
+    growth = forecast_growth(panel, engine_by_country, args.steps)
+    forecast_ok = ~np.isnan(growth).any(axis=1)
+    if not forecast_ok.all():
+        print(f"Skipped {(~forecast_ok).sum()} countries without a forecast: "
+              f"{', '.join(panel.countries[~forecast_ok])}")
+    combined = panel_frame(select_countries(extend_panel(panel, growth), forecast_ok))
+    write_csv_atomic(combined, args.output)
+    print(f"Wrote {len(combined)} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
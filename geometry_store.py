@@ -0,0 +1,233 @@
+import gzip
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import geopandas as gpd
+
+# Simplification tolerance in degrees for each geometry tier, finest first.
+# The names follow the Natural Earth scales the tiers roughly correspond to.
+GEOMETRY_TIERS = OrderedDict([
+    ('10m', 0.0),
+    ('50m', 0.02),
+    ('110m', 0.1)
+])
+
+FINEST_TIER = '10m'
+
+FRAME_NAMES = ('countries', 'continents', 'world')
+
+# Attribute columns kept in the GeoJSON of each frame; they are the keys map values join on
+FRAME_KEYS = {
+    'countries': ['NAME', 'CONTINENT'],
+    'continents': ['CONTINENT'],
+    'world': []
+}
+
+
+def simplify_frame(frame, tolerance):
+    """Return a copy of a GeoDataFrame with its geometries simplified"""
+    simplified = frame.copy()
+    simplified['geometry'] = frame.geometry.simplify(tolerance, preserve_topology=True)
+    return simplified
+
+
+def coordinate_precision(tolerance):
+    """Decimal places that keep rounding well below a tier's simplification tolerance"""
+    if tolerance <= 0:
+        return 5
+    return max(2, math.ceil(-math.log10(tolerance)) + 1)
+
+
+def _round_coordinates(coordinates, precision):
+    if len(coordinates) and isinstance(coordinates[0], (int, float)):
+        return [round(value, precision) for value in coordinates]
+    return [_round_coordinates(part, precision) for part in coordinates]
+
+
+def encode_geojson(frame, columns, precision):
+    """Encode a GeoDataFrame as a compact GeoJSON FeatureCollection with rounded coordinates"""
+    features = []
+    for row in frame[columns + ['geometry']].itertuples(index=False):
+        geometry = row[-1]
+        if geometry is None or geometry.is_empty:
+            continue
+        shape = geometry.__geo_interface__
+        features.append({
+            'type': 'Feature',
+            'properties': {column: value for column, value in zip(columns, row[:-1])},
+            'geometry': {
+                'type': shape['type'],
+                'coordinates': _round_coordinates(shape['coordinates'], precision)
+            }
+        })
+    collection = {'type': 'FeatureCollection', 'features': features}
+    return json.dumps(collection, separators=(',', ':')).encode('utf-8')
+
+
+class GeometryStore:
+    """Country, continent and world geometries, dissolved once and shared by all map builders
+
+    Dissolving the 10m country shapes is the most expensive step of a map
+    request and never changes between requests, so the dissolved frames are
+    built on first use and kept for the life of the process. Each frame is
+    also available in coarser, pre-simplified tiers; when a cache_dir is
+    given the tiers are written there as GeoParquet and read back on the
+    next start instead of being rebuilt. Accessors return the shared frames
+    (or row selections of them) without copying; builders must not modify
+    them and attach values with assign() or merge() instead.
+    """
+
+    def __init__(self, countries, tiers=None, cache_dir=None, source_version=None):
+        self._countries = countries
+        self.tiers = tiers if tiers else OrderedDict([(FINEST_TIER, 0.0)])
+        self.cache_dir = cache_dir
+        self.source_version = source_version
+        self._frames = {}
+        self._extents = {}
+        self._encoded = {}
+        self._lock = threading.RLock()
+
+    def preload(self):
+        """Build (or load) every tier up front"""
+        for tier in self.tiers:
+            self._tier(tier)
+        return self
+
+    def _cache_path(self, tier, frame_name):
+        return os.path.join(self.cache_dir, f"{tier}-{frame_name}-{self.source_version}.parquet")
+
+    def _load_tier(self, tier):
+        if not self.cache_dir or not self.source_version:
+            return None
+        paths = {name: self._cache_path(tier, name) for name in FRAME_NAMES}
+        if not all(os.path.exists(path) for path in paths.values()):
+            return None
+        try:
+            return {name: gpd.read_parquet(path) for name, path in paths.items()}
+        except Exception as e:
+            print(f"Error loading geometry tier {tier}: {str(e)}")
+            return None
+
+    def _save_tier(self, tier, frames):
+        if not self.cache_dir or not self.source_version:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for name, frame in frames.items():
+                path = self._cache_path(tier, name)
+                tmp_path = f"{path}.tmp"
+                frame.to_parquet(tmp_path)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error saving geometry tier {tier}: {str(e)}")
+
+    def _build_tier(self, tier):
+        tolerance = self.tiers[tier]
+        if tolerance == 0:
+            return {
+                'countries': self._countries,
+                'continents': self._countries.dissolve(by='CONTINENT', as_index=False),
+                'world': self._countries.dissolve().reset_index(drop=True)
+            }
+        finest = self._tier(next(iter(self.tiers)))
+        return {name: simplify_frame(frame, tolerance) for name, frame in finest.items()}
+
+    def _tier(self, tier):
+        if tier not in self.tiers:
+            tier = next(iter(self.tiers))
+        frames = self._frames.get(tier)
+        if frames is None:
+            with self._lock:
+                frames = self._frames.get(tier)
+                if frames is None:
+                    frames = self._load_tier(tier)
+                    if frames is None:
+                        frames = self._build_tier(tier)
+                        self._save_tier(tier, frames)
+                    self._frames[tier] = frames
+        return frames
+
+    def _extent(self, level, name=None):
+        """Return the larger side, in degrees, of the bounding box drawn at a zoom level"""
+        key = (level, name)
+        if key not in self._extents:
+            frames = self._tier(next(iter(self.tiers)))
+            if level == 'continent':
+                shape = frames['continents'][frames['continents']['CONTINENT'] == name]
+            elif level == 'country':
+                shape = frames['countries'][frames['countries']['NAME'] == name]
+            else:
+                shape = frames['world']
+            if shape.empty:
+                shape = frames['world']
+            minx, miny, maxx, maxy = shape.total_bounds
+            self._extents[key] = max(maxx - minx, maxy - miny)
+        return self._extents[key]
+
+    def tier_for(self, level, name=None, width_px=1000):
+        """Pick the coarsest tier whose tolerance stays below one pixel at this zoom level"""
+        degrees_per_pixel = self._extent(level, name) / width_px
+        selected = next(iter(self.tiers))
+        for tier, tolerance in self.tiers.items():
+            if tolerance <= degrees_per_pixel:
+                selected = tier
+        return selected
+
+    def geojson(self, frame_name, tier=FINEST_TIER, compressed=False):
+        """Return a frame of a tier as GeoJSON bytes, optionally gzipped
+
+        Only the key columns are kept and coordinates are rounded to the
+        tier's precision. Both encodings are built once and reused, so
+        serving the shapes is a memory copy.
+        """
+        if tier not in self.tiers:
+            tier = next(iter(self.tiers))
+        key = (frame_name, tier)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            with self._lock:
+                encoded = self._encoded.get(key)
+                if encoded is None:
+                    frame = self._tier(tier)[frame_name]
+                    columns = [column for column in FRAME_KEYS[frame_name] if column in frame.columns]
+                    raw = encode_geojson(frame, columns, coordinate_precision(self.tiers[tier]))
+                    encoded = (raw, gzip.compress(raw, compresslevel=9))
+                    self._encoded[key] = encoded
+        return encoded[1] if compressed else encoded[0]
+
+    def countries(self, tier=FINEST_TIER):
+        """Return the country-level frame"""
+        return self._tier(tier)['countries']
+
+    def country(self, name, tier=FINEST_TIER):
+        """Return the shape of a single country"""
+        countries = self._tier(tier)['countries']
+        return countries[countries['NAME'] == name]
+
+    def countries_in(self, continent_name, tier=FINEST_TIER):
+        """Return the country shapes of one continent"""
+        countries = self._tier(tier)['countries']
+        return countries[countries['CONTINENT'] == continent_name]
+
+    def countries_outside(self, name=None, continent_name=None, tier=FINEST_TIER):
+        """Return every country except the named country or continent"""
+        countries = self._tier(tier)['countries']
+        if continent_name is not None:
+            return countries[countries['CONTINENT'] != continent_name]
+        return countries[countries['NAME'] != name]
+
+    def continents(self, tier=FINEST_TIER):
+        """Return one dissolved shape per continent"""
+        return self._tier(tier)['continents']
+
+    def continent(self, name, tier=FINEST_TIER):
+        """Return the dissolved shape of a single continent"""
+        continents = self._tier(tier)['continents']
+        return continents[continents['CONTINENT'] == name].reset_index(drop=True)
+
+    def world_outline(self, tier=FINEST_TIER):
+        """Return the dissolved outline of the whole world"""
+        return self._tier(tier)['world']
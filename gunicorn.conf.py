@@ -0,0 +1,32 @@
+"""Gunicorn settings for serving the app in production
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is preloaded in the master, so the dataset and shapes are read once
+and shared by the forked workers. Render jobs are tracked in the worker that
+created them, so by default one worker serves every request from a pool of
+threads and figures are rendered by that worker's render processes. More
+workers need sticky routing of /render_jobs requests.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('WPA_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WPA_WEB_WORKERS', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('WPA_WEB_THREADS', 16))
+preload_app = True
+# Render job event streams stay open while plots render; keep-alives arrive every 15s
+timeout = 120
+graceful_timeout = 30
+accesslog = '-'
+
+# Split the CPUs between the workers' render pools; read by app.py when it is preloaded
+os.environ.setdefault('WPA_RENDER_PROCESSES', str(max(multiprocessing.cpu_count() // workers, 2)))
+os.environ.setdefault('WPA_DEBUG', '0')
+
+
+def post_fork(server, worker):
+    """Give each worker its own MongoDB client instead of the master's"""
+    import wsgi
+    wsgi.init_worker()
@@ -0,0 +1,225 @@
+"""Train one LSTM on every country's growth and write lstm_combined_df.csv
+
+Batched version of model_analysis_lstm.ipynb. Instead of compiling and
+fitting a separate Keras model per country and forecasting one step at a
+time per country, a single network is trained on the sliding windows of
+all countries together and forecasts every country in one batch per step:
+
+  - each country's growth is min-max scaled on its own range (the
+    notebook's per-country MinMaxScaler), so small and fast-growing
+    countries share the network
+  - a learned country embedding is joined to the LSTM output, so the
+    network can still tell the series apart (--embedding-dim 0 turns it off)
+  - the layers follow the notebook: LSTM(64) -> Dropout -> LSTM(32) ->
+    Dropout -> Dense(1), adam and mean squared error
+
+The history comes from data_prep.py and the output has the same columns as
+arima_combined_df.csv; serve it with WPA_DATA_PATH=lstm_combined_df.csv.
+Run from the repository root:
+
+    python lstm_forecast.py --epochs 100
+
+The trained network and its scaling are saved to saved_models/lstm;
+--predict-only forecasts from them again without training.
+"""
+import argparse
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+
+from arima_forecast import write_csv_atomic, write_json_atomic
+from data_prep import (SOURCE_PATH, PANEL_COLUMNS, census_panel, extend_panel, growth_rates, load_census, panel_frame,
+                       select_countries)
+
+OUTPUT_PATH = 'lstm_combined_df.csv'
+MODEL_DIR = 'saved_models/lstm'
+
+# Window length fed to the network and years forecast past the last census year
+SEQ_LEN = 5
+FORECAST_STEPS = 10
+
+# Training settings; the notebook's 100 epochs, over every country's windows at once
+EPOCHS = 100
+BATCH_SIZE = 256
+EMBEDDING_DIM = 8
+LSTM_UNITS = (64, 32)
+DROPOUT = 0.2
+
+
+def sliding_windows(values, seq_len):
+    """Split every row into (window, next value) pairs; returns windows, targets and their row indices"""
+    pairs = np.lib.stride_tricks.sliding_window_view(values, seq_len + 1, axis=1)
+    rows = np.repeat(np.arange(values.shape[0]), pairs.shape[1])
+    pairs = pairs.reshape(-1, seq_len + 1)
+    complete = ~np.isnan(pairs).any(axis=1)
+    return pairs[complete, :-1], pairs[complete, -1], rows[complete]
+
+
+class GlobalLSTM:
+    """One LSTM growth forecaster shared by every country
+
+    Growth is scaled per country to [0, 1] on the range seen in training.
+    fit() trains on the windows of all countries together; forecast()
+    advances every country's last window one step per network call, so a
+    horizon of n years costs n batched calls regardless of the number of
+    countries.
+    """
+
+    def __init__(self, seq_len=SEQ_LEN, embedding_dim=EMBEDDING_DIM, units=LSTM_UNITS, dropout=DROPOUT):
+        self.seq_len = seq_len
+        self.embedding_dim = embedding_dim
+        self.units = tuple(units)
+        self.dropout = dropout
+        self.countries = None
+        self.low = None
+        self.span = None
+        self.model = None
+
+    def _build(self, country_count):
+        from tensorflow import keras
+
+        window = keras.Input(shape=(self.seq_len, 1), name='window')
+        x = keras.layers.LSTM(self.units[0], return_sequences=True, activation='tanh')(window)
+        x = keras.layers.Dropout(self.dropout)(x)
+        x = keras.layers.LSTM(self.units[1], activation='tanh')(x)
+        x = keras.layers.Dropout(self.dropout)(x)
+        inputs = [window]
+        if self.embedding_dim:
+            country = keras.Input(shape=(1,), dtype='int32', name='country')
+            embedded = keras.layers.Flatten()(keras.layers.Embedding(country_count, self.embedding_dim)(country))
+            x = keras.layers.Concatenate()([x, embedded])
+            inputs.append(country)
+        model = keras.Model(inputs, keras.layers.Dense(1)(x))
+        model.compile(optimizer='adam', loss='mse')
+        return model
+
+    def _inputs(self, windows, rows):
+        inputs = [windows[..., None].astype('float32')]
+        if self.embedding_dim:
+            inputs.append(rows[:, None].astype('int32'))
+        return inputs
+
+    def scale(self, growth):
+        return (growth - self.low[:, None]) / self.span[:, None]
+
+    def fit(self, countries, growth, epochs=EPOCHS, batch_size=BATCH_SIZE, seed=0):
+        """Train on the (country x year) growth array; rows are in the order of countries"""
+        from tensorflow import keras
+
+        keras.utils.set_random_seed(seed)
+        self.countries = np.asarray(countries, dtype=object)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            self.low = np.nanmin(growth, axis=1)
+            span = np.nanmax(growth, axis=1) - self.low
+        self.low = np.nan_to_num(self.low)
+        self.span = np.where(np.isfinite(span) & (span > 0), span, 1.0)
+        windows, targets, rows = sliding_windows(self.scale(growth), self.seq_len)
+        if not len(windows):
+            raise ValueError(f"No country has {self.seq_len + 1} consecutive years of growth to train on")
+        self.model = self._build(len(self.countries))
+        self.model.fit(self._inputs(windows, rows), targets.astype('float32'),
+                       epochs=epochs, batch_size=batch_size, shuffle=True, verbose=0)
+        return len(windows)
+
+    def forecast(self, growth, steps=FORECAST_STEPS):
+        """Continue every row of growth by steps years; rows whose last window has gaps stay NaN"""
+        windows = self.scale(growth)[:, -self.seq_len:]
+        ready = ~np.isnan(windows).any(axis=1)
+        rows = np.flatnonzero(ready)
+        windows = windows[ready]
+        predictions = np.full((len(growth), steps), np.nan)
+        if not len(rows):
+            return predictions
+        scaled = np.empty((len(rows), steps))
+        for step in range(steps):
+            scaled[:, step] = self.model(self._inputs(windows, rows), training=False).numpy()[:, 0]
+            windows = np.concatenate([windows[:, 1:], scaled[:, step:step + 1]], axis=1)
+        predictions[ready] = scaled * self.span[ready, None] + self.low[ready, None]
+        return predictions
+
+    def save(self, model_dir):
+        os.makedirs(model_dir, exist_ok=True)
+        self.model.save(os.path.join(model_dir, 'global_lstm.keras'))
+        state = {
+            'seq_len': self.seq_len,
+            'embedding_dim': self.embedding_dim,
+            'units': list(self.units),
+            'dropout': self.dropout,
+            'countries': self.countries.tolist(),
+            'low': self.low.tolist(),
+            'span': self.span.tolist()
+        }
+        write_json_atomic(os.path.join(model_dir, 'global_lstm.json'), state)
+
+    @classmethod
+    def load(cls, model_dir):
+        from tensorflow import keras
+
+        with open(os.path.join(model_dir, 'global_lstm.json')) as f:
+            state = json.load(f)
+        forecaster = cls(state['seq_len'], state['embedding_dim'], state['units'], state['dropout'])
+        forecaster.countries = np.asarray(state['countries'], dtype=object)
+        forecaster.low = np.asarray(state['low'], dtype=float)
+        forecaster.span = np.asarray(state['span'], dtype=float)
+        forecaster.model = keras.models.load_model(os.path.join(model_dir, 'global_lstm.keras'))
+        return forecaster
+
+    def rows_for(self, countries):
+        """Indices into countries of the trained countries, in training order"""
+        index = {country: i for i, country in enumerate(countries)}
+        missing = [country for country in self.countries if country not in index]
+        if missing:
+            raise ValueError(f"Countries missing from the source: {', '.join(missing)}")
+        return np.array([index[country] for country in self.countries])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=SOURCE_PATH, help='census table to forecast from')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='combined history and forecast CSV to write')
+    parser.add_argument('--steps', type=int, default=FORECAST_STEPS, help='years to forecast')
+    parser.add_argument('--seq-len', type=int, default=SEQ_LEN, help='years in each input window')
+    parser.add_argument('--epochs', type=int, default=EPOCHS, help='passes over the windows of all countries')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='windows per training step')
+    parser.add_argument('--embedding-dim', type=int, default=EMBEDDING_DIM,
+                        help='size of the learned country embedding (0 = scaling only)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the weight initialization and shuffling')
+    parser.add_argument('--model-dir', default=MODEL_DIR, help='where the trained network and its scaling are saved')
+    parser.add_argument('--predict-only', action='store_true', help='forecast with the saved network without training')
+    args = parser.parse_args()
+
+    panel = census_panel(load_census(args.source))
+    growth = growth_rates(panel.population)
+
+    started = time.perf_counter()
+    if args.predict_only:
+        forecaster = GlobalLSTM.load(args.model_dir)
+        rows = forecaster.rows_for(panel.countries)
+        panel = select_countries(panel, rows)
+        growth = growth[rows]
+    else:
+        forecaster = GlobalLSTM(args.seq_len, args.embedding_dim)
+        window_count = forecaster.fit(panel.countries, growth, args.epochs, args.batch_size, args.seed)
+        forecaster.save(args.model_dir)
+        print(f"Trained on {window_count} windows of {len(panel.countries)} countries "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    growth_forecast = forecaster.forecast(growth, args.steps)
+    forecast_ok = ~np.isnan(growth_forecast).any(axis=1)
+    print(f"Forecast {forecast_ok.sum()} countries {args.steps} years ahead in {time.perf_counter() - started:.2f}s")
+    if not forecast_ok.all():
+        print(f"Skipped {(~forecast_ok).sum()} countries without {forecaster.seq_len} years of growth: "
+              f"{', '.join(panel.countries[~forecast_ok])}")
+
+    combined = panel_frame(select_countries(extend_panel(panel, growth_forecast), forecast_ok))
+    write_csv_atomic(combined[PANEL_COLUMNS], args.output)
+    print(f"Wrote {len(combined)} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
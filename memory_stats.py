@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def peak_rss():
+    """Highest resident set size this process has reached, in bytes"""
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+class RssProbe:
+    """Estimates the peak RSS reached while a piece of work runs
+
+    The process-wide peak only moves when the work sets a new high; if it
+    did not, the larger of the RSS before and after is the best estimate.
+    """
+
+    def __init__(self):
+        self.start_rss = current_rss()
+        self.start_peak = peak_rss()
+
+    def stop(self):
+        """Return the RSS at the end, the estimated peak and the growth, in bytes"""
+        end_rss = current_rss()
+        end_peak = peak_rss()
+        peak = end_peak if end_peak > self.start_peak else max(self.start_rss, end_rss)
+        return {'rss': end_rss, 'peak_rss': peak, 'rss_growth': end_rss - self.start_rss}
+
+
+class RequestMemoryStats:
+    """Per-endpoint peak RSS of the requests served by this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, measurement):
+        """Add one request's RssProbe measurement"""
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'max_peak_rss': 0,
+                'max_rss_growth': 0
+            })
+            entry['requests'] += 1
+            entry['last_peak_rss'] = measurement['peak_rss']
+            entry['max_peak_rss'] = max(entry['max_peak_rss'], measurement['peak_rss'])
+            entry['max_rss_growth'] = max(entry['max_rss_growth'], measurement['rss_growth'])
+
+    def stats(self):
+        """Return the per-endpoint counters"""
+        with self._lock:
+            return {endpoint: dict(entry) for endpoint, entry in self._endpoints.items()}
@@ -0,0 +1,226 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram buckets in seconds, from sub-millisecond lookups to slow map renders
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = [
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    ]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the counter of these labels"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    record = inc
+
+    def lines(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Cumulative histogram of observed values with labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def observe(self, value, **labels):
+        """Record one observation"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    record = observe
+
+    def lines(self):
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback when metrics are collected
+
+    The callback returns a number, or a list of (labels dict, number) pairs.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, read, label_names=(), kind='gauge'):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        self.label_names = tuple(label_names)
+        self.kind = kind
+
+    def lines(self):
+        value = self.read()
+        samples = value if isinstance(value, list) else [({}, value)]
+        return [
+            f"{self.name}{_format_labels(self.label_names, [labels.get(n, '') for n in self.label_names])} "
+            f"{_format_value(sample)}"
+            for labels, sample in samples
+        ]
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._add(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name, help_text, read, label_names=(), kind='gauge'):
+        return self._add(Gauge(name, help_text, read, label_names, kind))
+
+    def get(self, name):
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self):
+        """Return every metric as Prometheus exposition text"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.lines()
+            except Exception as e:
+                print(f"Error collecting metric {metric.name}: {str(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'wpa_stage_seconds',
+    'Time spent in each stage of building and serving plots',
+    ['stage', 'plot_type', 'level']
+)
+
+_capture = threading.local()
+
+
+def record(metric_name, value, **labels):
+    """Record a value on a registered metric, or hand it to the active capture"""
+    captured = getattr(_capture, 'observations', None)
+    if captured is not None:
+        captured.append((metric_name, labels, value))
+        return
+    registry.get(metric_name).record(value, **labels)
+
+
+@contextmanager
+def timed(stage, plot_type='', level=''):
+    """Time a block as one observation of wpa_stage_seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(STAGE_SECONDS.name, time.perf_counter() - started,
+               stage=stage, plot_type=plot_type, level=level or '')
+
+
+@contextmanager
+def capture():
+    """Collect the observations made in this thread instead of recording them
+
+    Render workers are separate processes, so their observations are
+    captured, sent back with the rendered image and replayed in the
+    serving process.
+    """
+    previous = getattr(_capture, 'observations', None)
+    observations = []
+    _capture.observations = observations
+    try:
+        yield observations
+    finally:
+        _capture.observations = previous
+
+
+def replay(observations):
+    """Record observations captured in another process"""
+    for metric_name, labels, value in observations:
+        metric = registry.get(metric_name)
+        if metric is not None:
+            metric.record(value, **labels)
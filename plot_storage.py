@@ -0,0 +1,275 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from datetime import datetime, timezone
+
+# GridFS default chunk size (255 KiB)
+GRIDFS_CHUNK_SIZE = 255 * 1024
+
+# A stored image ready to be streamed: `stream` is a readable file-like object
+StoredPlot = namedtuple('StoredPlot', ['plot_id', 'content_type', 'length', 'etag', 'last_modified', 'stream'])
+
+
+def content_hash(image_data):
+    """Hex SHA-256 of image bytes, used as ETag and as the id of content-addressed stores"""
+    return hashlib.sha256(image_data).hexdigest()
+
+
+class PlotStorage(ABC):
+    """Base class of the plot storage backends
+
+    Backends implement save() and get(); the batch methods default to
+    looping over them and may be overridden with real bulk operations.
+    """
+
+    @abstractmethod
+    def save(self, image_data, plot_type, metadata, content_type='image/png'):
+        """Store image bytes and return the plot id"""
+
+    @abstractmethod
+    def get(self, plot_id):
+        """Return a StoredPlot, or None if the id is unknown"""
+
+    def save_many(self, items):
+        """Store (image_data, plot_type, metadata, content_type) items and return their ids"""
+        return [self.save(*item) for item in items]
+
+    def get_many(self, plot_ids, inline_max_bytes):
+        """Return {plot_id: StoredPlot}; only plots up to inline_max_bytes carry a stream"""
+        plots = {}
+        for plot_id in plot_ids:
+            plot = self.get(plot_id)
+            if plot is None:
+                continue
+            if plot.length > inline_max_bytes:
+                plot.stream.close()
+                plot = plot._replace(stream=None)
+            plots[plot_id] = plot
+        return plots
+
+
+class MemoryPlotStorage(PlotStorage):
+    """Keeps plots in a dict; for tests and single-process development"""
+
+    def __init__(self):
+        self._plots = {}
+        self._lock = threading.Lock()
+
+    def save(self, image_data, plot_type, metadata, content_type='image/png'):
+        """Store image bytes and return the plot id"""
+        plot_id = content_hash(image_data)[:24]
+        with self._lock:
+            self._plots[plot_id] = (image_data, content_type, datetime.now(timezone.utc))
+        return plot_id
+
+    def get(self, plot_id):
+        """Return a StoredPlot, or None if the id is unknown"""
+        with self._lock:
+            entry = self._plots.get(plot_id)
+        if entry is None:
+            return None
+        image_data, content_type, created_at = entry
+        return StoredPlot(plot_id, content_type, len(image_data), content_hash(image_data),
+                          created_at, io.BytesIO(image_data))
+
+
+class FilePlotStorage(PlotStorage):
+    """Content-addressed plot files under a local directory
+
+    The plot id is a prefix of the image's SHA-256, so identical renders are
+    stored once. Files are fanned out into two-character subdirectories and
+    a small JSON sidecar keeps the content type and metadata.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, plot_id, suffix):
+        return os.path.join(self.root, plot_id[:2], f"{plot_id}{suffix}")
+
+    def save(self, image_data, plot_type, metadata, content_type='image/png'):
+        """Store image bytes and return the plot id"""
+        plot_id = content_hash(image_data)[:24]
+        data_path = self._path(plot_id, '.bin')
+        if not os.path.exists(data_path):
+            os.makedirs(os.path.dirname(data_path), exist_ok=True)
+            info = {
+                'plot_type': plot_type,
+                'metadata': metadata,
+                'content_type': content_type,
+                'created_at': datetime.now(timezone.utc).isoformat()
+            }
+            with open(self._path(plot_id, '.json'), 'w') as f:
+                json.dump(info, f, default=str)
+            tmp_path = f"{data_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(image_data)
+            os.replace(tmp_path, data_path)
+        return plot_id
+
+    def get(self, plot_id):
+        """Return a StoredPlot, or None if the id is unknown"""
+        if not plot_id.isalnum():
+            return None
+        data_path = self._path(plot_id, '.bin')
+        if not os.path.exists(data_path):
+            return None
+        try:
+            with open(self._path(plot_id, '.json')) as f:
+                content_type = json.load(f).get('content_type', 'image/png')
+        except (OSError, ValueError):
+            content_type = 'image/png'
+        stat = os.stat(data_path)
+        return StoredPlot(plot_id, content_type, stat.st_size, plot_id,
+                          datetime.fromtimestamp(stat.st_mtime, timezone.utc), open(data_path, 'rb'))
+
+
+class GridFSPlotStorage(PlotStorage):
+    """Plots stored as GridFS files, so large maps stay out of regular documents
+
+    Plots saved before GridFS was used live inline in `legacy_collection`
+    and are still served from there.
+    """
+
+    def __init__(self, db, bucket='plot_images', legacy_collection='plots'):
+        import gridfs
+        self._fs = gridfs.GridFS(db, collection=bucket)
+        self._files = db[f"{bucket}.files"]
+        self._chunks = db[f"{bucket}.chunks"]
+        self._chunk_index_ready = False
+        self._legacy = db[legacy_collection] if legacy_collection else None
+
+    def save(self, image_data, plot_type, metadata, content_type='image/png'):
+        """Store image bytes and return the plot id"""
+        file_id = self._fs.put(
+            image_data,
+            filename=plot_type,
+            content_type=content_type,
+            metadata={**metadata, 'plot_type': plot_type, 'sha256': content_hash(image_data)}
+        )
+        return str(file_id)
+
+    def save_many(self, items):
+        """Store (image_data, plot_type, metadata, content_type) items and return their ids
+
+        Writes the GridFS chunk and file documents of every item directly,
+        with one insert_many per collection instead of a put() per plot.
+        Chunks go first so a reader never finds a file without its data.
+        """
+        from bson import Binary, ObjectId
+        if not items:
+            return []
+        if not self._chunk_index_ready:
+            self._chunks.create_index([('files_id', 1), ('n', 1)], unique=True)
+            self._chunk_index_ready = True
+
+        # GridFS stores upload dates with millisecond precision
+        now = datetime.now(timezone.utc)
+        upload_date = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        files, chunks = [], []
+        for image_data, plot_type, metadata, content_type in items:
+            file_id = ObjectId()
+            for n, offset in enumerate(range(0, len(image_data), GRIDFS_CHUNK_SIZE)):
+                chunks.append({
+                    'files_id': file_id,
+                    'n': n,
+                    'data': Binary(image_data[offset:offset + GRIDFS_CHUNK_SIZE])
+                })
+            files.append({
+                '_id': file_id,
+                'length': len(image_data),
+                'chunkSize': GRIDFS_CHUNK_SIZE,
+                'uploadDate': upload_date,
+                'filename': plot_type,
+                'contentType': content_type,
+                'metadata': {**metadata, 'plot_type': plot_type, 'sha256': content_hash(image_data)}
+            })
+        if chunks:
+            self._chunks.insert_many(chunks, ordered=False)
+        self._files.insert_many(files, ordered=False)
+        return [str(file_doc['_id']) for file_doc in files]
+
+    def get(self, plot_id):
+        """Return a StoredPlot, or None if the id is unknown"""
+        import gridfs
+        from bson import ObjectId
+        from bson.errors import InvalidId
+        try:
+            object_id = ObjectId(plot_id)
+        except InvalidId:
+            return None
+        try:
+            grid_out = self._fs.get(object_id)
+        except gridfs.errors.NoFile:
+            return self._get_legacy(object_id)
+        metadata = grid_out.metadata or {}
+        last_modified = grid_out.upload_date
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return StoredPlot(plot_id, grid_out.content_type or 'image/png', grid_out.length,
+                          metadata.get('sha256', plot_id), last_modified, grid_out)
+
+    def get_many(self, plot_ids, inline_max_bytes):
+        """Return {plot_id: StoredPlot}; only plots up to inline_max_bytes carry a stream
+
+        Looks up all file documents with one query and the chunks of the small
+        plots with a second one.
+        """
+        from bson import ObjectId
+        object_ids = [ObjectId(plot_id) for plot_id in plot_ids if ObjectId.is_valid(plot_id)]
+        files = {file_doc['_id']: file_doc for file_doc in self._files.find({'_id': {'$in': object_ids}})}
+        inline_ids = [file_id for file_id, file_doc in files.items() if file_doc['length'] <= inline_max_bytes]
+        data = {file_id: [] for file_id in inline_ids}
+        if inline_ids:
+            for chunk in self._chunks.find({'files_id': {'$in': inline_ids}}).sort([('files_id', 1), ('n', 1)]):
+                data[chunk['files_id']].append(bytes(chunk['data']))
+
+        plots = {}
+        for file_id, file_doc in files.items():
+            metadata = file_doc.get('metadata') or {}
+            last_modified = file_doc['uploadDate']
+            if last_modified.tzinfo is None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+            stream = io.BytesIO(b''.join(data[file_id])) if file_id in data else None
+            plots[str(file_id)] = StoredPlot(str(file_id), file_doc.get('contentType') or 'image/png',
+                                             file_doc['length'], metadata.get('sha256', str(file_id)),
+                                             last_modified, stream)
+
+        # Anything not in GridFS may be a legacy inline plot
+        for plot_id in plot_ids:
+            if plot_id not in plots and ObjectId.is_valid(plot_id):
+                plot = self._get_legacy(ObjectId(plot_id))
+                if plot is not None:
+                    if plot.length > inline_max_bytes:
+                        plot = plot._replace(stream=None)
+                    plots[plot_id] = plot
+        return plots
+
+    def _get_legacy(self, object_id):
+        if self._legacy is None:
+            return None
+        plot = self._legacy.find_one({'_id': object_id})
+        if not plot:
+            return None
+        image_data = plot['image_data']
+        created_at = plot.get('created_at') or datetime.now(timezone.utc)
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return StoredPlot(str(object_id), 'image/png', len(image_data), content_hash(image_data),
+                          created_at, io.BytesIO(image_data))
+
+
+def create_plot_storage(kind, db=None, root=None):
+    """Build the plot storage backend named by kind: 'gridfs', 'file' or 'memory'"""
+    if kind == 'gridfs':
+        return GridFSPlotStorage(db)
+    if kind == 'file':
+        return FilePlotStorage(root)
+    if kind == 'memory':
+        return MemoryPlotStorage()
+    raise ValueError(f"Unknown plot storage backend: {kind}")
@@ -0,0 +1,274 @@
+"""Pre-render the plots of common selections into the plot store
+
+Enumerates the world, every continent and every country over a set of year
+ranges, renders every server-side plot type with the render pool and saves
+the images to the app's plot storage. A manifest maps each selection to
+its stored plot, so /get_data serves those selections with a storage read.
+Run from the repository root:
+
+    python prerender.py --year-pairs 1970:2032 2022:2032 --processes 8
+
+Each plot carries a fingerprint of the data it is drawn from. Re-running
+after arima_combined_df.csv changes only renders plots whose inputs
+changed; the rest are carried over to the new dataset version. The
+manifest is saved after every batch, so an interrupted run resumes where it
+stopped.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+MANIFEST_VERSION = 1
+
+# Bump when the drawing code changes so every plot is rendered again
+RENDERER_VERSION = 3
+
+DEFAULT_YEAR_PAIRS = [(1970, 2032), (1970, 2022), (2022, 2032)]
+
+
+def manifest_key(spec):
+    """Key of a PlotSpec in the manifest; independent of the dataset version"""
+    key = f"{spec.section}/{spec.name or ''}/{spec.plot_type}/{spec.start_year}-{spec.end_year}"
+    return key if spec.image_format == 'png' else f"{key}.{spec.image_format}"
+
+
+class PrerenderManifest:
+    """Maps pre-rendered selections to their stored plot ids
+
+    Every entry records the dataset version it was last validated against;
+    lookups only return entries of the current version. The file is reread
+    when another process (the pre-render CLI) replaces it.
+    """
+
+    def __init__(self, path, check_interval=30):
+        self.path = path
+        self.check_interval = check_interval
+        self.entries = {}
+        self._mtime = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Reload the manifest if the file changed since it was read"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                manifest = json.load(f)
+            with self._lock:
+                self.entries = manifest.get('entries', {})
+                self._mtime = mtime
+        except Exception as e:
+            print(f"Error loading pre-render manifest: {str(e)}")
+
+    def lookup(self, spec, dataset_version):
+        """Return the stored plot id of a spec, or None if it is missing or stale"""
+        with self._lock:
+            entry = self.entries.get(manifest_key(spec))
+        if entry and entry.get('dataset_version') == dataset_version:
+            return entry['plot_id']
+        return None
+
+    def record(self, spec, plot_id, fingerprint, dataset_version):
+        """Add or replace the entry of a spec"""
+        with self._lock:
+            self.entries[manifest_key(spec)] = {
+                'plot_id': plot_id,
+                'fingerprint': fingerprint,
+                'dataset_version': dataset_version
+            }
+
+    def save(self):
+        """Write the manifest atomically"""
+        with self._lock:
+            manifest = {'version': MANIFEST_VERSION, 'entries': dict(self.entries)}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+
+class InputFingerprints:
+    """Hashes of the store values each plot is drawn from
+
+    A country's plots depend on its own rows (and the world total, for the
+    pie charts), a continent's on its member countries and the world's on
+    every country. Entity digests are computed once and combined with the
+    plot's own parameters.
+    """
+
+    def __init__(self, store, shapefile_version):
+        self.store = store
+        self.shapefile_version = shapefile_version
+        self._digests = {}
+
+    def _hash_rows(self, digest, members):
+        for metric in sorted(self.store.country_values):
+            digest.update(np.ascontiguousarray(self.store.country_values[metric][members]).tobytes())
+
+    def entity(self, section, name=None):
+        """Digest of every value a section's plots can read"""
+        key = (section, name)
+        if key not in self._digests:
+            digest = hashlib.sha256()
+            digest.update(np.ascontiguousarray(self.store.years).tobytes())
+            if section == 'country':
+                self._hash_rows(digest, [self.store.country_index[name]])
+                digest.update(np.ascontiguousarray(self.store.cube[('world', None)]['Population']).tobytes())
+            elif section == 'continent':
+                members = self.store.continent_members[name]
+                digest.update(json.dumps([self.store.countries[i] for i in members]).encode('utf-8'))
+                self._hash_rows(digest, members)
+                digest.update(np.ascontiguousarray(self.store.cube[('world', None)]['Population']).tobytes())
+            else:
+                digest.update(json.dumps(self.store.countries).encode('utf-8'))
+                self._hash_rows(digest, slice(None))
+            self._digests[key] = digest.hexdigest()
+        return self._digests[key]
+
+    def spec(self, spec):
+        """Fingerprint of one plot: its inputs, parameters, shapes and renderer version"""
+        payload = json.dumps([
+            self.entity(spec.section, spec.name), list(spec), self.shapefile_version, RENDERER_VERSION
+        ], default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+
+def enumerate_specs(app_module, year_pairs, sections, formats=('preferred',)):
+    """Yield a PlotSpec for every server-rendered plot of every selection, in each of the formats
+
+    'preferred' is the format the app negotiates with browsers that accept
+    it, 'png' the fallback for those that do not.
+    """
+    from render_pool import PlotSpec
+    names = {
+        'world': [None],
+        'continent': app_module.store.continents,
+        'country': app_module.store.countries
+    }
+    for section in sections:
+        for name in names[section]:
+            for start_year, end_year in year_pairs:
+                for plot_type in app_module.server_plot_types(section):
+                    image_formats = {
+                        app_module.preferred_image_format(plot_type) if image_format == 'preferred' else image_format
+                        for image_format in formats
+                    }
+                    for image_format in sorted(image_formats):
+                        yield PlotSpec(section, plot_type, name, start_year, end_year,
+                                       image_format=image_format)
+
+
+def parse_year_pair(value):
+    start, _, end = value.partition(':')
+    try:
+        start_year, end_year = int(start), int(end)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Year range must look like 1970:2032, got {value!r}")
+    return start_year, end_year
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--year-pairs', nargs='+', type=parse_year_pair, default=DEFAULT_YEAR_PAIRS,
+                        metavar='START:END', help='year ranges to pre-render')
+    parser.add_argument('--sections', nargs='+', choices=['world', 'continent', 'country'],
+                        default=['world', 'continent', 'country'])
+    parser.add_argument('--processes', type=int, help='render worker processes (default: app setting)')
+    parser.add_argument('--formats', nargs='+', choices=['preferred', 'png'], default=['preferred'],
+                        help="image formats to store: the negotiated 'preferred' one and/or the PNG fallback")
+    parser.add_argument('--batch-size', type=int, default=32, help='plots stored per bulk write')
+    parser.add_argument('--force', action='store_true', help='render every plot even if unchanged')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would be rendered')
+    args = parser.parse_args()
+
+    import app as app_module
+    from render_pool import RenderPool
+
+    if app_module.PLOT_STORAGE == 'memory':
+        parser.error("pre-rendered plots need a persistent PLOT_STORAGE ('gridfs' or 'file')")
+
+    dataset_version = app_module.DATASET_VERSION
+    manifest = PrerenderManifest(app_module.PRERENDER_MANIFEST_PATH)
+    fingerprints = InputFingerprints(app_module.store, app_module.SHAPEFILE_VERSION)
+
+    # Carry unchanged plots over to this dataset version; collect the rest
+    pending = []
+    carried = current = 0
+    for spec in enumerate_specs(app_module, args.year_pairs, args.sections, args.formats):
+        fingerprint = fingerprints.spec(spec)
+        entry = manifest.entries.get(manifest_key(spec))
+        if entry and entry['fingerprint'] == fingerprint and not args.force:
+            if entry['dataset_version'] == dataset_version:
+                current += 1
+            else:
+                manifest.record(spec, entry['plot_id'], fingerprint, dataset_version)
+                carried += 1
+            continue
+        pending.append((spec, fingerprint))
+    print(f"{current} plots current, {carried} carried over unchanged, {len(pending)} to render")
+    if args.dry_run:
+        return
+    if carried:
+        manifest.save()
+
+    processes = app_module.RENDER_PROCESSES if args.processes is None else args.processes
+    render_pool = RenderPool('app', processes=processes)
+    started = time.perf_counter()
+    rendered = failed = 0
+    try:
+        for offset in range(0, len(pending), args.batch_size):
+            batch = pending[offset:offset + args.batch_size]
+            futures = [render_pool.submit(spec) for spec, _ in batch]
+            items, done = [], []
+            for (spec, fingerprint), future in zip(batch, futures):
+                try:
+                    image_data = future.result()
+                except Exception as e:
+                    print(f"Error rendering {manifest_key(spec)}: {str(e)}")
+                    failed += 1
+                    continue
+                metadata = {
+                    'section': spec.section,
+                    'plot_type': spec.plot_type,
+                    'selection': {
+                        'name': spec.name,
+                        'start_year': spec.start_year,
+                        'end_year': spec.end_year
+                    },
+                    'dataset_version': dataset_version,
+                    'prerendered': True
+                }
+                items.append((image_data, spec.plot_type, metadata, app_module.IMAGE_MIMETYPES[spec.image_format]))
+                done.append((spec, fingerprint))
+            for (spec, fingerprint), plot_id in zip(done, app_module.save_plots(items)):
+                if plot_id:
+                    manifest.record(spec, plot_id, fingerprint, dataset_version)
+                    rendered += 1
+                else:
+                    failed += 1
+            manifest.save()
+            elapsed = time.perf_counter() - started
+            print(f"{rendered}/{len(pending)} rendered ({failed} failed) in {elapsed:.1f}s")
+    finally:
+        render_pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
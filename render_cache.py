@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """Return a short content hash of a file, used as a dataset version"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class RenderCache:
+    """Content-addressed cache mapping a normalized plot request to a stored plot id
+
+    Entries are evicted least-recently-used once max_entries is reached and
+    expire ttl_seconds after they were stored.
+    """
+
+    def __init__(self, max_entries=2048, ttl_seconds=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(plot_type, selection, dataset_version):
+        """Hash a plot type, its selection and the dataset version into a cache key"""
+        normalized = {
+            'plot_type': plot_type,
+            'selection': {k: v for k, v in sorted(selection.items()) if v is not None},
+            'dataset_version': dataset_version
+        }
+        payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached plot id for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                plot_id, stored_at = entry
+                if time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return plot_id
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, plot_id):
+        """Store a plot id under key, evicting the oldest entries if full"""
+        with self._lock:
+            self._entries[key] = (plot_id, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+class PanelCache:
+    """Rendered map panels shared by every render worker and kept across restarts
+
+    Panels are PNG files under root, named by a hash of their parameters
+    and written atomically, so concurrent workers may render the same
+    panel but never read a partial file. Recently used panels are also
+    kept in memory. With root=None panels are only kept in memory.
+    """
+
+    def __init__(self, root=None, max_memory_entries=256):
+        self.root = root
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _name(key):
+        payload = json.dumps(list(key), separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def _path(self, name):
+        return os.path.join(self.root, name[:2], f"{name}.png")
+
+    def _remember(self, name, image_data):
+        with self._lock:
+            self._memory[name] = image_data
+            self._memory.move_to_end(name)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the panel's PNG bytes, or None if it has not been rendered"""
+        name = self._name(key)
+        with self._lock:
+            image_data = self._memory.get(name)
+            if image_data is not None:
+                self._memory.move_to_end(name)
+                self.hits += 1
+                return image_data
+        if self.root:
+            try:
+                with open(self._path(name), 'rb') as f:
+                    image_data = f.read()
+            except OSError:
+                image_data = None
+        with self._lock:
+            if image_data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._remember(name, image_data)
+        return image_data
+
+    def put(self, key, image_data):
+        """Store a rendered panel"""
+        name = self._name(key)
+        self._remember(name, image_data)
+        if not self.root:
+            return
+        try:
+            path = self._path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(image_data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error saving map panel: {str(e)}")
+
+    def stats(self):
+        """Return hit/miss counters of panel lookups"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
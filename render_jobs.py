@@ -0,0 +1,147 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RenderJob:
+    """Progress of one /get_data request whose plots render in the background
+
+    Every finished (or failed) plot is appended to an event list; readers
+    block on the job's condition until events past the ones they have
+    already seen arrive.
+    """
+
+    def __init__(self, job_id, slots, total, plot_ids=None):
+        self.id = job_id
+        self.slots = slots
+        self.total = total
+        self.plot_ids = {section: dict((plot_ids or {}).get(section, {})) for section in slots}
+        self.events = []
+        self.created_at = time.time()
+        self._condition = threading.Condition()
+
+    @property
+    def done(self):
+        return len(self.events) >= self.total
+
+    def record(self, section, plot_type, plot_id=None, error=None):
+        """Record one finished plot and wake up any waiting readers"""
+        with self._condition:
+            event = {'section': section, 'plot_type': plot_type}
+            if plot_id:
+                self.plot_ids.setdefault(section, {})[plot_type] = plot_id
+                event['plot_id'] = plot_id
+            else:
+                event['error'] = error or 'Plot could not be rendered'
+            self.events.append(event)
+            self._condition.notify_all()
+
+    def wait_for_events(self, seen, timeout=15):
+        """Block until there are events beyond the first `seen`, then return them"""
+        with self._condition:
+            if len(self.events) <= seen and not self.done:
+                self._condition.wait(timeout)
+            return self.events[seen:]
+
+    def status(self):
+        """Return a JSON-serializable snapshot of the job"""
+        with self._condition:
+            return {
+                'job_id': self.id,
+                'done': self.done,
+                'total': self.total,
+                'completed': len(self.events),
+                'plot_slots': self.slots,
+                'plot_ids': self.plot_ids,
+                'errors': [event for event in self.events if 'error' in event]
+            }
+
+
+class RenderJobManager:
+    """Submits render jobs to a RenderPool and keeps the most recent ones for status lookups
+
+    Finished batches are stored on a few storage threads of their own: the
+    render futures' callbacks run on the pool's result-collecting thread,
+    which must not wait on bulk storage writes.
+    """
+
+    def __init__(self, render_pool, max_jobs=256, storage_threads=2):
+        self.render_pool = render_pool
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._storage = ThreadPoolExecutor(max_workers=storage_threads, thread_name_prefix='plot-storage')
+
+    def submit(self, slots, batches, on_rendered, plot_ids=None):
+        """Start rendering batches of specs in the background and return the new RenderJob
+
+        slots maps each section to the plot types the client should expect.
+        Once every spec of a batch has rendered, on_rendered(results) is
+        called on a storage thread with its (spec, image_data) pairs so they
+        can be stored in a single bulk write; it returns the plot ids in the
+        same order.
+        plot_ids holds plots that were already available, e.g. from the
+        render cache. Batches are submitted in the order given, so cheap
+        plots placed first reach the client first.
+        """
+        job = RenderJob(uuid.uuid4().hex, slots, sum(len(batch) for batch in batches), plot_ids)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+        def finish(batch_futures):
+            results = []
+            for spec, future in batch_futures:
+                try:
+                    results.append((spec, future.result()))
+                except Exception as e:
+                    job.record(spec.section, spec.plot_type, error=str(e))
+            if not results:
+                return
+            try:
+                stored_ids = on_rendered(results)
+            except Exception as e:
+                for spec, _ in results:
+                    job.record(spec.section, spec.plot_type, error=str(e))
+                return
+            for (spec, _), plot_id in zip(results, stored_ids):
+                job.record(spec.section, spec.plot_type, plot_id=plot_id)
+
+        for batch in batches:
+            batch_futures = [(spec, self.render_pool.submit(spec)) for spec in batch]
+            remaining = [len(batch_futures)]
+            remaining_lock = threading.Lock()
+
+            def on_done(_, batch_futures=batch_futures, remaining=remaining, remaining_lock=remaining_lock):
+                with remaining_lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    self._storage.submit(finish, batch_futures)
+
+            for _, future in batch_futures:
+                future.add_done_callback(on_done)
+        return job
+
+    def get(self, job_id):
+        """Return the job with this id, or None if unknown or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_count(self):
+        """Number of tracked jobs that still have plots rendering"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def pending_count(self):
+        """Number of plots queued or rendering across all tracked jobs"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sum(max(job.total - len(job.events), 0) for job in jobs)
+
+    def shutdown(self):
+        """Wait for the batches already handed to the storage threads to be stored"""
+        self._storage.shutdown(wait=True)
@@ -0,0 +1,174 @@
+import importlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import metrics
+from memory_stats import RssProbe
+
+# A picklable description of one figure: which section and plot type to
+# draw, for which continent/country name and year range. full_range keeps
+# the whole year span in the line graphs (used by /get_visualizations);
+# image_format is the encoding: 'png', 'webp' or 'svg'.
+PlotSpec = namedtuple('PlotSpec', ['section', 'plot_type', 'name', 'start_year', 'end_year', 'full_range',
+                                   'image_format'],
+                      defaults=[False, 'png'])
+
+_render_spec = None
+
+
+def _load_renderer(module_name):
+    """Resolve the module-level render_plot_spec function of the app module"""
+    module = sys.modules.get(module_name) or importlib.import_module(module_name)
+    return module.render_plot_spec
+
+
+def _init_worker(module_name):
+    """Pool initializer: select a headless backend and load the app's data once"""
+    global _render_spec
+    import matplotlib
+    matplotlib.use('Agg')
+    _render_spec = _load_renderer(module_name)
+
+
+def _render_measured(render_spec, spec):
+    """Render a spec and report the time, memory, live figures and metrics of the rendering process"""
+    from figures import figure_stats
+    probe = RssProbe()
+    started = time.perf_counter()
+    with metrics.capture() as observations:
+        image_data = render_spec(spec)
+    stats = probe.stop()
+    figures = figure_stats()
+    stats.update({
+        'pid': os.getpid(),
+        'plot_type': spec.plot_type,
+        'seconds': time.perf_counter() - started,
+        'open_figures': figures['open'] + figures['pyplot_open'],
+        'observations': observations
+    })
+    return image_data, stats
+
+
+def _render_in_worker(spec):
+    return _render_measured(_render_spec, spec)
+
+
+def _render_in_thread(module_name, spec):
+    return _render_measured(_load_renderer(module_name), spec)
+
+
+class RenderPool:
+    """Renders PlotSpecs to image bytes across a pool of worker processes
+
+    Matplotlib's pyplot state is not thread safe, so figures are drawn in
+    separate processes. Workers are forked where the platform allows it and
+    share the parent's already-loaded data; otherwise the initializer imports
+    the app module, which loads the dataset and shapefile once per worker.
+    With processes=0 specs are rendered one at a time on a background
+    thread of the calling process instead.
+    """
+
+    def __init__(self, module_name, processes=None):
+        self.module_name = module_name
+        self.processes = os.cpu_count() if processes is None else processes
+        self._executor = None
+        self._workers = {}
+        self._stats_lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None and self.processes == 0:
+            # A single thread, as pyplot state must not be shared between threads
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='render')
+        elif self._executor is None:
+            if 'fork' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('fork')
+            else:
+                context = multiprocessing.get_context()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.module_name,)
+            )
+        return self._executor
+
+    def _record(self, stats):
+        """Keep the latest memory figures of the process that rendered a spec and replay its metrics"""
+        metrics.replay(stats.get('observations', []))
+        with self._stats_lock:
+            worker = self._workers.setdefault(stats['pid'], {
+                'renders': 0,
+                'render_seconds': 0.0,
+                'max_render_peak_rss': 0
+            })
+            worker['renders'] += 1
+            worker['render_seconds'] += stats['seconds']
+            worker['rss'] = stats['rss']
+            worker['open_figures'] = stats['open_figures']
+            worker['last_render_peak_rss'] = stats['peak_rss']
+            worker['max_render_peak_rss'] = max(worker['max_render_peak_rss'], stats['peak_rss'])
+
+    def _unwrap(self, future):
+        """Turn a Future of (image bytes, stats) into a Future of the image bytes"""
+        result = Future()
+
+        def done(inner):
+            try:
+                image_data, stats = inner.result()
+            except Exception as e:
+                result.set_exception(e)
+                return
+            self._record(stats)
+            result.set_result(image_data)
+
+        future.add_done_callback(done)
+        return result
+
+    def submit(self, spec):
+        """Schedule one spec and return a Future resolving to its image bytes"""
+        if self.processes == 0:
+            return self._unwrap(self._get_executor().submit(_render_in_thread, self.module_name, spec))
+        return self._unwrap(self._get_executor().submit(_render_in_worker, spec))
+
+    def render(self, specs):
+        """Render specs and return their image bytes in the same order"""
+        specs = list(specs)
+        if not specs:
+            return []
+        if self.processes == 0:
+            # On the render thread, so these never overlap with submitted specs
+            executor = self._get_executor()
+            results = list(executor.map(_render_in_thread, [self.module_name] * len(specs), specs))
+        elif len(specs) == 1:
+            render_spec = _load_renderer(self.module_name)
+            results = [_render_measured(render_spec, spec) for spec in specs]
+        else:
+            results = list(self._get_executor().map(_render_in_worker, specs))
+        for _, stats in results:
+            self._record(stats)
+        return [image_data for image_data, _ in results]
+
+    def worker_stats(self):
+        """Return render counts, RSS and open figures of every process that has rendered"""
+        with self._stats_lock:
+            return {str(pid): dict(worker) for pid, worker in self._workers.items()}
+
+    def restart(self):
+        """Replace the worker processes with fresh ones forked on the next submit
+
+        Renders already running finish in the old workers.
+        """
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,102 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = 'manifest.json'
+DATA_NAME = 'data.feather'
+SHAPES_NAME = 'countries.parquet'
+INDEX_NAME = 'index.json'
+
+
+def source_signature(path):
+    """Cheap change detector for a source file: its size and modification time"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _shapefile_sources(shapefile_path):
+    """The shapefile plus its sidecar files, which change together"""
+    base, _ = os.path.splitext(shapefile_path)
+    return [path for path in (f"{base}{ext}" for ext in ('.shp', '.shx', '.dbf', '.prj', '.cpg'))
+            if os.path.exists(path)]
+
+
+def _signatures(data_path, shapefile_path):
+    return {path: source_signature(path) for path in [data_path] + _shapefile_sources(shapefile_path)}
+
+
+def load_snapshot(snapshot_dir, data_path, shapefile_path):
+    """Load the prepared dataset, country shapes and store arrays if the snapshot is current
+
+    Returns None when there is no snapshot or its source files have changed.
+    The store arrays are memory-mapped, so forked workers share their pages.
+    """
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('sources') != _signatures(data_path, shapefile_path):
+            return None
+
+        import geopandas as gpd
+        df = pd.read_feather(os.path.join(snapshot_dir, DATA_NAME))
+        world = gpd.read_parquet(os.path.join(snapshot_dir, SHAPES_NAME))
+        with open(os.path.join(snapshot_dir, INDEX_NAME)) as f:
+            index = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(snapshot_dir, filename), mmap_mode='r')
+            for name, filename in manifest['arrays'].items()
+        }
+        return {
+            'df': df,
+            'world': world,
+            'dataset_version': manifest['dataset_version'],
+            'shapefile_version': manifest['shapefile_version'],
+            'store_index': index,
+            'store_arrays': arrays
+        }
+    except Exception as e:
+        print(f"Error loading snapshot: {str(e)}")
+        return None
+
+
+def write_snapshot(snapshot_dir, data_path, shapefile_path, df, world, dataset_version,
+                   shapefile_version, store):
+    """Serialize the prepared frames and store indexes for the next start
+
+    The manifest is written last, so an interrupted write leaves the previous
+    manifest pointing at sources that no longer match and is ignored.
+    """
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        manifest_path = os.path.join(snapshot_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        df.reset_index(drop=True).to_feather(os.path.join(snapshot_dir, DATA_NAME))
+        world.to_parquet(os.path.join(snapshot_dir, SHAPES_NAME))
+        with open(os.path.join(snapshot_dir, INDEX_NAME), 'w') as f:
+            json.dump(store.index_state(), f)
+
+        arrays = {}
+        for name, values in store.array_state().items():
+            filename = f"{name}.npy"
+            np.save(os.path.join(snapshot_dir, filename), values)
+            arrays[name] = filename
+
+        manifest = {
+            'sources': _signatures(data_path, shapefile_path),
+            'dataset_version': dataset_version,
+            'shapefile_version': shapefile_version,
+            'arrays': arrays
+        }
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+    except Exception as e:
+        print(f"Error writing snapshot: {str(e)}")
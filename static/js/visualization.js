@@ -94,67 +94,350 @@ function fetchVisualizations(data) {
     });
 }
 
-// Function to display visualizations
-function displayVisualizations(plotIds) {
+// Helper to hide an image slot that has nothing to show
+function hideImage(element, alt) {
+    element.style.display = 'none';
+    element.alt = alt;
+}
+
+// Function to display visualizations, fetching all their images in one request
+async function displayVisualizations(plotIds) {
     console.log("DEBUG: Full plot IDs object:", plotIds);
 
-    // Helper function to set image source
-    const setImage = async (id, plotId) => {
-        const element = document.getElementById(id);
-        console.log(`[DEBUG] setImage called for id='${id}', plotId='${plotId}'`);
-        if (!element) {
-            console.warn(`[DEBUG] No element found in DOM for id='${id}'`);
-            return;
-        }
-        if (!plotId) {
-            console.warn(`[DEBUG] No plotId provided for id='${id}'`);
-            element.style.display = 'none';
-            element.alt = 'No data available';
-            return;
+    // Collect [element, plotId] pairs for country, continent and world visualizations
+    const targets = [];
+    ['country', 'continent', 'world'].forEach(section => {
+        if (!plotIds[section]) return;
+        Object.entries(plotIds[section]).forEach(([type, plotId]) => {
+            const id = `${section}-${type}`;
+            const element = document.getElementById(id);
+            if (!element) {
+                console.warn(`[DEBUG] No element found in DOM for id='${id}'`);
+            } else if (!plotId) {
+                console.warn(`[DEBUG] No plotId provided for id='${id}'`);
+                hideImage(element, 'No data available');
+            } else {
+                targets.push([element, plotId]);
+            }
+        });
+    });
+    if (targets.length === 0) return;
+
+    // Show loading state
+    targets.forEach(([element]) => {
+        element.style.display = 'block';
+        element.alt = 'Loading...';
+    });
+
+    try {
+        const ids = targets.map(([, plotId]) => plotId).join(',');
+        console.log(`[DEBUG] Fetching /get_plots for ${targets.length} plots`);
+        const response = await fetch(`/get_plots?ids=${encodeURIComponent(ids)}`);
+        const result = await response.json();
+        if (result.status !== 'success') {
+            throw new Error(result.message);
         }
-        try {
-            // Show loading state
-            element.style.display = 'block';
-            element.src = '';
-            element.alt = 'Loading...';
-            console.log(`[DEBUG] Fetching /get_plot/${plotId} for id='${id}'`);
-            const response = await fetch(`/get_plot/${plotId}`);
-            if (response.ok) {
-                const blob = await response.blob();
-                element.src = URL.createObjectURL(blob);
+        targets.forEach(([element, plotId]) => {
+            const plot = result.plots[plotId];
+            if (plot) {
+                // Small images arrive inline; large ones load from their cacheable URL
+                element.src = plot.data || plot.url;
                 element.alt = '';
-                console.log(`[DEBUG] Successfully loaded image for id='${id}'`);
             } else {
-                console.error(`[DEBUG] Failed to load plot for id='${id}', plotId='${plotId}', status=${response.status}`);
-                element.style.display = 'none';
-                element.alt = 'Failed to load image';
+                console.error(`[DEBUG] Failed to load plot for id='${element.id}', plotId='${plotId}'`);
+                hideImage(element, 'Failed to load image');
+            }
+        });
+    } catch (error) {
+        console.error('[DEBUG] Error loading plots:', error);
+        targets.forEach(([element]) => hideImage(element, 'Error loading image'));
+    }
+}
+
+// Image formats this browser displays, listed in the /get_data Accept header so plots can be encoded in them
+const PLOT_IMAGE_ACCEPT = (() => {
+    const canvas = document.createElement('canvas');
+    canvas.width = canvas.height = 1;
+    const webp = canvas.toDataURL('image/webp').startsWith('data:image/webp');
+    return ['application/json', 'image/svg+xml', ...(webp ? ['image/webp'] : []), 'image/png'].join(', ');
+})();
+
+// Series fetched from /api/series per section, kept so the year range can be re-sliced locally
+const seriesCache = {};
+
+const GRAPH_LABELS = {
+    population_graph: { metric: 'population', title: 'Population', yaxis: 'Population' },
+    density_graph: { metric: 'density', title: 'Population Density', yaxis: 'Density' },
+    growth_graph: { metric: 'growth', title: 'Population Growth', yaxis: 'Growth Rate' }
+};
+
+// Function to show the graph year range inputs and redraw the graphs when they change
+function setupGraphRange(formData) {
+    const range = document.getElementById('graph-range');
+    const startInput = document.getElementById('graph-start-year');
+    const endInput = document.getElementById('graph-end-year');
+    if (!range || !startInput || !endInput) return;
+    startInput.value = formData.start_year || 1970;
+    endInput.value = formData.end_year || 2032;
+    range.style.display = 'flex';
+    if (!range.dataset.bound) {
+        [startInput, endInput].forEach(input => {
+            input.addEventListener('change', () => Object.keys(seriesCache).forEach(drawSectionCharts));
+        });
+        range.dataset.bound = 'true';
+    }
+}
+
+// Function to draw one section's line graphs from its cached series
+function drawSectionCharts(section) {
+    const { data, name, plotTypes } = seriesCache[section];
+    const start = parseInt(document.getElementById('graph-start-year')?.value) || data.years[0];
+    const end = parseInt(document.getElementById('graph-end-year')?.value) || data.years[data.years.length - 1];
+    const label = section === 'world' ? 'World' : name;
+
+    plotTypes.forEach(type => {
+        const info = GRAPH_LABELS[type];
+        const chart = document.getElementById(`${section}-${type}-chart`);
+        if (!info || !chart) return;
+        const image = document.getElementById(`${section}-${type}`);
+        if (image) image.style.display = 'none';
+        chart.style.display = 'block';
+
+        // Split at the pivot year into a solid historical and a dashed forecast line
+        const values = data.series[info.metric];
+        const historical = { x: [], y: [] };
+        const forecast = { x: [], y: [] };
+        data.years.forEach((year, i) => {
+            if (year < start || year > end) return;
+            const target = i < data.forecast_start ? historical : forecast;
+            target.x.push(year);
+            target.y.push(values[i]);
+        });
+        Plotly.react(chart, [
+            { ...historical, mode: 'lines', name: 'Historical' },
+            { ...forecast, mode: 'lines', name: 'Forecast', line: { dash: 'dash' } }
+        ], {
+            title: `${label} ${info.title}`,
+            xaxis: { title: 'Year' },
+            yaxis: { title: info.yaxis },
+            margin: { t: 50 }
+        }, { responsive: true });
+    });
+}
+
+// Function to fetch the series of every selected section and draw its line graphs in the browser
+async function renderSeriesCharts(formData, plotTypes) {
+    plotTypes = (plotTypes || []).filter(type => type in GRAPH_LABELS);
+    if (plotTypes.length === 0) return;
+    if (typeof Plotly === 'undefined') {
+        console.error('[DEBUG] Plotly is not available; line graphs cannot be drawn');
+        return;
+    }
+    setupGraphRange(formData);
+
+    const names = { world: null, continent: formData.continent, country: formData.country };
+    const sections = (formData.selection_types || []).filter(section =>
+        section in names && (section === 'world' || names[section]));
+    const metrics = plotTypes.map(type => GRAPH_LABELS[type].metric).join(',');
+
+    await Promise.all(sections.map(async section => {
+        const params = new URLSearchParams({ level: section, metrics: metrics });
+        if (names[section]) params.set('name', names[section]);
+        try {
+            const response = await fetch(`/api/series?${params}`);
+            const result = await response.json();
+            if (result.status !== 'success') {
+                throw new Error(result.message);
             }
+            seriesCache[section] = { data: result, name: names[section], plotTypes: plotTypes };
+            drawSectionCharts(section);
         } catch (error) {
-            console.error(`[DEBUG] Error loading plot for id='${id}', plotId='${plotId}':`, error);
-            element.style.display = 'none';
-            element.alt = 'Error loading image';
+            console.error(`[DEBUG] Error loading series for '${section}':`, error);
         }
-    };
+    }));
+}
 
-    // Display country visualizations
-    if (plotIds.country) {
-        Object.entries(plotIds.country).forEach(([type, id]) => {
-            setImage(`country-${type}`, id);
+// Geometry fetched from /api/geometry, shared by every map drawn on the same frame and tier
+const geometryCache = {};
+
+function loadGeometry(url) {
+    if (!geometryCache[url]) {
+        geometryCache[url] = fetch(url).then(response => {
+            if (!response.ok) throw new Error(`Geometry request failed: ${response.status}`);
+            return response.json();
         });
     }
+    return geometryCache[url];
+}
 
-    // Display continent visualizations
-    if (plotIds.continent) {
-        Object.entries(plotIds.continent).forEach(([type, id]) => {
-            setImage(`continent-${type}`, id);
-        });
+// Function to build the Plotly trace of one map panel from /api/choropleth data
+function choroplethTrace(panel, geometry, geo, showScale) {
+    // One flat color band per bin, so bin i is drawn in exactly bin_colors[i]
+    const count = panel.bin_labels.length;
+    const colorscale = [];
+    panel.bin_colors.forEach((color, i) => {
+        colorscale.push([i / count, color], [(i + 1) / count, color]);
+    });
+    return {
+        type: 'choropleth',
+        geo: geo,
+        geojson: geometry,
+        featureidkey: `properties.${panel.key_property}`,
+        locations: panel.keys,
+        z: panel.bins,
+        zmin: -0.5,
+        zmax: count - 0.5,
+        colorscale: colorscale,
+        showscale: showScale,
+        colorbar: { tickvals: [...Array(count).keys()], ticktext: panel.bin_labels },
+        customdata: panel.values.map(value => value === null ? 'No data' : value.toLocaleString()),
+        hovertemplate: '%{location}<br>%{customdata}<extra></extra>',
+        marker: { line: { color: 'black', width: 0.5 } }
+    };
+}
+
+// Function to draw a two-panel (start and end year) map in the browser
+async function drawChoropleth(section, type, formData) {
+    const match = type.match(/^(\w+?)_maps_(country|continent)_wise$/);
+    const chart = document.getElementById(`${section}-${type}-chart`);
+    if (!match || !chart) return;
+    const [, metric, scope] = match;
+
+    const years = [formData.start_year || 1970, formData.end_year || 2032];
+    const panels = await Promise.all(years.map(async year => {
+        const params = new URLSearchParams({ level: `${section}-${scope}-wise`, metric: metric, year: year });
+        if (section === 'continent') params.set('name', formData.continent);
+        const response = await fetch(`/api/choropleth?${params}`);
+        const result = await response.json();
+        if (result.status !== 'success') {
+            throw new Error(result.message);
+        }
+        return result;
+    }));
+    const geometry = await loadGeometry(panels[0].geometry_url);
+
+    const geoLayout = domain => ({
+        domain: { x: domain },
+        fitbounds: 'locations',
+        visible: false,
+        projection: { type: 'equirectangular' }
+    });
+    const layout = {
+        geo: geoLayout([0, 0.48]),
+        geo2: geoLayout([0.52, 1]),
+        annotations: panels.map((panel, i) => ({
+            text: panel.title,
+            x: i === 0 ? 0.24 : 0.76,
+            y: 1.05,
+            xref: 'paper',
+            yref: 'paper',
+            showarrow: false
+        })),
+        margin: { t: 40, l: 10, r: 10, b: 10 }
+    };
+    await Plotly.react(chart, [
+        choroplethTrace(panels[0], geometry, 'geo', false),
+        choroplethTrace(panels[1], geometry, 'geo2', true)
+    ], layout, { responsive: true });
+    chart.dataset.drawn = 'true';
+
+    // Show the chart in place of the image if its map view is selected
+    const checked = document.querySelector(`input[name="${section}-map-view"]:checked`);
+    if (checked) updateMapView(section, checked.value);
+}
+
+// Function to color every selected continent- and country-wise map in the browser
+async function renderChoropleths(formData, plotTypes) {
+    plotTypes = (plotTypes || []).filter(type => type.includes('_maps_'));
+    if (plotTypes.length === 0) return;
+    if (typeof Plotly === 'undefined') {
+        console.error('[DEBUG] Plotly is not available; maps cannot be drawn');
+        return;
     }
+    const sections = (formData.selection_types || []).filter(section =>
+        section === 'world' || (section === 'continent' && formData.continent));
+
+    await Promise.all(sections.flatMap(section => plotTypes.map(async type => {
+        try {
+            await drawChoropleth(section, type, formData);
+        } catch (error) {
+            console.error(`[DEBUG] Error drawing map '${section}-${type}':`, error);
+        }
+    })));
+}
 
-    // Display world visualizations
-    if (plotIds.world) {
-        Object.entries(plotIds.world).forEach(([type, id]) => {
-            setImage(`world-${type}`, id);
+// Function to mark plots that are still rendering
+function showPendingSlots(plotSlots, plotIds) {
+    Object.entries(plotSlots || {}).forEach(([section, types]) => {
+        types.forEach(type => {
+            if (plotIds[section] && plotIds[section][type]) return;
+            const element = document.getElementById(`${section}-${type}`);
+            if (element) {
+                element.removeAttribute('src');
+                element.alt = 'Loading...';
+            }
         });
+    });
+}
+
+// Function to receive plots from a background render job as each one finishes
+function followRenderJob(jobId, formData, plotIds, clientPlotTypes) {
+    const saveProgress = () => {
+        sessionStorage.setItem('visualizationData', JSON.stringify({
+            formData: formData,
+            plot_ids: plotIds,
+            client_plot_types: clientPlotTypes
+        }));
+    };
+    saveProgress();
+
+    // Plots finish in batches; gather each burst of events into one /get_plots call
+    let pendingPlots = {};
+    let flushTimer = null;
+    const flush = () => {
+        flushTimer = null;
+        const batch = pendingPlots;
+        pendingPlots = {};
+        displayVisualizations(batch);
+    };
+
+    const source = new EventSource(`/render_jobs/${jobId}/events`);
+    source.onmessage = (e) => {
+        const event = JSON.parse(e.data);
+        console.log(`[DEBUG] Render job ${jobId} finished '${event.section}-${event.plot_type}'`, event);
+        if (event.plot_id) {
+            plotIds[event.section] = plotIds[event.section] || {};
+            plotIds[event.section][event.plot_type] = event.plot_id;
+            saveProgress();
+        } else {
+            console.error(`[DEBUG] Plot '${event.section}-${event.plot_type}' failed:`, event.error);
+        }
+        pendingPlots[event.section] = pendingPlots[event.section] || {};
+        pendingPlots[event.section][event.plot_type] = event.plot_id || null;
+        if (!flushTimer) flushTimer = setTimeout(flush, 50);
+    };
+    source.addEventListener('done', () => {
+        console.log(`[DEBUG] Render job ${jobId} complete`);
+        source.close();
+    });
+    source.onerror = () => {
+        // EventSource reconnects on its own unless the job is gone
+        if (source.readyState === EventSource.CLOSED) {
+            console.error(`[DEBUG] Lost render job ${jobId}`);
+        }
+    };
+}
+
+// Helper to show or hide a map, using its browser-drawn chart in place of the image once drawn
+function setMapVisible(id, visible) {
+    const image = document.getElementById(id);
+    const chart = document.getElementById(`${id}-chart`);
+    const drawn = chart !== null && chart.dataset.drawn === 'true';
+    if (image) image.style.display = visible && !drawn ? '' : 'none';
+    if (chart) {
+        chart.style.display = visible && drawn ? 'block' : 'none';
+        // Charts drawn while hidden need to pick up their container's size
+        if (visible && drawn) Plotly.Plots.resize(chart);
     }
 }
 
@@ -174,19 +457,13 @@ function showContinentMapView(view) {
         if (!el) {
             console.warn(`Element '${id}' not found!`);
         } else {
-            el.style.display = 'none';
+            setMapVisible(id, false);
         }
     });
     if (view === 'whole') {
-        ['continent-population_maps', 'continent-density_maps', 'continent-growth_maps'].forEach(id => {
-            const el = document.getElementById(id);
-            if (el) el.style.display = '';
-        });
+        ['continent-population_maps', 'continent-density_maps', 'continent-growth_maps'].forEach(id => setMapVisible(id, true));
     } else if (view === 'country-wise') {
-        ['continent-population_maps_country_wise', 'continent-density_maps_country_wise', 'continent-growth_maps_country_wise'].forEach(id => {
-            const el = document.getElementById(id);
-            if (el) el.style.display = '';
-        });
+        ['continent-population_maps_country_wise', 'continent-density_maps_country_wise', 'continent-growth_maps_country_wise'].forEach(id => setMapVisible(id, true));
     }
 }
 
@@ -208,24 +485,15 @@ function showWorldMapView(view) {
         if (!el) {
             console.warn(`Element '${id}' not found!`);
         } else {
-            el.style.display = 'none';
+            setMapVisible(id, false);
         }
     });
     if (view === 'whole') {
-        ['world-population_maps', 'world-density_maps', 'world-growth_maps'].forEach(id => {
-            const el = document.getElementById(id);
-            if (el) el.style.display = '';
-        });
+        ['world-population_maps', 'world-density_maps', 'world-growth_maps'].forEach(id => setMapVisible(id, true));
     } else if (view === 'continent-wise') {
-        ['world-population_maps_continent_wise', 'world-density_maps_continent_wise', 'world-growth_maps_continent_wise'].forEach(id => {
-            const el = document.getElementById(id);
-            if (el) el.style.display = '';
-        });
+        ['world-population_maps_continent_wise', 'world-density_maps_continent_wise', 'world-growth_maps_continent_wise'].forEach(id => setMapVisible(id, true));
     } else if (view === 'country-wise') {
-        ['world-population_maps_country_wise', 'world-density_maps_country_wise', 'world-growth_maps_country_wise'].forEach(id => {
-            const el = document.getElementById(id);
-            if (el) el.style.display = '';
-        });
+        ['world-population_maps_country_wise', 'world-density_maps_country_wise', 'world-growth_maps_country_wise'].forEach(id => setMapVisible(id, true));
     }
 }
 
@@ -278,27 +546,27 @@ document.addEventListener('DOMContentLoaded', function() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Accept': PLOT_IMAGE_ACCEPT,
             },
             body: JSON.stringify(formData)
         })
         .then(response => response.json())
         .then(result => {
-            console.log("visualization.js: Received plots from app.py", result);
+            console.log("visualization.js: Received render job from app.py", result);
             if (result.status === 'success') {
-                // Store the plots and form data for later display
-                sessionStorage.setItem('visualizationData', JSON.stringify({
-                    formData: formData,
-                    plot_ids: result.plot_ids
-                }));
                 // Remove the pending data
                 sessionStorage.removeItem('pendingVisualizationData');
                 // Hide loading spinner
                 if (loadingEl) loadingEl.style.display = 'none';
-                // Display the visualizations
-                const { plot_ids } = result;
+                // Display the already available plots, then stream in the rest
+                const { plot_ids, plot_slots, job_id, client_plot_types } = result;
                 updateVisibleSections(formData.selection_types);
                 updateSectionTitles(formData);
+                renderSeriesCharts(formData, client_plot_types);
+                renderChoropleths(formData, client_plot_types);
+                showPendingSlots(plot_slots, plot_ids);
                 displayVisualizations(plot_ids);
+                followRenderJob(job_id, formData, plot_ids, client_plot_types);
             } else {
                 alert('Error: ' + result.message);
                 if (loadingEl) loadingEl.style.display = 'none';
@@ -315,10 +583,12 @@ document.addEventListener('DOMContentLoaded', function() {
     // If redirected, display the visualizations as before
     const storedData = sessionStorage.getItem('visualizationData');
     if (storedData) {
-        const { formData, plot_ids } = JSON.parse(storedData);
+        const { formData, plot_ids, client_plot_types } = JSON.parse(storedData);
         console.log("visualization.js: Displaying plots after redirect", plot_ids);
         updateVisibleSections(formData.selection_types);
         updateSectionTitles(formData);
+        renderSeriesCharts(formData, client_plot_types);
+        renderChoropleths(formData, client_plot_types);
         displayVisualizations(plot_ids);
         sessionStorage.removeItem('visualizationData');
         if (loadingEl) loadingEl.style.display = 'none';
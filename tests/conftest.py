@@ -0,0 +1,9 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app and scripts are top-level modules run from the repository root; the benchmarks import each other
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
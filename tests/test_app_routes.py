@@ -0,0 +1,151 @@
+"""Smoke test of the app's routes on a tiny benchmark workspace (see benchmarks/synthetic.py)"""
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+for module_name in ('flask', 'geopandas', 'matplotlib', 'PIL', 'pymongo'):
+    pytest.importorskip(module_name)
+
+from render_benchmark import BROWSER_ACCEPT
+from synthetic import write_workspace
+
+IMAGE_TYPES = {'image/png', 'image/webp', 'image/svg+xml'}
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """Import app inside a workspace of synthetic data with in-memory plots and a render thread"""
+    workspace = tmp_path_factory.mktemp('workspace')
+    write_workspace(str(workspace), scale=1, vertices=8)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(workspace)
+        for key, value in (('WPA_PLOT_STORAGE', 'memory'), ('WPA_RENDER_PROCESSES', '0'), ('WPA_SNAPSHOT', '0'),
+                           ('WPA_DEBUG', '0'), ('MPLBACKEND', 'Agg')):
+            patch.setenv(key, value)
+        sys.modules.pop('app', None)
+        import app
+        yield app
+        app.render_pool.shutdown()
+        app.render_jobs.shutdown()
+        sys.modules.pop('app', None)
+
+
+@pytest.fixture(scope='module')
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture(scope='module')
+def entities(app_module):
+    store = app_module.store
+    continent = store.continents[0]
+    return continent, store.countries[int(store.continent_members[continent][0])]
+
+
+@pytest.fixture(scope='module')
+def plot_ids(app_module, client, entities):
+    """Render every plot of a world, continent and country selection through /get_data"""
+    continent, country = entities
+    response = client.post('/get_data', headers={'Accept': BROWSER_ACCEPT}, json={
+        'selection_types': ['world', 'continent', 'country'],
+        'continent': continent,
+        'country': country,
+        'start_year': 1970,
+        'end_year': 2032
+    })
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    job = app_module.render_jobs.get(response.get_json()['job_id'])
+    seen = 0
+    while not job.done:
+        seen += len(job.wait_for_events(seen))
+    return [plot_id for section in job.plot_ids.values() for plot_id in section.values()]
+
+
+def test_index_page(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/html'
+
+
+def test_get_plot_serves_every_rendered_image(client, plot_ids):
+    assert plot_ids
+    for plot_id in plot_ids:
+        response = client.get(f"/get_plot/{plot_id}")
+        assert response.status_code == 200
+        assert response.mimetype in IMAGE_TYPES
+        assert response.headers['ETag']
+
+
+def test_get_plot_of_an_unknown_id(client):
+    response = client.get('/get_plot/unknown')
+    assert response.status_code == 404
+    assert response.mimetype == 'application/json'
+
+
+def test_get_plots_returns_every_requested_plot(client, plot_ids):
+    response = client.get(f"/get_plots?ids={','.join(plot_ids)}")
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    plots = response.get_json()['plots']
+    assert set(plots) == set(plot_ids)
+    assert all(plot is not None for plot in plots.values())
+
+
+@pytest.mark.parametrize('level', ['world', 'continent', 'country'])
+def test_api_series(app_module, client, entities, level):
+    name = {'world': None, 'continent': entities[0], 'country': entities[1]}[level]
+    response = client.get(f"/api/series?level={level}" + (f"&name={name}" if name else ''))
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    payload = response.get_json()
+    assert len(payload['years']) == len(app_module.store.years)
+    assert all(len(values) == len(payload['years']) for values in payload['series'].values())
+
+
+def test_api_series_of_an_unknown_country(client):
+    assert client.get('/api/series?level=country&name=Atlantis').status_code == 404
+
+
+@pytest.mark.parametrize('metric', ['population', 'density', 'growth'])
+def test_api_choropleth(client, metric):
+    response = client.get(f"/api/choropleth?level=world-country-wise&metric={metric}&year=2032")
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+
+
+def test_api_choropleth_rejects_years_outside_the_dataset(client):
+    response = client.get('/api/choropleth?level=world-country-wise&metric=population&year=1900')
+    assert response.status_code == 404
+    assert response.get_json()['status'] == 'error'
+
+
+def test_api_choropleth_rejects_unknown_metrics(client):
+    assert client.get('/api/choropleth?metric=happiness&year=2032').status_code == 400
+
+
+def test_metrics_and_cache_stats(client, plot_ids):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    response = client.get('/cache_stats')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+
+
+def test_choropleth_bins_leave_missing_and_out_of_range_values_unbinned(app_module):
+    frame = pd.DataFrame({'Growth': [np.nan, 0.005, -0.5], 'Population': [np.nan, 500.0, 2_000_000.0]})
+    assert app_module.choropleth_bins('growth', frame) == [None, 3, None]
+    assert app_module.choropleth_bins('population', frame) == [None, 0, 4]
+
+
+@pytest.mark.parametrize('selection', [
+    {'selection_types': ['country'], 'country': 'Atlantis'},
+    {'selection_types': ['continent'], 'continent': 'Atlantis'}
+])
+def test_get_data_rejects_unknown_names(client, selection):
+    response = client.post('/get_data', json=selection)
+    assert response.status_code == 404
+    assert response.get_json()['status'] == 'error'
@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from data_prep import (PANEL_COLUMNS, census_panel, extend_panel, growth_rates, interpolate_years, panel_frame,
+                       population_density)
+
+
+def test_interpolate_years_is_linear_between_census_years():
+    values = np.array([[100.0, 200.0, 400.0]])
+    result = interpolate_years(values, [1970, 1980, 2000], [1970, 1975, 1980, 1990, 2000])
+    np.testing.assert_allclose(result, [[100, 150, 200, 300, 400]])
+
+
+def test_interpolate_years_holds_the_nearest_census_outside_the_range():
+    result = interpolate_years(np.array([[10.0, 20.0]]), [1980, 1990], [1970, 1995])
+    np.testing.assert_allclose(result, [[10, 20]])
+
+
+def test_interpolate_years_bridges_missing_census_values_per_row():
+    values = np.array([[100.0, np.nan, 300.0], [1.0, 2.0, 3.0], [np.nan, np.nan, np.nan]])
+    result = interpolate_years(values, [1970, 1980, 1990], [1970, 1980, 1990])
+    np.testing.assert_allclose(result[:2], [[100, 200, 300], [1, 2, 3]])
+    assert np.isnan(result[2]).all()
+
+
+def test_growth_rates_back_fills_the_first_year():
+    growth = growth_rates(np.array([[100.0, 110.0, 121.0], [50.0, 25.0, 25.0]]))
+    np.testing.assert_allclose(growth, [[0.1, 0.1, 0.1], [-0.5, -0.5, 0.0]])
+
+
+def test_growth_rates_of_a_single_year_is_nan():
+    assert np.isnan(growth_rates(np.array([[100.0]]))).all()
+
+
+def test_population_density_is_nan_without_area():
+    density = population_density(np.array([[10.0, 20.0], [5.0, 5.0]]), np.array([2.0, 0.0]))
+    np.testing.assert_allclose(density[0], [5, 10])
+    assert np.isnan(density[1]).all()
+
+
+def test_census_panel_extends_to_the_combined_schema():
+    df = pd.DataFrame({
+        'Country/Territory': ['B', 'A'],
+        'Continent': ['Asia', 'Europe'],
+        'Area (km²)': [10.0, 20.0],
+        '2000 Population': [200.0, 400.0],
+        '1990 Population': [100.0, 200.0],
+        'World Population Percentage': [1.0, 2.0]
+    })
+    panel = census_panel(df, 1990, 2000)
+    assert list(panel.countries) == ['A', 'B']
+    np.testing.assert_allclose(panel.population[:, [0, 5, 10]], [[200, 300, 400], [100, 150, 200]])
+
+    extended = extend_panel(panel, np.full((2, 2), 0.5))
+    assert list(extended.years[-2:]) == [2001, 2002]
+    np.testing.assert_allclose(extended.population[:, -2:], [[600, 900], [300, 450]])
+
+    frame = panel_frame(extended)
+    assert list(frame.columns) == PANEL_COLUMNS
+    assert len(frame) == 2 * 13
+    a_rows = frame[frame['Country/Territory'] == 'A']
+    np.testing.assert_allclose(a_rows['Growth'].to_numpy()[-2:], [0.5, 0.5])
+    np.testing.assert_allclose(a_rows['Density'].to_numpy()[-1], 900 / 20)
@@ -0,0 +1,48 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from data_store import PopulationStore
+
+
+def make_store():
+    rows = [
+        ('A', 'Europe', 2000, 100.0, 10.0), ('A', 'Europe', 2001, 110.0, 10.0), ('A', 'Europe', 2002, 121.0, 10.0),
+        ('B', 'Europe', 2000, 50.0, 5.0), ('B', 'Europe', 2001, 50.0, 5.0), ('B', 'Europe', 2002, 50.0, 5.0),
+        # C has no 2001 row
+        ('C', 'Asia', 2000, 10.0, 1.0), ('C', 'Asia', 2002, 12.0, 1.0)
+    ]
+    df = pd.DataFrame(rows, columns=['Country/Territory', 'Continent', 'Year', 'Population', 'Area (km²)'])
+    df['Density'] = df['Population'] / df['Area (km²)']
+    df['Growth'] = df.groupby('Country/Territory')['Population'].pct_change().fillna(0)
+    return PopulationStore(df)
+
+
+def test_country_series_within_a_year_range():
+    years, values = make_store().series('country', 'A', 'Population', 2001, 2002)
+    assert list(years) == [2001, 2002]
+    np.testing.assert_allclose(values, [110, 121])
+
+
+def test_missing_country_year_is_nan():
+    _, values = make_store().series('country', 'C', 'Population')
+    assert values[0] == 10 and np.isnan(values[1]) and values[2] == 12
+
+
+def test_continent_series_aggregates_members():
+    store = make_store()
+    _, population = store.series('continent', 'Europe', 'Population')
+    np.testing.assert_allclose(population, [150, 160, 171])
+    _, density = store.series('continent', 'Europe', 'Density')
+    np.testing.assert_allclose(density, [150 / 15, 160 / 15, 171 / 15])
+    _, growth = store.series('continent', 'Europe', 'Growth')
+    np.testing.assert_allclose(growth, [160 / 150 - 1, 160 / 150 - 1, 171 / 160 - 1])
+
+
+def test_world_series_and_value_outside_the_years():
+    store = make_store()
+    years, population = store.series('world', None, 'Population')
+    assert list(years) == [2000, 2001, 2002]
+    np.testing.assert_allclose(population, [160, 160, 183])
+    assert np.isnan(store.value('world', None, 'Population', 1990))
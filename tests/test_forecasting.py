@@ -0,0 +1,77 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from arima_forecast import patch_combined
+from data_prep import prepare_panel
+from forecasting.backtest import rolling_origins, select_engines
+
+
+def make_histories(populations):
+    """{country: history frame} over 2000-2002 from {country: (2000 population, 2002 population)}"""
+    df = pd.DataFrame({
+        'Country/Territory': list(populations),
+        'Continent': 'Europe',
+        'Area (km²)': 10.0,
+        '2000 Population': [first for first, _ in populations.values()],
+        '2002 Population': [last for _, last in populations.values()]
+    })
+    panel = prepare_panel(df, 2000, 2002)
+    return {country: history for country, history in panel.groupby('Country/Territory', sort=True)}
+
+
+def test_select_engines_picks_the_fastest_engine_close_to_the_best():
+    report = pd.DataFrame({
+        'engine': ['arima', 'holt', 'arima', 'holt', 'lstm'],
+        'country': ['A', 'A', 'B', 'B', 'B'],
+        'mape': [1.0, 1.05, 1.0, 3.0, np.nan],
+        'fit_s': [1.0, 0.01, 1.0, 0.01, 0.5],
+        'predict_s': [0.1, 0.001, 0.1, 0.001, 0.1]
+    })
+    assert select_engines(report, tolerance=0.1) == {'A': 'holt', 'B': 'arima'}
+    assert select_engines(report, tolerance=0.0) == {'A': 'arima', 'B': 'arima'}
+
+
+def test_rolling_origins_leave_a_full_horizon():
+    assert rolling_origins(53, horizon=5, folds=3, stride=3, min_train=15) == [41, 44, 47]
+    assert rolling_origins(10, horizon=5, folds=3, stride=3, min_train=15) == []
+
+
+def test_patch_combined_writes_every_country_without_a_file(tmp_path):
+    path = str(tmp_path / 'combined.csv')
+    histories = make_histories({'A': (100.0, 121.0), 'B': (50.0, 50.0)})
+    patched = patch_combined(path, histories, {'A': [0.1, 0.1], 'B': [0.0, 0.0]}, changed=set())
+    assert patched == 2
+    frame = pd.read_csv(path)
+    assert list(frame['Country/Territory']) == ['A'] * 5 + ['B'] * 5
+    assert list(frame['Year']) == [2000, 2001, 2002, 2003, 2004] * 2
+    np.testing.assert_allclose(frame['Population'].iloc[4], 121 * 1.1 * 1.1)
+
+
+def test_patch_combined_rewrites_only_changed_countries(tmp_path):
+    path = str(tmp_path / 'combined.csv')
+    histories = make_histories({'A': (100.0, 121.0), 'B': (50.0, 50.0), 'C': (10.0, 10.0)})
+    patch_combined(path, histories, {'A': [0.1], 'B': [0.0], 'C': [0.0]}, changed=set())
+
+    # A changes too, but only B is marked changed, so A's old rows are kept; C left the source
+    histories = make_histories({'A': (200.0, 242.0), 'B': (50.0, 50.0)})
+    patched = patch_combined(path, histories, {'A': [0.5], 'B': [0.2]}, changed={'B'})
+    assert patched == 2
+    frame = pd.read_csv(path)
+    assert sorted(frame['Country/Territory'].unique()) == ['A', 'B']
+    a_rows = frame[frame['Country/Territory'] == 'A']
+    np.testing.assert_allclose(a_rows['Population'].iloc[-1], 121 * 1.1)
+    b_rows = frame[frame['Country/Territory'] == 'B']
+    np.testing.assert_allclose(b_rows['Population'].iloc[-1], 50 * 1.2)
+
+
+def test_patch_combined_without_changes_leaves_the_file(tmp_path):
+    path = str(tmp_path / 'combined.csv')
+    histories = make_histories({'A': (100.0, 121.0)})
+    patch_combined(path, histories, {'A': [0.1]}, changed=set())
+    with open(path) as f:
+        before = f.read()
+    assert patch_combined(path, histories, {'A': [0.1]}, changed=set()) == 0
+    with open(path) as f:
+        assert f.read() == before
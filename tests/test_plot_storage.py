@@ -0,0 +1,31 @@
+import pytest
+
+from plot_storage import FilePlotStorage, MemoryPlotStorage, PlotStorage
+
+
+class SaveOnlyStorage(PlotStorage):
+    def save(self, image_data, plot_type, metadata, content_type='image/png'):
+        return 'id'
+
+
+def test_incomplete_backend_fails_when_created():
+    with pytest.raises(TypeError):
+        SaveOnlyStorage()
+
+
+@pytest.mark.parametrize('make_storage', [lambda tmp_path: MemoryPlotStorage(),
+                                          lambda tmp_path: FilePlotStorage(str(tmp_path / 'plots'))])
+def test_round_trip_and_inline_limit(tmp_path, make_storage):
+    storage = make_storage(tmp_path)
+    small, large = storage.save_many([(b'small', 'population', {}, 'image/png'),
+                                      (b'x' * 100, 'world_map', {}, 'image/webp')])
+    plot = storage.get(small)
+    with plot.stream as stream:
+        assert stream.read() == b'small'
+    assert plot.content_type == 'image/png'
+
+    plots = storage.get_many([small, large, 'unknown'], inline_max_bytes=10)
+    assert set(plots) == {small, large}
+    assert plots[large].stream is None and plots[large].content_type == 'image/webp'
+    with plots[small].stream as stream:
+        assert stream.read() == b'small'
@@ -0,0 +1,40 @@
+from render_cache import RenderCache
+
+
+def test_get_returns_stored_plot_id():
+    cache = RenderCache()
+    key = RenderCache.make_key('population_graph', {'section': 'world', 'name': None}, 'v1')
+    cache.put(key, 'plot-1')
+    assert cache.get(key) == 'plot-1'
+    assert cache.stats()['hits'] == 1
+
+
+def test_make_key_ignores_order_and_none_values():
+    first = RenderCache.make_key('growth_graph', {'start_year': 1970, 'end_year': 2032, 'name': None}, 'v1')
+    second = RenderCache.make_key('growth_graph', {'end_year': 2032, 'start_year': 1970}, 'v1')
+    assert first == second
+    assert first != RenderCache.make_key('growth_graph', {'end_year': 2032, 'start_year': 1970}, 'v2')
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RenderCache(max_entries=2)
+    cache.put('a', 'plot-a')
+    cache.put('b', 'plot-b')
+    assert cache.get('a') == 'plot-a'
+    cache.put('c', 'plot-c')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'plot-a'
+    assert cache.get('c') == 'plot-c'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('render_cache.time.monotonic', lambda: now[0])
+    cache = RenderCache(ttl_seconds=60)
+    cache.put('a', 'plot-a')
+    now[0] += 60
+    assert cache.get('a') == 'plot-a'
+    now[0] += 1
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import Future
+
+from render_jobs import RenderJobManager
+from render_pool import PlotSpec
+
+
+class ThreadedPool:
+    """Stands in for RenderPool: resolves every spec from another thread"""
+
+    def submit(self, spec):
+        future = Future()
+        if spec.plot_type == 'broken':
+            threading.Timer(0.01, future.set_exception, [ValueError('cannot draw')]).start()
+        else:
+            threading.Timer(0.01, future.set_result, [spec.plot_type.encode()]).start()
+        return future
+
+
+def wait(job):
+    seen = 0
+    while not job.done:
+        seen += len(job.wait_for_events(seen))
+
+
+def test_batches_are_stored_on_the_storage_threads():
+    manager = RenderJobManager(ThreadedPool())
+    stored = []
+
+    def on_rendered(results):
+        stored.append((threading.current_thread().name, [image_data for _, image_data in results]))
+        return [f"id-{spec.plot_type}" for spec, _ in results]
+
+    specs = [PlotSpec('world', plot_type, None, 1970, 2032) for plot_type in ('population', 'density')]
+    job = manager.submit({'world': ['population', 'density']}, [specs], on_rendered)
+    wait(job)
+    manager.shutdown()
+    assert job.plot_ids == {'world': {'population': 'id-population', 'density': 'id-density'}}
+    assert len(stored) == 1
+    thread_name, images = stored[0]
+    assert thread_name.startswith('plot-storage')
+    assert images == [b'population', b'density']
+
+
+def test_failed_renders_and_storage_errors_become_events():
+    manager = RenderJobManager(ThreadedPool())
+
+    def on_rendered(results):
+        raise IOError('disk full')
+
+    batches = [[PlotSpec('world', 'broken', None, 1970, 2032)], [PlotSpec('world', 'growth', None, 1970, 2032)]]
+    job = manager.submit({'world': ['broken', 'growth']}, batches, on_rendered)
+    wait(job)
+    manager.shutdown()
+    errors = {event['plot_type']: event['error'] for event in job.events}
+    assert errors == {'broken': 'cannot draw', 'growth': 'disk full'}
+    assert manager.active_count() == 0
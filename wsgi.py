@@ -0,0 +1,36 @@
+"""Production entry point of the app
+
+Serve it with the bundled gunicorn settings from the repository root:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Any WSGI server can load `wsgi:app`; with gunicorn's preload_app (or
+uWSGI's default, without lazy-apps) the dataset, shapes and derived indexes
+are loaded once in the master and shared copy-on-write by the workers it
+forks.
+"""
+import gc
+
+import app as app_module
+
+
+def create_app():
+    """Load the data, build every derived index and return the Flask app
+
+    Objects that survive to this point are moved out of the garbage
+    collector's generations, so collections in forked workers do not touch
+    (and copy) the pages they live on.
+    """
+    app_module.warm_up()
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+    return app_module.app
+
+
+def init_worker():
+    """Set up the per-process state of a freshly forked worker"""
+    app_module.connect_plot_storage()
+
+
+app = create_app()